@@ -1,10 +1,24 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, request, jsonify, session, g
 from flask_cors import CORS
 from olt_client import OLTClient, OLTLoginResult
+from olt_async import BlockingOLTClient
+from olt_dialect import dialect_key, get_dialect_cache
+from olt_parser import BoardDetail, Ont, parse_autofind_list, parse_board_detail, parse_board_list, parse_ont_info, read_error, to_json
+from olt_cache import ResponseCache, ont_change_tags
+from olt_fleet import OLTFleet, OLTReplyError
+from olt_flight import SingleFlight, normalize_command
+from olt_inventory import find_onts, init_inventory, port_scans, remove_ont, stale_ports, store_port_scan, upsert_ont
+from olt_jobs import JobQueue
+from olt_stream import clean_output
+from olt_watch import AutofindWatcher
 import config
+import json
+import queue
 import re
+import secrets
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 app = Flask(__name__)
@@ -15,63 +29,198 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 CORS(app, supports_credentials=True)
 
-# Global connection pool to reuse OLT connections
-olt_connections = {}
-connection_lock = threading.Lock()
+# Local ONT inventory, filled by port scans and kept current on register/delete
+init_inventory(app, config.INVENTORY_DATABASE_URI)
 
-# Simple cache for board status to prevent too frequent requests
-board_status_cache = {}
-cache_lock = threading.Lock()
-CACHE_DURATION = 30  # Cache for 30 seconds
+def create_olt_client(olt_config):
+    """Build the client selected by olt_config['client']: 'async' runs the session
+    on the shared asyncio event loop, anything else uses the blocking client.
+    Both offer the same methods; the async client only speaks telnet, so SSH
+    sessions always use OLTClient."""
+    if olt_config.get('client') == 'async' and olt_config.get('transport', 'telnet') == 'telnet':
+        return BlockingOLTClient(olt_config)
+    return OLTClient(olt_config)
 
-def get_olt_connection(username, password):
-    """Get or create an OLT connection from the pool"""
-    connection_key = f"{username}_{password}"
-    
-    with connection_lock:
-        if connection_key in olt_connections:
-            conn = olt_connections[connection_key]
-            # Check if connection is still valid
-            try:
-                # Try a simple command to test connection - use a command that doesn't require input
-                test_result = conn.execute_command("display board 0/0", 1)
-                if test_result and "Not logged in" not in test_result and "Error" not in test_result:
-                    return conn
-                else:
-                    # Connection is invalid, remove it
-                    del olt_connections[connection_key]
-            except:
-                # Connection failed, remove it
-                del olt_connections[connection_key]
-        
-        # Create new connection
-        olt = OLTClient(config.OLT_CONFIG)
-        login_result = olt.connect(username, password)
-        
-        if login_result == OLTLoginResult.SUCCESS:
-            olt_connections[connection_key] = olt
-            return olt
-        else:
-            return None
+def check_connection(conn):
+    """Health check run on a pooled session whose last prompt is older than the trust window"""
+    # An empty line must bring the prompt back; closed sockets fail on EOF right away
+    return conn.is_alive(conn.config.get('liveness_timeout', 2))
+
+# One pool of logged-in sessions per OLT, checked out exclusively for one request at a time
+fleet = OLTFleet(config.OLT_FLEET, config.OLT_CONFIG, create_olt_client, health_check=check_connection)
+default_olt = fleet.configs[config.DEFAULT_OLT]
+olt_pool = fleet.pools[config.DEFAULT_OLT]
+
+# Background autofind pollers, one per OLT, running while someone listens on /ont-autofind/events
+autofind_watchers = {name: AutofindWatcher(fleet, name, olt_config.get('autofind_interval', 30))
+                     for name, olt_config in fleet.configs.items()}
+
+# Long OLT operations submitted through /jobs run here instead of in the web request
+jobs = JobQueue(config.JOB_WORKERS, config.JOB_QUEUE_LIMIT)
+
+# Server-side OLT logins keyed by a random session id; the cookie only carries the id
+olt_sessions = {}
+olt_sessions_lock = threading.Lock()
+
+def get_session_credentials():
+    """OLT login of the current web session, or None if it is not logged in"""
+    session_id = session.get('olt_session_id')
+    if not session_id:
+        return None
+    with olt_sessions_lock:
+        return olt_sessions.get(session_id)
+
+def end_olt_session():
+    """Forget the current web session's OLT login and close its pooled sessions"""
+    session_id = session.pop('olt_session_id', None)
+    if session_id:
+        with olt_sessions_lock:
+            olt_sessions.pop(session_id, None)
+        fleet.close_key(session_id)
+        for watcher in autofind_watchers.values():
+            watcher.close_key(session_id)
+
+def get_olt_connection(credentials, olt_name=None):
+    """Check out a pooled session for the rest of the current request
+
+    Without olt_name it is a session of the default OLT under the web user's
+    login; fleet OLTs are reached with their service login if they have one.
+    """
+    if olt_name is None:
+        pool = olt_pool
+        olt = pool.checkout(credentials['id'], credentials['username'], credentials['password'])
+    else:
+        pool = fleet.pools[olt_name]
+        olt = pool.checkout(*fleet.login_for(olt_name, credentials))
+    if olt:
+        g.setdefault('olt_sessions', []).append((pool, olt))
+    return olt
+
+class OLTUnavailable(Exception):
+    """No OLT session for a request: the login expired or every session stayed busy"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+# Identical reads of the same OLT that run at the same time share one CLI execution
+read_flights = SingleFlight()
+
+def shared_read(credentials, command, mode, read, in_request=True):
+    """Output of read(olt) on a pooled session of the default OLT, run once for identical concurrent reads
+
+    command and mode (the CLI mode it runs in) identify the read: requests for
+    the same OLT, command and mode that arrive while one is running wait for it
+    and share its output instead of taking a session each, so any number of
+    viewers cost the OLT one execution. Only the output and errors of the OLT
+    itself are shared: a waiter whose leader could not check out a session
+    (its login expired, or the pool stayed busy) tries with its own login.
+    Raises OLTUnavailable when no session can be checked out.
+    """
+    def read_on(olt):
+        if not olt:
+            raise OLTUnavailable("OLT login expired", 401)
+        olt.mark_used()
+        return read(olt)
+
+    def run():
+        if not in_request:
+            # Background work has no request teardown to check the session back in
+            with olt_pool.session(credentials['id'], credentials['username'], credentials['password']) as olt:
+                return read_on(olt)
+        try:
+            olt = get_olt_connection(credentials)
+        except TimeoutError as e:
+            raise OLTUnavailable(f"OLT is busy, please try again: {str(e)}", 503)
+        return read_on(olt)
+    return read_flights.do((config.DEFAULT_OLT, normalize_command(command), mode), run,
+                           lambda e: not isinstance(e, (OLTUnavailable, TimeoutError)))
+
+# Read results shared by all users of an OLT, dropped on expiry or when a write changes them
+response_cache = ResponseCache(config.CACHE_TTLS, config.CACHE_MAX_BYTES, config.CACHE_MAX_STALE)
+# Background refreshes of stale entries; few workers so they never crowd out user requests
+cache_refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+
+def read_body(raw, parsed, data=None, **extra):
+    """Body of a read endpoint for raw output and what the parser made of it
+
+    Error text, or output the parser found nothing in, gives a status error
+    body, which cached_read never stores; otherwise data (raw by default) and
+    the parsed records are returned as a success.
+    """
+    error = read_error(raw)
+    if error:
+        return {"status": "error", "message": error}
+    if not (parsed.properties if isinstance(parsed, BoardDetail) else parsed):
+        return {"status": "error", "message": "Unexpected reply from OLT: nothing could be parsed"}
+    return dict({"status": "success", "data": raw if data is None else data, "parsed": to_json(parsed)}, **extra)
+
+def cached_read(credentials, resource, args, tags, command, mode, read, build):
+    """Response body of a read endpoint: cached, or built from a (coalesced) OLT read
+
+    build turns the raw output into the body (see read_body); only successful
+    bodies are cached, under (default OLT, resource, args) with the given invalidation
+    tags. A value past its TTL but within CACHE_MAX_STALE is returned right
+    away while a background refresh replaces it. The body carries `age`, the
+    seconds since it was read from the OLT. ?fresh=1 skips the cached value.
+    """
+    if request.args.get('fresh') != '1':
+        cached = response_cache.get(config.DEFAULT_OLT, resource, args)
+        if cached is not None:
+            body, age, fresh = cached
+            if not fresh and response_cache.start_refresh(config.DEFAULT_OLT, resource, args):
+                cache_refresher.submit(refresh_cached, credentials, resource, args, tags, command, mode, read, build)
+            print(f"Returning {'cached' if fresh else 'stale'} {resource} {'/'.join(args)} ({age:.1f}s old)")
+            return dict(body, age=round(age, 1))
+    token = response_cache.begin(config.DEFAULT_OLT)
+    body = build(shared_read(credentials, command, mode, read))
+    if body.get('status') == 'success':
+        response_cache.put(config.DEFAULT_OLT, resource, args, body, tags, token)
+    return dict(body, age=0)
+
+def refresh_cached(credentials, resource, args, tags, command, mode, read, build):
+    """Re-read a stale cache entry through the pool, outside any request"""
+    try:
+        token = response_cache.begin(config.DEFAULT_OLT)
+        body = build(shared_read(credentials, command, mode, read, in_request=False))
+        if body.get('status') == 'success':
+            response_cache.put(config.DEFAULT_OLT, resource, args, body, tags, token)
+    except Exception as e:
+        print(f"Background refresh of {resource} {'/'.join(args)} failed: {str(e)}")
+    finally:
+        response_cache.end_refresh(config.DEFAULT_OLT, resource, args)
+
+@app.teardown_request
+def release_olt_sessions(exc):
+    """Return the sessions checked out by this request to their pools"""
+    for pool, olt in g.pop('olt_sessions', []):
+        pool.checkin(olt, discard=exc is not None)
+
+@app.errorhandler(TimeoutError)
+def olt_pool_exhausted(e):
+    response = jsonify({"status": "error", "message": f"OLT is busy, please try again: {str(e)}"}), 503
+    print(f"Pool Timeout Response: {response[0].get_json()}")
+    return response
 
 def cleanup_connections():
     """Clean up old connections periodically"""
     while True:
         time.sleep(300)  # Clean up every 5 minutes
-        with connection_lock:
-            current_time = time.time()
-            keys_to_remove = []
-            for key, conn in olt_connections.items():
-                # Remove connections older than 10 minutes
-                if hasattr(conn, 'last_used') and current_time - conn.last_used > 600:
-                    keys_to_remove.append(key)
-                    try:
-                        conn.close()
-                    except:
-                        pass
-            
-            for key in keys_to_remove:
-                del olt_connections[key]
+        # Remove connections idle for more than 10 minutes
+        closed = fleet.prune_idle(600)
+        if closed:
+            print(f"Closed {closed} idle OLT sessions")
+        # Forget logins whose session cookie has expired
+        cutoff = time.time() - app.config['PERMANENT_SESSION_LIFETIME'].total_seconds()
+        with olt_sessions_lock:
+            expired = [sid for sid, creds in olt_sessions.items() if creds['created'] < cutoff]
+            for sid in expired:
+                del olt_sessions[sid]
+        for sid in expired:
+            fleet.close_key(sid)
+            for watcher in autofind_watchers.values():
+                watcher.close_key(sid)
 
 # Start cleanup thread
 cleanup_thread = threading.Thread(target=cleanup_connections, daemon=True)
@@ -91,57 +240,9 @@ def format_board_status(raw_output):
     
     return '\n'.join(formatted) if formatted else raw_output
 
-def format_board_detail(raw_output):
-    """Format board detail output - return complete output without filtering"""
-    # Clean up the output by removing escape sequences and formatting issues
-    cleaned_output = raw_output
-    
-    # Remove ANSI escape sequences
-    import re
-    ansi_escape = re.compile(r'\x1b\[[0-9;]*[a-zA-Z]')
-    cleaned_output = ansi_escape.sub('', cleaned_output)
-    
-    # Remove the "More" prompts and error messages
-    cleaned_output = re.sub(r'---- More \( Press \'Q\' to break \) ----.*', '', cleaned_output, flags=re.DOTALL)
-    cleaned_output = re.sub(r'^\s*\^\s*$', '', cleaned_output, flags=re.MULTILINE)
-    cleaned_output = re.sub(r'^\s*% Unknown command.*$', '', cleaned_output, flags=re.MULTILINE)
-    cleaned_output = re.sub(r'^\s*% The error locates at.*$', '', cleaned_output, flags=re.MULTILINE)
-    
-    # Remove command echo and prompt
-    cleaned_output = re.sub(r'^display board \d+/\d+\r?\n', '', cleaned_output, flags=re.MULTILINE)
-    cleaned_output = re.sub(r'MA5683T>.*$', '', cleaned_output, flags=re.MULTILINE)
-    
-    # Remove any remaining command artifacts
-    cleaned_output = re.sub(r'^\s*[A-Za-z0-9_]+>.*$', '', cleaned_output, flags=re.MULTILINE)
-    
-    # Clean up extra whitespace and empty lines, but preserve structure
-    lines = cleaned_output.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        # Keep lines with content, but clean up excessive whitespace
-        if line.strip():
-            cleaned_lines.append(line.rstrip())
-        elif cleaned_lines and cleaned_lines[-1].strip():  # Keep one empty line between sections
-            cleaned_lines.append('')
-    
-    # Remove leading/trailing empty lines
-    while cleaned_lines and not cleaned_lines[0].strip():
-        cleaned_lines.pop(0)
-    while cleaned_lines and not cleaned_lines[-1].strip():
-        cleaned_lines.pop()
-    
-    return '\n'.join(cleaned_lines)
-
-def cleanup_user_connections(username, password):
-    """Clean up connections for a specific user"""
-    connection_key = f"{username}_{password}"
-    with connection_lock:
-        if connection_key in olt_connections:
-            try:
-                olt_connections[connection_key].close()
-            except:
-                pass
-            del olt_connections[connection_key]
+def format_board_detail(raw_output, command=None):
+    """Format board detail output - complete output without pager, prompt or error noise"""
+    return clean_output(raw_output, command, keep_blank=True, drop_errors=True)
 
 @app.route('/olt-login', methods=['POST'])
 def olt_login():
@@ -154,20 +255,27 @@ def olt_login():
         print(f"OLT Login Response: {response[0].get_json()}")
         return response
     
-    olt = OLTClient(config.OLT_CONFIG)
-    login_result = olt.connect(username, password)
+    # Log in through the pool so the first request after login reuses this session
+    end_olt_session()
+    session_id = secrets.token_urlsafe(32)
+    login_result = olt_pool.login(session_id, username, password)
     
     if login_result == OLTLoginResult.SUCCESS:
-        # Store connection in session (in real app, use server-side session storage)
+        # Credentials stay server-side; the cookie only carries the session id
+        with olt_sessions_lock:
+            olt_sessions[session_id] = {
+                'id': session_id,
+                'username': username,
+                'password': password,
+                'created': time.time()
+            }
         session.permanent = True  # Make session persistent
-        session['olt_credentials'] = {
-            'username': username,
-            'password': password
-        }
+        session['olt_session_id'] = session_id
         response = jsonify({"status": "success", "message": "Logged in to OLT"})
         print(f"OLT Login Response: {response.get_json()}")
         return response
-    elif login_result == OLTLoginResult.INVALID_CREDENTIALS:
+    olt_pool.close_key(session_id)
+    if login_result == OLTLoginResult.INVALID_CREDENTIALS:
         response = jsonify({"status": "error", "message": "Invalid username or password"}), 401
         print(f"OLT Login Response: {response[0].get_json()}")
         return response
@@ -187,16 +295,16 @@ def olt_login():
 @app.route('/register-ont', methods=['POST'])
 def register_ont():
     # Check if logged in
-    if 'olt_credentials' not in session:
+    credentials = get_session_credentials()
+    if not credentials:
         response = jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
         print(f"Register ONT Response: {response[0].get_json()}")
         return response
         
     data = request.json
-    credentials = session['olt_credentials']
     
     # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
+    olt = get_olt_connection(credentials)
     
     if not olt:
         response = jsonify({"status": "error", "message": "OLT login expired"}), 401
@@ -206,6 +314,8 @@ def register_ont():
     try:
         olt.mark_used()  # Mark connection as used
         result = olt.register_ont(data['sn'], data['description'])
+        # The legacy flow does not say where the ONT went
+        response_cache.invalidate(config.DEFAULT_OLT, ont_change_tags(default_olt['board']))
         response = jsonify({"status": "success", "output": result})
         print(f"Register ONT Response: {response.get_json()}")
         return response
@@ -217,44 +327,27 @@ def register_ont():
 @app.route('/board-status', methods=['GET'])
 def board_status():
     # Check if logged in
-    if 'olt_credentials' not in session:
+    credentials = get_session_credentials()
+    if not credentials:
         response = jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
         print(f"Board Status Response: {response[0].get_json()}")
         return response
         
-    credentials = session['olt_credentials']
-    cache_key = f"{credentials['username']}_{credentials['password']}"
-    
-    # Check cache first
-    current_time = time.time()
-    with cache_lock:
-        if cache_key in board_status_cache:
-            cached_data, cache_time = board_status_cache[cache_key]
-            if current_time - cache_time < CACHE_DURATION:
-                print("Returning cached board status")
-                response = jsonify({"status": "success", "data": cached_data})
-                return response
-    
-    # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
-    
-    if not olt:
-        response = jsonify({"status": "error", "message": "OLT login expired"}), 401
-        print(f"Board Status Response: {response[0].get_json()}")
-        return response
-    
+    board = default_olt['board']
+
+    def build(raw_status):
+        return read_body(raw_status, parse_board_detail(raw_status, board), format_board_status(raw_status))
+
     try:
-        olt.mark_used()  # Mark connection as used
-        raw_status = olt.get_board_status()
-        formatted = format_board_status(raw_status)
-        
-        # Cache the result
-        with cache_lock:
-            board_status_cache[cache_key] = (formatted, current_time)
-        
-        response = jsonify({"status": "success", "data": formatted})
+        body = cached_read(credentials, "board-status", (), [f"board:{board}"], f"display board {board}", "ANY",
+                           lambda olt: olt.get_board_status(), build)
+        response = jsonify(body)
         print(f"Board Status Response: {response.get_json()}")
         return response
+    except OLTUnavailable as e:
+        response = jsonify({"status": "error", "message": e.message}), e.status_code
+        print(f"Board Status Response: {response[0].get_json()}")
+        return response
     except Exception as e:
         response = jsonify({"status": "error", "message": str(e)})
         print(f"Board Status Response: {response.get_json()}")
@@ -262,7 +355,7 @@ def board_status():
 
 @app.route('/olt-logout', methods=['POST'])
 def olt_logout():
-    session.pop('olt_credentials', None)
+    end_olt_session()
     response = jsonify({"status": "success", "message": "Logged out from OLT"})
     print(f"OLT Logout Response: {response.get_json()}")
     return response
@@ -271,16 +364,12 @@ def olt_logout():
 def olt_quit():
     print("=== OLT QUIT ENDPOINT CALLED ===")
     # Check if logged in
-    if 'olt_credentials' not in session:
+    if not get_session_credentials():
         print("No OLT credentials in session")
         return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
         
-    # Clean up connections for this user
-    credentials = session['olt_credentials']
-    cleanup_user_connections(credentials['username'], credentials['password'])
-    
-    # Clear the session
-    session.pop('olt_credentials', None)
+    # Clean up connections for this user and clear the session
+    end_olt_session()
     print("Session cleared - logged out from OLT")
     
     response = jsonify({"status": "success", "message": "Logged out successfully"})
@@ -291,22 +380,19 @@ def olt_quit():
 def all_boards():
     """Get output of 'display board 0' command"""
     print("=== ALL BOARDS ENDPOINT CALLED ===")
-    if 'olt_credentials' not in session:
+    credentials = get_session_credentials()
+    if not credentials:
         return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
         
-    credentials = session['olt_credentials']
-    
-    # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
-    
-    if not olt:
-        return jsonify({"status": "error", "message": "OLT login expired"}), 401
     
     try:
-        olt.mark_used()  # Mark connection as used
-        raw_status = olt.get_all_boards()
-        print(f"All Boards Response: {raw_status}")
-        return jsonify({"status": "success", "data": raw_status})
+        body = cached_read(credentials, "all-boards", (), [], "display board 0", "ANY",
+                           lambda olt: olt.get_all_boards(),
+                           lambda raw: read_body(raw, parse_board_list(raw)))
+        print(f"All Boards Response: {body.get('data', body.get('message'))}")
+        return jsonify(body)
+    except OLTUnavailable as e:
+        return jsonify({"status": "error", "message": e.message}), e.status_code
     except Exception as e:
         print(f"All Boards Error: {str(e)}")
         return jsonify({"status": "error", "message": str(e)})
@@ -315,84 +401,158 @@ def all_boards():
 def board_detail(board_id):
     """Get detailed status for a specific board"""
     print(f"=== BOARD DETAIL ENDPOINT CALLED for {board_id} ===")
-    if 'olt_credentials' not in session:
+    credentials = get_session_credentials()
+    if not credentials:
         return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
         
-    credentials = session['olt_credentials']
-    
-    # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
-    
-    if not olt:
-        return jsonify({"status": "error", "message": "OLT login expired"}), 401
     
+    def build(raw_status):
+        return read_body(raw_status, parse_board_detail(raw_status, board_id),
+                         format_board_detail(raw_status, f"display board {board_id}"), board_id=board_id)
+
     try:
-        olt.mark_used()  # Mark connection as used
-        raw_status = olt.get_board_detail(board_id)
-        formatted = format_board_detail(raw_status)
-        print(f"Board Detail Response for {board_id}: {formatted}")
-        return jsonify({"status": "success", "data": formatted, "board_id": board_id})
+        body = cached_read(credentials, "board-detail", (board_id,), [f"board:{board_id}"], f"display board {board_id}",
+                           "ANY", lambda olt: olt.get_board_detail(board_id), build)
+        print(f"Board Detail Response for {board_id}: {body.get('data', body.get('message'))}")
+        return jsonify(body)
+    except OLTUnavailable as e:
+        return jsonify({"status": "error", "message": e.message}), e.status_code
     except Exception as e:
         print(f"Board Detail Error for {board_id}: {str(e)}")
         return jsonify({"status": "error", "message": str(e)})
 
+def autofind_mode():
+    """CLI mode /ont-autofind runs in: that of the autofind form the default OLT's dialect tries first"""
+    mode = get_dialect_cache(default_olt.get('dialect_cache')).variants(dialect_key(default_olt), "autofind")[0][0]
+    return f"INTERFACE_GPON {default_olt['board']}" if mode == "INTERFACE_GPON" else mode
+
 @app.route('/ont-autofind', methods=['GET'])
 def ont_autofind():
     """Display all automatically found ONTs"""
     print("=== ONT AUTOFIND ENDPOINT CALLED ===")
-    if 'olt_credentials' not in session:
+    credentials = get_session_credentials()
+    if not credentials:
         print("No OLT credentials in session")
         return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
         
-    credentials = session['olt_credentials']
     print(f"Using credentials for user: {credentials['username']}")
     
-    # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
-    
-    if not olt:
-        print("Failed to get OLT connection")
-        return jsonify({"status": "error", "message": "OLT login expired"}), 401
-    
-    try:
-        print("Calling display_ont_autofind_simple() with correct command...")
-        olt.mark_used()  # Mark connection as used
-        result = olt.display_ont_autofind_simple()
+    def build(result):
         print(f"ONT Autofind result: {repr(result)}")
         print(f"ONT Autofind result length: {len(result) if result else 0}")
-        
-        if not result or result.strip() == "":
-            print("Empty result received")
-            return jsonify({"status": "error", "message": "No output received from OLT"})
-        
-        response = jsonify({"status": "success", "data": result})
+        try:
+            # An empty autofind list is a valid answer; error text or a cut-off list is not
+            onts = parse_autofind_list(result)
+        except ValueError as e:
+            print(f"Unusable autofind reply: {str(e)}")
+            return {"status": "error", "message": str(e)}
+        return {"status": "success", "data": result, "parsed": to_json(onts)}
+
+    try:
+        print("Calling display_ont_autofind_simple() with correct command...")
+        # The OLT's dialect decides the command form and the mode it runs in
+        mode = autofind_mode()
+        body = cached_read(credentials, "autofind", (mode,), [], "display ont autofind all", mode,
+                           lambda olt: olt.display_ont_autofind_simple(), build)
+        response = jsonify(body)
         print(f"ONT Autofind Response: {response.get_json()}")
         return response
         
+    except OLTUnavailable as e:
+        print(f"Failed to get OLT connection: {e.message}")
+        return jsonify({"status": "error", "message": e.message}), e.status_code
     except Exception as e:
         print(f"ONT Autofind Error: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route('/ont-autofind/events', methods=['GET'])
+def ont_autofind_events():
+    """Server-Sent Events stream of ONTs appearing in and leaving the autofind list
+
+    The first event is a snapshot of the list, then only changes are sent.
+    All listeners of an OLT share one background poll (?olt=name, default OLT).
+    """
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    watcher = autofind_watchers.get(request.args.get('olt', config.DEFAULT_OLT))
+    if watcher is None:
+        return jsonify({"status": "error", "message": "Unknown OLT"}), 404
+
+    events = watcher.subscribe(credentials)
+
+    def stream():
+        try:
+            # Browsers reconnect after this many milliseconds when the stream drops
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event, data = events.get(timeout=15)
+                except queue.Empty:
+                    if not watcher.subscribed(events):
+                        return
+                    # Comment line that keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            watcher.unsubscribe(events)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def registration_params(data):
+    """register_ont_complete arguments from an /ont-register request body, with its defaults"""
+    return {
+        "board_id": str(data.get('boardId', '0/0')),
+        "port_id": str(data.get('portId', '5')),
+        "ont_id": str(data.get('ontId', '1')),
+        "serial_number": data.get('serialNumber'),
+        "description": data.get('description', 'test'),
+        "line_profile_id": data.get('lineProfileId', '10'),
+        "service_profile_id": data.get('serviceProfileId', '10'),
+    }
+
+# First line of the step log of register_ont_complete
+REGISTRATION_STARTED = "=== ONT Registration Process Started ==="
+
+def registration_outcome(result, params):
+    """Response body for a registration log; a verified registration also updates the inventory"""
+    # Without a step log the flow never started: a validation error or "Not logged in to OLT"
+    if REGISTRATION_STARTED not in result:
+        return {"status": "error", "data": result, "message": result}
+    # Check if registration was successful
+    if "❌" in result or "Failed" in result:
+        return {"status": "error", "data": result, "message": "ONT registration failed"}
+    response_cache.invalidate(config.DEFAULT_OLT, ont_change_tags(params['board_id'], params['port_id'], params['ont_id']))
+    if "🎉" in result:
+        upsert_ont(config.DEFAULT_OLT, Ont(f"{params['board_id']}/{params['port_id']}", int(params['ont_id']),
+                                           params['serial_number'].upper(), None, None, None, None,
+                                           params['description'], {}))
+        # A registered ONT leaves the autofind list; let listeners see that now
+        autofind_watchers[config.DEFAULT_OLT].poll_now()
+    return {"status": "success", "data": result, "message": "ONT registration completed"}
+
 @app.route('/ont-register', methods=['POST'])
 def ont_register():
     """Register an ONT using the complete flow with detailed logging"""
     print("=== ONT REGISTER ENDPOINT CALLED ===")
-    if 'olt_credentials' not in session:
+    credentials = get_session_credentials()
+    if not credentials:
         return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
         
     data = request.json
-    credentials = session['olt_credentials']
     
     # Validate required fields
     required_fields = ['boardId', 'portId', 'ontId', 'serialNumber']
     for field in required_fields:
-        if field not in data or not data[field]:
+        if data.get(field) in (None, ''):
             return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
     
     # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
+    olt = get_olt_connection(credentials)
     
     if not olt:
         return jsonify({"status": "error", "message": "OLT login expired"}), 401
@@ -400,57 +560,137 @@ def ont_register():
     try:
         olt.mark_used()  # Mark connection as used
         
-        # Extract parameters with defaults
-        board_id = data.get('boardId', '0/0')
-        port_id = data.get('portId', '5')
-        ont_id = data.get('ontId', '1')
-        serial_number = data.get('serialNumber')
-        description = data.get('description', 'test')
-        line_profile_id = data.get('lineProfileId', '10')
-        service_profile_id = data.get('serviceProfileId', '10')
-        
-        print(f"Starting ONT registration: Board={board_id}, Port={port_id}, ONT={ont_id}, SN={serial_number}")
+        params = registration_params(data)
+        print(f"Starting ONT registration: Board={params['board_id']}, Port={params['port_id']}, ONT={params['ont_id']}, SN={params['serial_number']}")
         
-        result = olt.register_ont_complete(
-            board_id=board_id,
-            port_id=port_id,
-            ont_id=ont_id,
-            serial_number=serial_number,
-            description=description,
-            line_profile_id=line_profile_id,
-            service_profile_id=service_profile_id
-        )
+        result = olt.register_ont_complete(**params)
         
         print(f"ONT Register Response: {result}")
-        
-        # Check if registration was successful
-        if "❌" in result or "Failed" in result:
-            return jsonify({"status": "error", "data": result, "message": "ONT registration failed"})
-        else:
-            return jsonify({"status": "success", "data": result, "message": "ONT registration completed"})
+        return jsonify(registration_outcome(result, params))
             
     except Exception as e:
         print(f"ONT Register Error: {str(e)}")
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route('/ont-register/batch', methods=['POST'])
+def ont_register_batch():
+    """Register many ONTs in one OLT session: one interface entry per board, one verify listing per port"""
+    print("=== ONT BATCH REGISTER ENDPOINT CALLED ===")
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+
+    data = request.json or {}
+    onts = data.get('onts')
+    if not isinstance(onts, list) or not onts:
+        return jsonify({"status": "error", "message": "onts must be a non-empty list"}), 400
+
+    # Validate required fields
+    # Port and ONT IDs count from 0, so only a missing or empty value is missing
+    required_fields = ['boardId', 'portId', 'ontId', 'serialNumber']
+    for i, ont in enumerate(onts):
+        for field in required_fields:
+            if not isinstance(ont, dict) or ont.get(field) in (None, ''):
+                return jsonify({"status": "error", "message": f"ONT {i}: missing required field: {field}"}), 400
+
+    # Get connection from pool
+    olt = get_olt_connection(credentials)
+
+    if not olt:
+        return jsonify({"status": "error", "message": "OLT login expired"}), 401
+
+    try:
+        olt.mark_used()  # Mark connection as used
+        started = time.time()
+        outcomes = olt.register_onts_batch([{
+            "board_id": str(ont['boardId']),
+            "port_id": str(ont['portId']),
+            "ont_id": str(ont['ontId']),
+            "serial_number": str(ont['serialNumber']),
+            "description": ont.get('description', 'test'),
+            "line_profile_id": ont.get('lineProfileId', '10'),
+            "service_profile_id": ont.get('serviceProfileId', '10'),
+        } for ont in onts])
+        elapsed = time.time() - started
+
+        summary = {}
+        changed = set()
+        for outcome in outcomes:
+            summary[outcome['status']] = summary.get(outcome['status'], 0) + 1
+            if outcome['status'] in ('registered', 'unverified'):
+                changed.update(ont_change_tags(outcome['board_id'], outcome['port_id'], outcome['ont_id']))
+            if outcome['status'] == 'registered':
+                upsert_ont(config.DEFAULT_OLT, Ont(**outcome['ont']))
+        if changed:
+            response_cache.invalidate(config.DEFAULT_OLT, changed)
+        summary['elapsed_seconds'] = round(elapsed, 2)
+        summary['onts_per_minute'] = round(60 * len(outcomes) / elapsed, 1) if elapsed else None
+        print(f"ONT Batch Register Summary: {summary}")
+
+        registered = summary.get('registered', 0)
+        if registered:
+            autofind_watchers[config.DEFAULT_OLT].poll_now()
+        if registered == len(outcomes):
+            status, message = "success", "All ONTs registered"
+        elif registered:
+            status, message = "partial", f"{registered} of {len(outcomes)} ONTs registered"
+        else:
+            status, message = "error", "No ONT was registered"
+        return jsonify({"status": status, "message": message, "data": outcomes, "summary": summary})
+
+    except Exception as e:
+        print(f"ONT Batch Register Error: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)})
+
+@app.route('/ont-delete', methods=['POST'])
+def ont_delete():
+    """Delete an ONT from the OLT and from the inventory"""
+    print("=== ONT DELETE ENDPOINT CALLED ===")
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+
+    data = request.json or {}
+    for field in ['boardId', 'portId', 'ontId']:
+        if data.get(field) in (None, ''):
+            return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
+    board_id, port_id, ont_id = str(data['boardId']), str(data['portId']), str(data['ontId'])
+
+    olt = get_olt_connection(credentials)
+    if not olt:
+        return jsonify({"status": "error", "message": "OLT login expired"}), 401
+
+    try:
+        olt.mark_used()  # Mark connection as used
+        deleted, message = olt.delete_ont(board_id, port_id, ont_id)
+        print(f"ONT Delete Response: {deleted} {message}")
+        if not deleted:
+            return jsonify({"status": "error", "message": message})
+        remove_ont(config.DEFAULT_OLT, f"{board_id}/{port_id}", int(ont_id))
+        response_cache.invalidate(config.DEFAULT_OLT, ont_change_tags(board_id, port_id, ont_id))
+        return jsonify({"status": "success", "data": message, "message": "ONT deleted"})
+    except Exception as e:
+        print(f"ONT Delete Error: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)})
+
 @app.route('/ont-verify', methods=['POST'])
 def ont_verify():
     """Verify ONT registration"""
     print("=== ONT VERIFY ENDPOINT CALLED ===")
-    if 'olt_credentials' not in session:
+    credentials = get_session_credentials()
+    if not credentials:
         return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
         
     data = request.json
-    credentials = session['olt_credentials']
     
     # Validate required fields
     required_fields = ['boardId', 'portId', 'ontId', 'serialNumber']
     for field in required_fields:
-        if field not in data or not data[field]:
+        if data.get(field) in (None, ''):
             return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
     
     # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
+    olt = get_olt_connection(credentials)
     
     if not olt:
         return jsonify({"status": "error", "message": "OLT login expired"}), 401
@@ -480,58 +720,415 @@ def ont_verify():
         print(f"ONT Verify Error: {str(e)}")
         return jsonify({"status": "error", "message": str(e)})
 
+def verify_params(data):
+    return {
+        "board_id": str(data.get('boardId')),
+        "port_id": str(data.get('portId')),
+        "ont_id": str(data.get('ontId')),
+        "serial_number": data.get('serialNumber'),
+    }
+
+# Operations that can run as jobs: (request body -> arguments, run on a session, log -> response body)
+JOB_KINDS = {
+    'ont-register': (registration_params,
+                     lambda olt, params, progress: olt.register_ont_complete(**params, progress=progress),
+                     registration_outcome),
+    'ont-verify': (verify_params,
+                   lambda olt, params, progress: olt.verify_ont_registration(**params, progress=progress),
+                   lambda result, params: {"status": "success", "data": result}),
+}
+
+def job_work(credentials, kind, params):
+    """Job body: run one JOB_KINDS operation on a pooled session of the default OLT"""
+    _, run, outcome = JOB_KINDS[kind]
+
+    def work(progress):
+        progress("Waiting for an OLT session...")
+        with olt_pool.session(credentials['id'], credentials['username'], credentials['password']) as olt:
+            if not olt:
+                raise RuntimeError("OLT login expired")
+            olt.mark_used()
+            result = run(olt, params, progress)
+        with app.app_context():
+            return outcome(result, params)
+    return work
+
+@app.route('/jobs/<kind>', methods=['POST'])
+def submit_job(kind):
+    """Queue an /ont-register or /ont-verify request as a job and return its id right away"""
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    if kind not in JOB_KINDS:
+        return jsonify({"status": "error", "message": f"Unknown job kind: {kind}"}), 404
+
+    data = request.json or {}
+    required_fields = ['boardId', 'portId', 'ontId', 'serialNumber']
+    for field in required_fields:
+        if data.get(field) in (None, ''):
+            return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
+
+    params = JOB_KINDS[kind][0](data)
+    job = jobs.submit(kind, params, credentials['id'], job_work(credentials, kind, params))
+    if job is None:
+        return jsonify({"status": "error", "message": "Too many jobs are waiting, please try again later"}), 503
+    print(f"Queued job {job.id}: {kind} {params}")
+    return jsonify({"status": "success", "message": "Job queued", "data": job.to_dict(steps=False)}), 202
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Jobs of the current web session, without their steps"""
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    return jsonify({"status": "success", "data": [job.to_dict(steps=False) for job in jobs.jobs(credentials['id'])]})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status, steps so far and (once finished) result of a job"""
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    job = jobs.get(job_id, credentials['id'])
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify({"status": "success", "data": job.to_dict()})
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events stream of a job: one `step` event per finished step, then `done`
+
+    A reconnecting EventSource sends Last-Event-ID and continues after that step.
+    """
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    job = jobs.get(job_id, credentials['id'])
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    seen = request.headers.get('Last-Event-ID', request.args.get('after', '0'))
+    seen = int(seen) if seen.isdigit() else 0
+
+    def stream():
+        nonlocal seen
+        yield "retry: 2000\n\n"
+        while True:
+            steps = jobs.wait_for_steps(job, seen, 15)
+            for step in steps:
+                yield f"id: {step['step']}\nevent: step\ndata: {json.dumps(step)}\n\n"
+            seen += len(steps)
+            if job.done and seen >= len(job.steps):
+                yield f"event: done\ndata: {json.dumps(job.to_dict(steps=False))}\n\n"
+                return
+            if not steps:
+                yield ": keepalive\n\n"
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def format_inventory_onts(onts):
+    """Inventory rows as a text table, for clients that show `data` like the OLT's listing"""
+    lines = [f"  {'F/S/P':<10}{'ONT':<5}{'SN':<18}{'Control':<10}{'Run':<10}{'Config':<10}{'Match':<10}Description"]
+    for ont in onts:
+        lines.append(f"  {ont['fsp']:<10}{ont['ont_id']:<5}{ont['sn'] or '-':<18}{ont['control_flag'] or '-':<10}"
+                     f"{ont['run_state'] or '-':<10}{ont['config_state'] or '-':<10}{ont['match_state'] or '-':<10}"
+                     f"{ont['description'] or ''}")
+    return "\n".join(lines)
+
+def inventory_read(onts):
+    """Body of an ONT read answered from the inventory; age is that of its oldest row"""
+    return {"status": "success", "data": format_inventory_onts(onts), "parsed": onts, "source": "inventory",
+            "age": max(ont['age_seconds'] for ont in onts)}
+
+def usable_inventory(onts, max_age=None):
+    """onts if a read may be answered with them, else []
+
+    Every row needs its states (a row added by /ont-register has none until the
+    port is read) and, with max_age, must have been read within max_age seconds.
+    """
+    if not onts or any(ont['run_state'] is None for ont in onts):
+        return []
+    if max_age is not None and max(ont['age_seconds'] for ont in onts) > max_age:
+        return []
+    return onts
+
+def record_read(body):
+    """Keep the inventory current with ONTs a live read has just seen (not cached copies)"""
+    if body.get('status') == 'success' and body.get('age') == 0:
+        for ont in body.get('parsed') or []:
+            upsert_ont(config.DEFAULT_OLT, Ont(**ont))
+    return dict(body, source="olt")
+
 @app.route('/ont-info/<path:description>', methods=['GET'])
 def ont_info(description):
-    """Get ONT information by description"""
+    """Get ONT information by description, from the inventory when it knows the ONT
+
+    ?fresh=1, or a description the inventory has no row for, reads the OLT
+    and records what it returns.
+    """
     print(f"=== ONT INFO ENDPOINT CALLED for {description} ===")
-    if 'olt_credentials' not in session:
+    credentials = get_session_credentials()
+    if not credentials:
         return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
-        
-    credentials = session['olt_credentials']
-    
-    # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
-    
-    if not olt:
-        return jsonify({"status": "error", "message": "OLT login expired"}), 401
-    
+
     try:
-        olt.mark_used()  # Mark connection as used
-        result = olt.display_ont_info_by_desc(description)
-        print(f"ONT Info Response for {description}: {result}")
-        return jsonify({"status": "success", "data": result})
+        onts = [] if request.args.get('fresh') == '1' else find_onts(olt=config.DEFAULT_OLT, description=description)
+        onts = usable_inventory(onts)
+        if onts:
+            print(f"ONT Info for {description}: {len(onts)} ONTs from the inventory")
+            return jsonify(inventory_read(onts))
+        body = cached_read(credentials, "ont-info", (description,), [], f"display ont info by-desc {description}",
+                           f"INTERFACE_GPON {default_olt['board']}",
+                           lambda olt: olt.display_ont_info_by_desc(description),
+                           lambda raw: read_body(raw, parse_ont_info(raw)))
+        print(f"ONT Info Response for {description}: {body.get('data', body.get('message'))}")
+        return jsonify(record_read(body))
+    except OLTUnavailable as e:
+        return jsonify({"status": "error", "message": e.message}), e.status_code
     except Exception as e:
         print(f"ONT Info Error for {description}: {str(e)}")
         return jsonify({"status": "error", "message": str(e)})
 
-@app.route('/ont-status/<path:board_id>/<path:ont_id>', methods=['GET'])
-def ont_status(board_id, ont_id):
-    """Get ONT status information"""
-    print(f"=== ONT STATUS ENDPOINT CALLED for {board_id}/{ont_id} ===")
-    if 'olt_credentials' not in session:
+@app.route('/ont-status/<int:frame>/<int:slot>/<int:ont_id>', methods=['GET'])
+@app.route('/ont-status/<int:frame>/<int:slot>/<int:port_id>/<int:ont_id>', methods=['GET'])
+def ont_status(frame, slot, ont_id, port_id=None):
+    """Get ONT status by board and ONT ID (every port) or by F/S/P and ONT ID
+
+    Answered from the inventory when it has the ONT with its states, read
+    within CACHE_MAX_STALE['ont-status'] seconds; otherwise, or with ?fresh=1,
+    the OLT is read and what it returns is recorded.
+    """
+    board_id = f"{frame}/{slot}"
+    where = f"{board_id}/{ont_id}" if port_id is None else f"{board_id}/{port_id}/{ont_id}"
+    print(f"=== ONT STATUS ENDPOINT CALLED for {where} ===")
+    credentials = get_session_credentials()
+    if not credentials:
         return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
-        
-    credentials = session['olt_credentials']
-    
-    # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
-    
+
+    try:
+        onts = []
+        if request.args.get('fresh') != '1':
+            fsp = None if port_id is None else f"{board_id}/{port_id}"
+            onts = [ont for ont in find_onts(olt=config.DEFAULT_OLT, fsp=fsp, ont_id=ont_id)
+                    if ont['fsp'].startswith(f"{board_id}/")]
+            onts = usable_inventory(onts, config.CACHE_MAX_STALE.get('ont-status'))
+        if onts:
+            print(f"ONT Status for {where}: {len(onts)} ONTs from the inventory")
+            return jsonify(inventory_read(onts))
+        if port_id is None:
+            args, tags, command = (board_id, str(ont_id)), [f"board:{board_id}"], f"display ont info {ont_id}"
+        else:
+            args = (board_id, str(port_id), str(ont_id))
+            tags = [f"board:{board_id}", f"port:{board_id}/{port_id}"]
+            command = f"display ont info {port_id} {ont_id}"
+        body = cached_read(credentials, "ont-status", args, tags + [f"ont:{board_id}:{ont_id}"],
+                           command, f"INTERFACE_GPON {board_id}",
+                           lambda olt: olt.get_ont_status(board_id, str(ont_id), None if port_id is None else str(port_id)),
+                           lambda raw: read_body(raw, parse_ont_info(raw, board_id)))
+        print(f"ONT Status Response for {where}: {body.get('data', body.get('message'))}")
+        return jsonify(record_read(body))
+    except OLTUnavailable as e:
+        return jsonify({"status": "error", "message": e.message}), e.status_code
+    except Exception as e:
+        print(f"ONT Status Error for {where}: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)})
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Response cache size, TTLs and hit/miss/eviction/invalidation counts per resource"""
+    if not get_session_credentials():
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    return jsonify({"status": "success", "data": response_cache.stats()})
+
+@app.route('/pool-stats', methods=['GET'])
+def pool_stats():
+    """Report OLT session pool usage: sessions in use/idle, waiters and wait times"""
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    return jsonify({"status": "success", "data": olt_pool.stats(), "coalescing": read_flights.stats()})
+
+def fleet_query_options():
+    """OLT names (?olts=a,b, default all) and per-OLT timeout (?timeout=seconds) of a fleet query"""
+    olts = request.args.get('olts')
+    names = [name.strip() for name in olts.split(',') if name.strip()] if olts else None
+    timeout = request.args.get('timeout', type=float)
+    return names, timeout
+
+def fleet_response(results, elapsed):
+    """Per-OLT results; "partial" when only some OLTs answered"""
+    answered = sum(1 for result in results.values() if result['status'] == 'success')
+    if answered == len(results):
+        status = "success"
+    else:
+        status = "partial" if answered else "error"
+    return jsonify({"status": status, "data": results, "elapsed_ms": round(1000 * elapsed)})
+
+def fleet_board_status(olt, olt_config):
+    raw_status = olt.get_board_status()
+    body = read_body(raw_status, parse_board_detail(raw_status, olt_config['board']))
+    if body['status'] != 'success':
+        raise OLTReplyError(body['message'])
+    return {"raw": raw_status, "parsed": body['parsed']}
+
+def fleet_autofind(olt, olt_config):
+    result = olt.display_ont_autofind_simple()
+    try:
+        onts = parse_autofind_list(result)
+    except ValueError as e:
+        raise OLTReplyError(str(e))
+    return {"raw": result, "parsed": to_json(onts)}
+
+# The OLT's answer to a lookup that matched no ONT, which is not an error for a search
+ONT_NOT_FOUND_PATTERN = re.compile(r"Failure: The ONT does not exist")
+
+@app.route('/fleet', methods=['GET'])
+def fleet_overview():
+    """OLTs in the fleet and their session pools"""
+    if not get_session_credentials():
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    return jsonify({"status": "success", "data": fleet.describe(), "pools": fleet.stats(),
+                    "autofind": {name: watcher.stats() for name, watcher in autofind_watchers.items()},
+                    "jobs": jobs.stats()})
+
+@app.route('/fleet/board-status', methods=['GET'])
+def fleet_board_status_all():
+    """Board status of every OLT, queried concurrently"""
+    print("=== FLEET BOARD STATUS ENDPOINT CALLED ===")
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    names, timeout = fleet_query_options()
+    results, elapsed = fleet.fan_out(fleet_board_status, credentials, names, timeout)
+    print(f"Fleet Board Status: {len(results)} OLTs in {elapsed:.2f}s")
+    return fleet_response(results, elapsed)
+
+@app.route('/fleet/ont-autofind', methods=['GET'])
+def fleet_ont_autofind():
+    """Autofind ONTs of every OLT, queried concurrently"""
+    print("=== FLEET ONT AUTOFIND ENDPOINT CALLED ===")
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    names, timeout = fleet_query_options()
+    results, elapsed = fleet.fan_out(fleet_autofind, credentials, names, timeout)
+    print(f"Fleet ONT Autofind: {len(results)} OLTs in {elapsed:.2f}s")
+    return fleet_response(results, elapsed)
+
+@app.route('/fleet/ont-search', methods=['GET'])
+def fleet_ont_search():
+    """Look for an ONT by serial number (?sn=) or description (?desc=) on every OLT"""
+    print("=== FLEET ONT SEARCH ENDPOINT CALLED ===")
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+    serial_number = request.args.get('sn')
+    description = request.args.get('desc')
+    if not serial_number and not description:
+        return jsonify({"status": "error", "message": "sn or desc parameter required"}), 400
+
+    def search(olt, olt_config):
+        if serial_number:
+            result = olt.find_ont_by_sn(serial_number)
+        else:
+            result = olt.display_ont_info_by_desc(description)
+        if ONT_NOT_FOUND_PATTERN.search(result or ""):
+            return {"raw": result, "parsed": [], "found": False}
+        body = read_body(result, parse_ont_info(result))
+        if body['status'] != 'success':
+            raise OLTReplyError(body['message'])
+        return {"raw": result, "parsed": body['parsed'], "found": True}
+
+    names, timeout = fleet_query_options()
+    results, elapsed = fleet.fan_out(search, credentials, names, timeout)
+    found = [name for name, result in results.items() if result['status'] == 'success' and result['data']['found']]
+    print(f"Fleet ONT Search: found on {found} in {elapsed:.2f}s")
+    return fleet_response(results, elapsed)
+
+# Summary under a port listing, e.g. "In port 0/ 1/0 , the total of ONTs are: 30, online: 26"
+PORT_TOTAL_PATTERN = re.compile(r"the total of ONTs are:\s*(\d+)")
+
+@app.route('/inventory/refresh', methods=['POST'])
+def inventory_refresh():
+    """Re-read the ONT listings of a board's ports into the inventory
+
+    Body: boardId, optional olt (fleet name), ports (default all ports of the
+    board) and maxAge (only ports not scanned within that many seconds).
+    """
+    print("=== INVENTORY REFRESH ENDPOINT CALLED ===")
+    credentials = get_session_credentials()
+    if not credentials:
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+
+    data = request.json or {}
+    olt_name = data.get('olt') or config.DEFAULT_OLT
+    if olt_name not in fleet.configs:
+        return jsonify({"status": "error", "message": f"Unknown OLT: {olt_name}"}), 404
+    board_id = str(data.get('boardId') or fleet.configs[olt_name]['board'])
+    if not re.match(r'^\d+/\d+$', board_id):
+        return jsonify({"status": "error", "message": "Invalid board format. Use format like '0/0'"}), 400
+    ports = [str(port) for port in data.get('ports') or range(fleet.configs[olt_name].get('ports_per_board', 16))]
+    if data.get('maxAge') is not None:
+        stale = set(stale_ports(olt_name, [f"{board_id}/{port}" for port in ports], float(data['maxAge'])))
+        ports = [port for port in ports if f"{board_id}/{port}" in stale]
+    if not ports:
+        return jsonify({"status": "success", "data": [], "message": "Inventory is fresh"})
+
+    olt = get_olt_connection(credentials, None if olt_name == config.DEFAULT_OLT else olt_name)
     if not olt:
         return jsonify({"status": "error", "message": "OLT login expired"}), 401
-    
+
     try:
         olt.mark_used()  # Mark connection as used
-        result = olt.get_ont_status(board_id, ont_id)
-        print(f"ONT Status Response for {board_id}/{ont_id}: {result}")
-        return jsonify({"status": "success", "data": result})
+        started = time.time()
+        listings = olt.scan_ports(board_id, ports)
+        results = []
+        for port, listing in listings.items():
+            fsp = f"{board_id}/{port}"
+            if listing is None:
+                results.append({"fsp": fsp, "status": "error", "message": "Port listing not received"})
+                continue
+            onts = [ont for ont in parse_ont_info(listing, board_id) if ont.fsp == fsp]
+            total = PORT_TOTAL_PATTERN.search(listing)
+            if total and int(total.group(1)) != len(onts):
+                # Rows went missing on the way; reconciling would delete ONTs that are there
+                results.append({"fsp": fsp, "status": "error",
+                                "message": f"Port listing incomplete: {len(onts)} of {total.group(1)} ONTs read"})
+                continue
+            added, updated, removed = store_port_scan(olt_name, fsp, onts)
+            results.append({"fsp": fsp, "status": "success", "onts": len(onts),
+                            "added": added, "updated": updated, "removed": removed})
+        print(f"Inventory refresh of {olt_name} {board_id}: {len(ports)} ports in {time.time() - started:.2f}s")
+        return jsonify({"status": "success", "data": results, "elapsed_ms": round(1000 * (time.time() - started))})
     except Exception as e:
-        print(f"ONT Status Error for {board_id}/{ont_id}: {str(e)}")
+        print(f"Inventory Refresh Error: {str(e)}")
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route('/inventory/onts', methods=['GET'])
+def inventory_onts():
+    """ONTs from the local inventory (?olt=, board=, port=, ontId=, sn=, desc=), with data age"""
+    if not get_session_credentials():
+        return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
+
+    olt_name = request.args.get('olt')
+    board_id = request.args.get('board')
+    port_id = request.args.get('port')
+    fsp = f"{board_id}/{port_id}" if board_id and port_id else None
+    onts = find_onts(
+        olt=olt_name,
+        fsp=fsp,
+        ont_id=request.args.get('ontId', type=int),
+        sn=request.args.get('sn'),
+        description=request.args.get('desc')
+    )
+    scans = [scan for scan in port_scans(olt_name) if fsp is None or scan['fsp'] == fsp]
+    oldest = max((scan['age_seconds'] for scan in scans), default=None)
+    return jsonify({"status": "success", "data": onts, "ports": scans, "age_seconds": oldest})
+
 @app.route('/check-session', methods=['GET'])
 def check_session():
     """Check if user is currently logged in"""
-    if 'olt_credentials' in session:
+    if get_session_credentials():
         return jsonify({"status": "success", "logged_in": True})
     else:
         return jsonify({"status": "success", "logged_in": False})
@@ -540,17 +1137,17 @@ def check_session():
 def test_command():
     """Test command sending to OLT"""
     print("=== TEST COMMAND ENDPOINT CALLED ===")
-    if 'olt_credentials' not in session:
+    credentials = get_session_credentials()
+    if not credentials:
         return jsonify({"status": "error", "message": "Not logged in to OLT"}), 401
         
     data = request.json
-    credentials = session['olt_credentials']
     
     if 'command' not in data:
         return jsonify({"status": "error", "message": "Command parameter required"}), 400
     
     # Get connection from pool
-    olt = get_olt_connection(credentials['username'], credentials['password'])
+    olt = get_olt_connection(credentials)
     
     if not olt:
         return jsonify({"status": "error", "message": "OLT login expired"}), 401
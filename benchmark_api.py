@@ -0,0 +1,482 @@
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from olt_simulator import FIXED_BOARDS, SLOT_COUNT, parse_latency_option, serial_number
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Endpoints in the order they are driven; autofind is read before registrations change it
+ENDPOINTS = ["olt-login", "board-status", "all-boards", "board-detail", "ont-autofind",
+             "ont-register", "ont-verify", "ont-info", "ont-status"]
+
+# Error or validation text a read must not answer with, even under status "success"
+# ("Invalid board format...", "% Unknown command", "Failure: The ONT does not exist")
+READ_ERROR_PATTERN = re.compile(r"^\s*(?:%|Failure\b|Error\b|Invalid\b|Not logged in\b)", re.MULTILINE)
+
+# Metrics compared between runs, with whether a higher value is worse
+COMPARED_METRICS = [("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput", False)]
+
+
+class APIClient:
+    """One user of the API with its own cookie jar, so its own OLT login"""
+
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def call(self, method, path, body=None):
+        """Send a request; returns (HTTP status, decoded JSON body or None)"""
+        data, headers = None, {}
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, None
+
+    def expect_success(self, method, path, body=None, read=False, allow_empty=False):
+        """Send a request; returns (ok, error message) where ok means HTTP 200 with status "success"
+
+        With read, the reply must also carry parsed records (an empty list only
+        with allow_empty) and no error text in its data.
+        """
+        status, reply = self.call(method, path, body)
+        if status == 200 and reply and reply.get('status') == 'success':
+            if not read:
+                return True, None
+            parsed = reply.get('parsed')
+            if parsed is None or not (parsed or allow_empty):
+                return False, f"HTTP {status}: nothing parsed from the reply"
+            error = READ_ERROR_PATTERN.search(str(reply.get('data', '')))
+            if error:
+                return False, f"HTTP {status}: {error.group(0).strip()}"
+            return True, None
+        message = reply.get('message') if reply else None
+        return False, f"HTTP {status}: {message or 'no JSON body'}"
+
+    def login(self, username, password):
+        return self.expect_success('POST', '/olt-login', {"username": username, "password": password})
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def run_stage(calls, clients):
+    """Run calls (functions of an APIClient returning (ok, error)) with one worker per client
+
+    Every worker takes the next call as soon as its previous one returned, so
+    len(clients) requests are in flight at any time. Returns the latency and
+    throughput summary of the stage.
+    """
+    calls = iter(calls)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(client):
+        while True:
+            with lock:
+                call = next(calls, None)
+            if call is None:
+                return
+            started = time.perf_counter()
+            try:
+                ok, error = call(client)
+            except Exception as e:
+                ok, error = False, str(e)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors.append(error)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(client,), daemon=True) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: None if seconds is None else round(seconds * 1000, 2)
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "concurrency": len(clients),
+        "elapsed_s": round(wall, 3),
+        "throughput": round(len(latencies) / wall, 2) if wall else None,  # requests per second
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "error_samples": sorted(set(errors))[:3],
+    }
+
+
+def gpon_slots(boards):
+    """Slots of the GPON boards of a simulator with `boards` boards (see SimulatedOLT)"""
+    return [slot for slot in range(SLOT_COUNT) if slot not in FIXED_BOARDS][:boards]
+
+
+def fresh_autofind(client):
+    """The parsed autofind list, read from the OLT past the cache"""
+    status, reply = client.call('GET', '/ont-autofind?fresh=1')
+    if status != 200 or not reply or reply.get('status') != 'success':
+        raise RuntimeError(f"Could not read the autofind list: HTTP {status}")
+    return reply['parsed']
+
+
+def registration_targets(autofind, onts_per_port, count):
+    """/ont-register bodies for up to count ONTs of an autofind listing, each on a free ONT ID of its port
+
+    ONTs waiting on port 0 are left out: the API takes ports 1-16 (see Validation Rules).
+    """
+    next_id = {}
+    targets = []
+    for ont in autofind:
+        frame, slot, port = ont['fsp'].split('/')
+        ont_id = next_id.get((slot, port), max(onts_per_port, 1))
+        if port == '0' or ont_id > 128:
+            continue
+        next_id[(slot, port)] = ont_id + 1
+        targets.append({"boardId": f"{frame}/{slot}", "portId": port, "ontId": str(ont_id),
+                        "serialNumber": ont['sn'], "description": f"bench-{len(targets)}"})
+        if len(targets) == count:
+            break
+    return targets
+
+
+def confirmed_post(path, body):
+    """Call of /ont-register or /ont-verify that only counts when the step log ends in success (🎉)
+
+    Both answer status "success" whenever the flow ran, whatever the OLT said.
+    """
+    def call(client):
+        status, reply = client.call('POST', path, body)
+        if status == 200 and reply and reply.get('status') == 'success' and "🎉" in reply.get('data', ''):
+            return True, None
+        text = (reply or {}).get('data') or (reply or {}).get('message') or 'no JSON body'
+        return False, f"HTTP {status}: not confirmed: {text.strip().splitlines()[-1] if text.strip() else text}"
+    return call
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(check, timeout, what):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{what} did not come up within {timeout}s")
+
+
+def port_open(port):
+    with socket.create_connection(("127.0.0.1", port), timeout=1):
+        return True
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def start_servers(args, workdir):
+    """Start the simulator and app.py as subprocesses; returns (processes, API base URL)"""
+    olt_port, olt_ssh_port, app_port = free_port(), free_port(), free_port()
+    simulator = [sys.executable, os.path.join(REPO_DIR, "olt_simulator.py"), "--port", str(olt_port),
+                 "--boards", str(args.boards), "--ports-per-board", str(args.ports_per_board),
+                 "--onts-per-port", str(args.onts_per_port), "--autofind", str(args.autofind or 2 * args.requests),
+                 "--latency", str(args.latency), "--login-latency", str(args.login_latency),
+                 "--page-size", str(args.page_size)]
+    for prefix, seconds in args.command_latency:
+        simulator += ["--command-latency", f"{prefix}={seconds}"]
+    if args.transport == "ssh":
+        simulator += ["--ssh-port", str(olt_ssh_port)]
+    app = [sys.executable, os.path.abspath(__file__), "app", "--port", str(app_port), "--olt-port", str(olt_port),
+           "--olt-ssh-port", str(olt_ssh_port), "--workdir", workdir, "--transport", args.transport,
+           "--client", args.client]
+    if args.max_sessions:
+        app += ["--max-sessions", str(args.max_sessions)]
+    if args.no_cache:
+        app.append("--no-cache")
+
+    processes = []
+    for name, command, port in (("simulator", simulator, olt_ssh_port if args.transport == "ssh" else olt_port),
+                                ("app", app, app_port)):
+        log = open(os.path.join(workdir, f"{name}.log"), "w")
+        processes.append(subprocess.Popen(command, cwd=REPO_DIR, stdout=log, stderr=subprocess.STDOUT))
+        wait_until(lambda: processes[-1].poll() is None and port_open(port), 60, name)
+    return processes, f"http://127.0.0.1:{app_port}"
+
+
+def run_benchmark(args):
+    """Start the simulator and the API, drive the selected endpoints and return the results"""
+    endpoints = args.endpoints.split(",") if args.endpoints else ENDPOINTS
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(unknown)} (choose from {', '.join(ENDPOINTS)})")
+
+    workdir = tempfile.mkdtemp(prefix="olt-benchmark-")
+    print(f"Starting simulator and API (logs in {workdir})...")
+    processes, base_url = start_servers(args, workdir)
+    credentials = (args.username, args.password)
+    n = args.requests
+    slots = gpon_slots(args.boards)
+    results = {}
+
+    try:
+        users = [APIClient(base_url) for _ in range(args.concurrency)]
+        if "olt-login" in endpoints:
+            logged_in = []
+
+            def login(_):
+                client = APIClient(base_url)
+                logged_in.append(client)
+                return client.login(*credentials)
+            results["olt-login"] = run_stage([login] * n, users)
+            for client in logged_in:
+                client.call('POST', '/olt-logout')
+        for user in users:
+            ok, error = user.login(*credentials)
+            if not ok:
+                raise RuntimeError(f"Benchmark user could not log in: {error}")
+
+        def get(path, allow_empty=False):
+            return lambda client: client.expect_success('GET', path, read=True, allow_empty=allow_empty)
+
+        # Preloaded ONTs in creation order (the index gives the serial number), sampled across all ports
+        locations = [(slot, port, ont_id) for slot in slots for port in range(args.ports_per_board)
+                     for ont_id in range(args.onts_per_port)]
+        picks = [i * 7919 % len(locations) for i in range(n)] if locations else []
+        sample = [(index,) + locations[index] for index in picks]
+        stages = {
+            "board-status": lambda: [get('/board-status')] * n,
+            "all-boards": lambda: [get('/all-boards')] * n,
+            "board-detail": lambda: [get(f'/board-detail/0/{slots[i % len(slots)]}') for i in range(n)],
+            "ont-autofind": lambda: [get('/ont-autofind', allow_empty=True)] * n,
+            "ont-register": lambda: [confirmed_post('/ont-register', target)
+                                     for target in registration_targets(fresh_autofind(users[0]), args.onts_per_port, n)],
+            "ont-verify": lambda: [confirmed_post('/ont-verify', {"boardId": f"0/{slot}", "portId": str(port),
+                                                                 "ontId": str(ont_id), "serialNumber": serial_number(index)})
+                                   for index, slot, port, ont_id in sample],
+            "ont-info": lambda: [get(f'/ont-info/customer-{slot}-{port}-{ont_id}') for _, slot, port, ont_id in sample],
+            "ont-status": lambda: [get(f'/ont-status/0/{slot}/{port}/{ont_id}') for _, slot, port, ont_id in sample],
+        }
+        for name in ENDPOINTS:
+            if name not in endpoints or name == "olt-login":
+                continue
+            if name in ("ont-verify", "ont-info", "ont-status") and not locations:
+                print(f"Skipping {name}: the simulator has no preloaded ONTs (--onts-per-port 0)")
+                continue
+            print(f"Benchmarking /{name}...")
+            results[name] = run_stage(stages[name](), users)
+
+        server = {}
+        for name, path in (("pool", '/pool-stats'), ("cache", '/cache-stats')):
+            status, reply = users[0].call('GET', path)
+            server[name] = reply if status == 200 else None
+        for user in users:
+            user.call('POST', '/olt-logout')
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("command", "output", "password")}
+    settings["command_latency"] = dict(args.command_latency)
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "settings": settings,
+        "endpoints": results,
+        "server": server,
+        "logs": workdir,
+    }
+
+
+def print_results(results):
+    print(f"\n{'endpoint':<14} {'requests':>8} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for name, stage in results['endpoints'].items():
+        print(f"{name:<14} {stage['requests']:>8} {stage['errors']:>6} {_number(stage['p50_ms']):>9} "
+              f"{_number(stage['p95_ms']):>9} {_number(stage['p99_ms']):>9} {_number(stage['throughput']):>8}")
+        for error in stage['error_samples']:
+            print(f"    error: {error}")
+
+
+def _number(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def compare_results(baseline, current, threshold=0.2, min_ms=1.0):
+    """Compare two result files; returns (rows, regressions)
+
+    A latency percentile is a regression when it grew by more than threshold
+    (a fraction) and by more than min_ms; throughput when it fell by more than
+    threshold; errors whenever there are more than before.
+    """
+    rows, regressions = [], []
+    for name, after in current['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if before is None:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS:
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if higher_is_worse else change < -threshold
+            if worse and metric.endswith("_ms") and new - old <= min_ms:
+                worse = False
+            rows.append((name, metric, old, new, change, worse))
+            if worse:
+                regressions.append((name, metric))
+        if after['errors'] > before['errors']:
+            rows.append((name, "errors", before['errors'], after['errors'], None, True))
+            regressions.append((name, "errors"))
+    return rows, regressions
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    for key in ("requests", "concurrency", "latency", "client", "transport", "no_cache", "boards", "onts_per_port"):
+        if baseline['settings'].get(key) != current['settings'].get(key):
+            print(f"Warning: runs differ in {key} ({baseline['settings'].get(key)} -> {current['settings'].get(key)})")
+
+    rows, regressions = compare_results(baseline, current, args.threshold, args.min_ms)
+    print(f"{baseline.get('commit') or args.baseline} -> {current.get('commit') or args.current}")
+    print(f"\n{'endpoint':<14} {'metric':<10} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, metric, old, new, change, worse in rows:
+        change = "" if change is None else f"{change:+.1%}"
+        print(f"{name:<14} {metric:<10} {old:>10} {new:>10} {change:>8}{'  REGRESSION' if worse else ''}")
+    if regressions:
+        print(f"\n{len(regressions)} regressions (threshold {args.threshold:.0%})")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+def serve_app(args):
+    """Run app.py against the simulator on the given ports (started by `run`)"""
+    import config
+    config.OLT_CONFIG.update({
+        "host": "127.0.0.1",
+        "port": args.olt_port,
+        "ssh_port": args.olt_ssh_port,
+        "transport": args.transport,
+        "client": args.client,
+        "dialect_cache": os.path.join(args.workdir, "olt_dialects.json"),
+    })
+    if args.max_sessions:
+        config.OLT_CONFIG["max_sessions"] = args.max_sessions
+    config.OLT_FLEET = {config.DEFAULT_OLT: {}}
+    config.INVENTORY_DATABASE_URI = "sqlite:///" + os.path.join(args.workdir, "ont_inventory.db")
+    if args.no_cache:
+        config.CACHE_TTLS = {resource: 0 for resource in config.CACHE_TTLS}
+
+    import app
+    app.app.run(host="127.0.0.1", port=args.port, threaded=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency and throughput benchmark of the Flask API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="start the simulator and app.py and benchmark the endpoints")
+    run.add_argument("--requests", type=int, default=50, help="requests per endpoint")
+    run.add_argument("--concurrency", type=int, default=4, help="users sending requests at the same time")
+    run.add_argument("--endpoints", help=f"comma-separated subset of {','.join(ENDPOINTS)}")
+    run.add_argument("--output", help="result file (default benchmark_results/<time>.json)")
+    run.add_argument("--no-cache", action="store_true", help="disable the response cache of the read endpoints")
+    run.add_argument("--client", choices=["sync", "async"], default="sync")
+    run.add_argument("--transport", choices=["telnet", "ssh"], default="telnet")
+    run.add_argument("--max-sessions", type=int, help="OLT sessions of the pool (config.py by default)")
+    run.add_argument("--username", default="admin")
+    run.add_argument("--password", default="admin")
+    run.add_argument("--boards", type=int, default=2)
+    run.add_argument("--ports-per-board", type=int, default=16)
+    run.add_argument("--onts-per-port", type=int, default=32)
+    run.add_argument("--autofind", type=int, help="ONTs in the autofind list (default 2 x --requests)")
+    run.add_argument("--latency", type=float, default=0.02, help="seconds every OLT command takes")
+    run.add_argument("--command-latency", type=parse_latency_option, action="append", default=[],
+                     metavar="COMMAND=SECONDS", help="time of the OLT commands starting with COMMAND (repeatable)")
+    run.add_argument("--login-latency", type=float, default=0.2, help="seconds the OLT password check takes")
+    run.add_argument("--page-size", type=int, default=20)
+
+    diff = commands.add_parser("compare", help="compare two result files and flag regressions")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--threshold", type=float, default=0.2, help="relative change counted as a regression")
+    diff.add_argument("--min-ms", type=float, default=1.0, help="latency changes up to this many ms are noise")
+
+    serve = commands.add_parser("app", help=argparse.SUPPRESS)
+    serve.add_argument("--port", type=int, required=True)
+    serve.add_argument("--olt-port", type=int, required=True)
+    serve.add_argument("--olt-ssh-port", type=int, default=22)
+    serve.add_argument("--workdir", required=True)
+    serve.add_argument("--transport", default="telnet")
+    serve.add_argument("--client", default="sync")
+    serve.add_argument("--max-sessions", type=int)
+    serve.add_argument("--no-cache", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "app":
+        serve_app(args)
+    elif args.command == "compare":
+        sys.exit(compare(args))
+    else:
+        results = run_benchmark(args)
+        print_results(results)
+        output = args.output or os.path.join("benchmark_results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
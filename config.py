@@ -1,7 +1,58 @@
 OLT_CONFIG = {
     "host": "103.160.82.34",
     "port": 3212,
+    "transport": "telnet",  # "ssh" runs CLI sessions as channels of a shared SSH connection
+    "ssh_port": 22,
+    "ssh_channels_per_connection": 4,
     "board": "0/0",
     "prompt": "MA5683T>",
-    "timeout": 10
-}
\ No newline at end of file
+    "timeout": 10,
+    "client": "sync",  # "async" drives sessions on a shared asyncio event loop
+    "max_sessions": 4,
+    "checkout_timeout": 30,
+    "session_trust_window": 30,  # Sessions that showed a prompt this recently skip the liveness probe
+    "liveness_timeout": 2,
+    "pipeline_depth": 16,  # ont add commands per write in batch registration
+    "ports_per_board": 16,  # GPON ports scanned by an inventory refresh
+    "dialect_cache": "olt_dialects.json",  # Command forms each OLT understands, probed once
+    "autofind_interval": 30  # Seconds between background autofind polls while someone listens
+}
+# Every OLT the backend manages. Keys missing here are taken from OLT_CONFIG;
+# each entry may set its own host, port, transport, prompt, prompt_pattern
+# (a regex for the host name part of the prompt) and username/password, the
+# service login used for fleet-wide queries (without one, the web user's OLT
+# login is used). fleet_timeout caps each OLT's share of a fleet query.
+OLT_FLEET = {
+    "default": {},
+    # "olt-2": {"host": "10.0.0.2", "prompt": "OLT-BRANCH>", "username": "ops", "password": "..."},
+}
+
+# Fleet entry that the single-OLT endpoints and /olt-login talk to
+DEFAULT_OLT = "default"
+
+# Local ONT inventory (a relative sqlite path lives in the Flask instance folder)
+INVENTORY_DATABASE_URI = "sqlite:///ont_inventory.db"
+
+# Background jobs (/jobs): operations run at once and jobs allowed to wait behind them
+JOB_WORKERS = 4
+JOB_QUEUE_LIMIT = 50
+
+# Shared response cache of the read endpoints: seconds each resource stays
+# cached (0 disables it) and the memory bound, least recently used dropped first
+CACHE_TTLS = {
+    "board-status": 30,
+    "all-boards": 60,
+    "board-detail": 30,
+    "autofind": 15,
+    "ont-info": 60,
+    "ont-status": 15,
+}
+CACHE_MAX_BYTES = 8 * 1024 * 1024
+# Seconds after a read that its result may still be served while a background
+# refresh runs (stale-while-revalidate); older results are fetched synchronously
+CACHE_MAX_STALE = {
+    "board-status": 300,
+    "all-boards": 600,
+    "board-detail": 300,
+    "ont-status": 120,
+}
@@ -5,6 +5,7 @@ const BoardStatus = () => {
   const [status, setStatus] = useState('');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [age, setAge] = useState(null);
 
   useEffect(() => {
     const fetchStatus = async () => {
@@ -15,6 +16,7 @@ const BoardStatus = () => {
         
         if (response.data.status === 'success') {
           setStatus(response.data.data);
+          setAge(response.data.age);
         } else {
           setError(response.data.message || 'Failed to get board status');
         }
@@ -46,7 +48,10 @@ const BoardStatus = () => {
         ) : error ? (
           <div className="alert alert-danger">{error}</div>
         ) : (
-          <pre style={{ whiteSpace: 'pre-wrap', fontFamily: 'monospace' }}>{status}</pre>
+          <>
+            <pre style={{ whiteSpace: 'pre-wrap', fontFamily: 'monospace' }}>{status}</pre>
+            {age > 0 && <small className="text-muted">Read from the OLT {Math.round(age)}s ago</small>}
+          </>
         )}
       </div>
     </div>
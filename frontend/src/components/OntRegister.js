@@ -19,6 +19,7 @@ const OntRegister = () => {
   const [errorStatus, setErrorStatus] = useState('');
   const [errorVerify, setErrorVerify] = useState('');
   const [errorTest, setErrorTest] = useState('');
+  const [autofindLive, setAutofindLive] = useState(false);
 
   // Registration form state
   const [formData, setFormData] = useState({
@@ -209,6 +210,43 @@ const OntRegister = () => {
     }
   };
 
+  // Turn a parsed autofind record from the API into the shape used by the table
+  const fromParsedOnt = (ont) => ({
+    number: ont.number != null ? String(ont.number) : '',
+    fsp: ont.fsp,
+    serialNumber: ont.sn,
+    vendorId: ont.vendor_id,
+    version: ont.version,
+    softwareVersion: ont.software_version,
+    equipmentId: ont.equipment_id,
+    autofindTime: ont.autofind_time
+  });
+
+  // Live autofind list: the backend polls the OLT once per interval for all
+  // listeners and pushes only the ONTs that appeared or disappeared
+  useEffect(() => {
+    const events = new EventSource('http://localhost:5000/ont-autofind/events', {
+      withCredentials: true
+    });
+    const sameOnt = (a, b) => a.fsp === b.fsp && a.serialNumber === b.serialNumber;
+
+    events.addEventListener('snapshot', (e) => {
+      setParsedOnts(JSON.parse(e.data).onts.map(fromParsedOnt));
+      setAutofindLive(true);
+    });
+    events.addEventListener('added', (e) => {
+      const added = JSON.parse(e.data).onts.map(fromParsedOnt);
+      setParsedOnts(prev => [...prev.filter(ont => !added.some(a => sameOnt(a, ont))), ...added]);
+    });
+    events.addEventListener('removed', (e) => {
+      const removed = JSON.parse(e.data).onts.map(fromParsedOnt);
+      setParsedOnts(prev => prev.filter(ont => !removed.some(r => sameOnt(r, ont))));
+    });
+    events.onerror = () => setAutofindLive(false);
+
+    return () => events.close();
+  }, []);
+
   const handleAutofind = async () => {
     setLoadingAutofind(true);
     setErrorAutofind('');
@@ -286,6 +324,34 @@ const OntRegister = () => {
     }
   };
 
+  // Submit a long OLT operation as a background job and follow its steps as they
+  // finish; resolves with the finished job (its result is the usual response body)
+  const runJob = async (kind, body, onStep) => {
+    const response = await axios.post(`http://localhost:5000/jobs/${kind}`, body, {
+      withCredentials: true
+    });
+    const jobId = response.data.data.id;
+
+    return new Promise((resolve, reject) => {
+      const events = new EventSource(`http://localhost:5000/jobs/${jobId}/events`, {
+        withCredentials: true
+      });
+      events.addEventListener('step', (e) => onStep(JSON.parse(e.data).message));
+      events.addEventListener('done', (e) => {
+        events.close();
+        resolve(JSON.parse(e.data));
+      });
+      events.onerror = () => {
+        // The browser reconnects by itself unless the stream was refused
+        if (events.readyState === EventSource.CLOSED) {
+          reject(new Error('Lost the job progress stream'));
+        }
+      };
+    });
+  };
+
+  const appendLine = (setLog) => (line) => setLog(prev => (prev ? `${prev}\n${line}` : line));
+
   const handleRegister = async (e) => {
     e.preventDefault();
     setLoadingRegister(true);
@@ -293,12 +359,11 @@ const OntRegister = () => {
     setRegistrationLog('');
 
     try {
-      const response = await axios.post('http://localhost:5000/ont-register', formData, {
-        withCredentials: true
-      });
+      const job = await runJob('ont-register', formData, appendLine(setRegistrationLog));
+      const result = job.result || { status: 'error', message: job.error };
       
-      if (response.data.status === 'success') {
-        setRegistrationLog(response.data.data);
+      if (result.status === 'success') {
+        setRegistrationLog(result.data);
         alert('ONT registration completed successfully! Check the log below for details.');
         
         // Auto-fill verification form with same data
@@ -309,8 +374,10 @@ const OntRegister = () => {
           serialNumber: formData.serialNumber
         });
       } else {
-        setRegistrationLog(response.data.data || '');
-        setErrorRegister(response.data.message || 'Failed to register ONT');
+        if (result.data) {
+          setRegistrationLog(result.data);
+        }
+        setErrorRegister(result.message || 'Failed to register ONT');
       }
     } catch (err) {
       if (err.response && err.response.data) {
@@ -333,14 +400,13 @@ const OntRegister = () => {
     setVerificationLog('');
 
     try {
-      const response = await axios.post('http://localhost:5000/ont-verify', verifyFormData, {
-        withCredentials: true
-      });
+      const job = await runJob('ont-verify', verifyFormData, appendLine(setVerificationLog));
+      const result = job.result || { status: 'error', message: job.error };
       
-      if (response.data.status === 'success') {
-        setVerificationLog(response.data.data);
+      if (result.status === 'success') {
+        setVerificationLog(result.data);
       } else {
-        setErrorVerify(response.data.message || 'Failed to verify ONT');
+        setErrorVerify(result.message || 'Failed to verify ONT');
       }
     } catch (err) {
       if (err.response && err.response.data) {
@@ -450,7 +516,10 @@ const OntRegister = () => {
           <h5>ONT Autofind</h5>
         </div>
         <div className="card-body">
-          <p className="text-muted">Discover automatically found ONTs on the OLT</p>
+          <p className="text-muted">
+            Discover automatically found ONTs on the OLT
+            {autofindLive && <span className="badge bg-success ms-2">Live</span>}
+          </p>
           <button 
             className="btn btn-primary"
             onClick={handleAutofind}
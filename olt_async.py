@@ -0,0 +1,639 @@
+import asyncio
+import inspect
+import re
+import threading
+import time
+
+from olt_client import (
+    CLIMode,
+    CLISessionMixin,
+    OLTLoginResult,
+    build_prompt_pattern,
+    PAGER_PATTERN,
+    PARAMETER_PATTERN,
+    CONFIRM_PATTERN,
+    USERNAME_PROMPT_PATTERN,
+    PASSWORD_PROMPT_PATTERN,
+    LOGIN_INVALID_PATTERN,
+    LOGIN_LOCKOUT_PATTERN,
+    PAGER_DISABLE_COMMANDS,
+)
+from olt_dialect import get_dialect_cache
+from olt_stream import IAC, ReceiveBuffer, TelnetDecoder, strip_pager
+from olt_transport import enable_keepalive
+
+
+class AsyncOLTClient(CLISessionMixin):
+    """asyncio counterpart of OLTClient built on asyncio streams
+
+    Offers the same operations with the same return values, but waits on the
+    event loop instead of blocking a thread, so one process can drive many
+    sessions at once. Like OLTClient, a client runs one operation at a time.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.reader = None
+        self.writer = None
+        self.logged_in = False
+        self.last_used = time.time()
+        self.prompt_pattern = build_prompt_pattern(config['prompt'], None, config.get('prompt_pattern'))
+        self.current_prompt = None
+        self.last_prompt_at = None
+        self.mode = None
+        self.interface_board = None
+        self.command_timeout = config.get('command_timeout', config['timeout'])
+        self.paging_disabled = False
+        self.login_timing = {}
+        self.received = ReceiveBuffer()
+        self.telnet = None
+        self.dialects = get_dialect_cache(config.get('dialect_cache'))
+
+    def mark_used(self):
+        """Mark the connection as recently used"""
+        self.last_used = time.time()
+
+    # --- telnet transport -------------------------------------------------
+
+    async def _write(self, data):
+        try:
+            self.writer.write(data.replace(bytes([IAC]), bytes([IAC, IAC])))
+            await self.writer.drain()
+        except OSError:
+            self.logged_in = False
+            raise
+
+    async def expect(self, patterns, timeout=None):
+        """Wait until one of the compiled byte patterns shows up in the received data
+
+        Same contract as OLTClient.expect: returns (index, match, text) as soon as
+        a pattern matches, or index -1 with whatever arrived once the deadline passes.
+        """
+        if timeout is None:
+            timeout = self.command_timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            index, match, end = self.received.search(patterns)
+            if match:
+                return index, match, self.received.consume(end)
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return -1, None, self.received.drain()
+
+            try:
+                chunk = await asyncio.wait_for(self.reader.read(65536), remaining)
+            except asyncio.TimeoutError:
+                continue
+            if not chunk:
+                # The OLT closed the session; it must not be handed out again
+                self.logged_in = False
+                if not len(self.received):
+                    raise EOFError("telnet connection closed")
+                return -1, None, self.received.drain()
+            self.received.feed(self.telnet.decode(chunk))
+
+    # --- CLI primitives ---------------------------------------------------
+
+    async def connect(self, username, password):
+        """Log in as prompts arrive (see OLTClient.connect); phase times go to login_timing"""
+        started = phase_started = time.monotonic()
+        self.login_timing = {}
+
+        def mark(phase):
+            nonlocal phase_started
+            now = time.monotonic()
+            self.login_timing[phase] = round(1000 * (now - phase_started), 1)
+            phase_started = now
+
+        print(f"Attempting to connect to {self.config['host']}:{self.config['port']}")
+        self.paging_disabled = False
+        self.received.clear()
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.config['host'], self.config['port']),
+                self.config['timeout']
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            print(f"Connection error: {str(e)}")
+            return OLTLoginResult.CONNECTION_ERROR
+        enable_keepalive(self.writer.get_extra_info('socket'), self.config)
+        self.telnet = TelnetDecoder(
+            self.writer.write,
+            self.config.get('terminal_width', 512),
+            self.config.get('terminal_height', 0)
+        )
+        mark('connect')
+
+        try:
+            index, _, _ = await self.expect([USERNAME_PROMPT_PATTERN], self.config['timeout'])
+            if index == -1:
+                print("Login timed out waiting for username prompt")
+                return OLTLoginResult.TIMEOUT
+            mark('username_prompt')
+            await self._write(username.encode('ascii') + b"\r\n")
+
+            index, _, _ = await self.expect([PASSWORD_PROMPT_PATTERN], self.config['timeout'])
+            if index == -1:
+                print("Login timed out waiting for password prompt")
+                return OLTLoginResult.TIMEOUT
+            mark('password_prompt')
+            await self._write(password.encode('ascii') + b"\r\n")
+
+            outcomes = [LOGIN_LOCKOUT_PATTERN, LOGIN_INVALID_PATTERN, USERNAME_PROMPT_PATTERN, self.prompt_pattern]
+            index, match, output = await self.expect(outcomes, self.config['timeout'])
+            mark('login_response')
+        except EOFError:
+            print("Connection error: OLT closed the connection during login")
+            return OLTLoginResult.CONNECTION_ERROR
+
+        if index == 0:
+            print("Login failed: OLT is locked due to too many failed attempts")
+            return OLTLoginResult.LOCKOUT
+        elif index in (1, 2):
+            print("Login failed: Invalid credentials detected")
+            return OLTLoginResult.INVALID_CREDENTIALS
+        elif index == 3:
+            print("Login successful: Found CLI prompt")
+            self.logged_in = True
+            self._set_prompt(match.group(0).decode('ascii', errors='ignore').strip())
+            await self.disable_paging()
+            mark('disable_paging')
+            self.login_timing['total'] = round(1000 * (time.monotonic() - started), 1)
+            print(f"Login timing (ms): {self.login_timing}")
+            return OLTLoginResult.SUCCESS
+        else:
+            print(f"Login timed out: {repr(output)}")
+            return OLTLoginResult.TIMEOUT
+
+    async def disable_paging(self):
+        """Switch off the CLI pager for the rest of the session (see OLTClient.disable_paging)"""
+        if self.paging_disabled:
+            return True
+
+        for command in PAGER_DISABLE_COMMANDS:
+            output = await self.send_command(command, timeout=3)
+            if "Unknown command" not in output and "error" not in output.lower():
+                print(f"Paging disabled with '{command}'")
+                self.paging_disabled = True
+                return True
+
+        print("OLT rejected all pager commands, falling back to paging through 'More' prompts")
+        return False
+
+    async def _discard_pending(self):
+        """Drop anything left over from a previous exchange; raises EOFError on a closed socket
+
+        Like OLTClient._discard_pending, this also empties what the stream
+        reader has buffered but not handed out yet, so a reply that arrived after
+        its command timed out cannot pass for the next command's reply.
+        """
+        while True:
+            read = asyncio.ensure_future(self.reader.read(65536))
+            # One turn of the loop: the read only completes if data is already waiting
+            await asyncio.sleep(0)
+            if not read.done():
+                read.cancel()
+                try:
+                    await read
+                except asyncio.CancelledError:
+                    pass
+                break
+            chunk = read.result()
+            if not chunk:
+                self.logged_in = False
+                raise EOFError("telnet connection closed")
+            # Still answer any option negotiation in it
+            self.telnet.decode(chunk)
+        self.received.clear()
+
+    async def send_command(self, command, timeout=None):
+        """Send a command and collect its output up to the next CLI prompt
+
+        Same behaviour as OLTClient.send_command: pager banners get a space,
+        parameter prompts get Enter and a yes/no confirmation ends the read.
+        """
+        if timeout is None:
+            timeout = self.command_timeout
+        deadline = time.monotonic() + timeout
+
+        # Drop anything left over from a previous exchange
+        await self._discard_pending()
+        await self._write(command.encode('ascii') + b"\r\n")
+        _, output = await self._read_reply(command, deadline)
+        return output
+
+    async def _read_reply(self, command, deadline, next_command=None):
+        """Read the reply to one command up to its prompt (see OLTClient._read_reply)"""
+        patterns = [self.prompt_pattern, PAGER_PATTERN, PARAMETER_PATTERN, CONFIRM_PATTERN]
+        if next_command is not None:
+            patterns.insert(0, build_prompt_pattern(self.config['prompt'], next_command, self.config.get('prompt_pattern')))
+
+        output = []
+        while True:
+            index, match, text = await self.expect(patterns, deadline - time.monotonic())
+            output.append(text)
+            if index == -1:
+                print(f"Timed out waiting for prompt after '{command}'")
+                return "timeout", strip_pager("".join(output))
+            pattern = patterns[index]
+            if pattern is PAGER_PATTERN:
+                await self._write(b" ")
+            elif pattern is PARAMETER_PATTERN:
+                if next_command is not None:
+                    return "parameter", strip_pager("".join(output))
+                await self._write(b"\r\n")
+            elif pattern is CONFIRM_PATTERN:
+                return "confirm", strip_pager("".join(output))
+            else:
+                self._set_prompt(match.group(0).decode('ascii', errors='ignore').strip())
+                return "prompt", strip_pager("".join(output))
+
+    async def send_commands(self, commands, timeout=None, continue_from=None):
+        """Pipeline a batch of commands in one write (see OLTClient.send_commands)"""
+        if not commands:
+            return [], None
+        if timeout is None:
+            timeout = self.command_timeout
+        deadline = time.monotonic() + timeout
+
+        # One command at a time while the pager is on (see OLTClient.send_commands)
+        pipelined = self.paging_disabled
+        if pipelined:
+            await self._discard_pending()
+            await self._write(b"".join(command.encode('ascii') + b"\r\n" for command in commands))
+
+        replies = []
+        for i, command in enumerate(commands):
+            next_command = commands[i + 1] if pipelined and i + 1 < len(commands) else None
+            if not pipelined:
+                await self._discard_pending()
+                await self._write(command.encode('ascii') + b"\r\n")
+            status, output = await self._read_reply(command, deadline, next_command)
+            replies.append((command, output))
+            error = self._reply_error(command, output, status)
+            if error and status == "prompt" and continue_from is not None and i >= continue_from:
+                continue
+            if error:
+                print(f"Batch stopped: {error}")
+                await self._drain_replies(commands[i + 1:] if pipelined else [], deadline, status)
+                return replies, error
+        return replies, None
+
+    async def _drain_replies(self, commands, deadline, status):
+        """Read and drop the replies to commands queued behind a failed one"""
+        for i, command in enumerate(commands):
+            if status != "prompt":
+                break
+            next_command = commands[i + 1] if i + 1 < len(commands) else None
+            status, _ = await self._read_reply(command, deadline, next_command)
+        if status != "prompt":
+            self.mode = None
+
+    async def run_in_mode(self, mode, board_id, commands, timeout=None, continue_on_error=False):
+        """Pipeline the change to `mode` together with `commands` (see OLTClient.run_in_mode)"""
+        if self.mode is None:
+            await self.send_command("", timeout=3)
+
+        plan = self._plan_transitions(mode, board_id)
+        transitions = []
+        if plan is None:
+            transitions = await self.enter_mode(mode, board_id)
+            plan = []
+
+        continue_from = len(plan) if continue_on_error else None
+        replies, error = await self.send_commands(plan + list(commands), timeout, continue_from)
+        if error and len(replies) <= len(plan):
+            raise RuntimeError(error)
+        if not error and not self._in_mode(mode, board_id):
+            raise RuntimeError(f"Could not reach {mode.name} mode, prompt is {self.current_prompt}")
+        return transitions + replies[:len(plan)], replies[len(plan):], error
+
+    async def enter_mode(self, mode, board_id=None):
+        """Move the session to the given CLI mode (see OLTClient.enter_mode)"""
+        if self.mode is None:
+            await self.send_command("", timeout=3)
+
+        plan = self._plan_transitions(mode, board_id)
+        if plan is not None:
+            transitions, error = await self.send_commands(plan)
+            if error:
+                raise RuntimeError(error)
+            if not self._in_mode(mode, board_id):
+                raise RuntimeError(f"Could not reach {mode.name} mode, prompt is {self.current_prompt}")
+            return transitions
+
+        transitions = []
+        for _ in range(6):
+            if self._in_mode(mode, board_id):
+                return transitions
+
+            command = self._next_transition(mode, board_id)
+            previous_prompt = self.current_prompt
+            output = await self.send_command(command)
+            transitions.append((command, output))
+
+            if self.current_prompt == previous_prompt:
+                raise RuntimeError(f"'{command}' was rejected at {previous_prompt}: {self._clean_output(output, command)}")
+
+        raise RuntimeError(f"Could not reach {mode.name} mode, prompt is {self.current_prompt}")
+
+    async def is_alive(self, timeout=2):
+        """Cheap liveness probe (see OLTClient.is_alive)"""
+        if not self.logged_in or self.writer is None or self.reader.at_eof():
+            self.logged_in = False
+            return False
+        try:
+            # Raises EOFError if the OLT already closed the connection
+            await self._discard_pending()
+            await self._write(b"\r\n")
+            index, match, _ = await self.expect([self.prompt_pattern], timeout)
+        except (EOFError, OSError):
+            self.logged_in = False
+            return False
+        if index != 0:
+            return False
+        self._set_prompt(match.group(0).decode('ascii', errors='ignore').strip())
+        return True
+
+    async def peer_closed(self):
+        """Whether the OLT has closed the connection, seen without a round trip (see OLTClient.peer_closed)"""
+        if not self.logged_in or self.writer is None:
+            return True
+        try:
+            await self._discard_pending()
+        except (EOFError, OSError):
+            self.logged_in = False
+            return True
+        return False
+
+    # --- operations -------------------------------------------------------
+
+    async def execute_command(self, command, timeout=None):
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        try:
+            output = await self.send_command(command, timeout)
+            return self._clean_output(output, command)
+        except Exception as e:
+            return f"Error executing command: {str(e)}"
+
+    async def get_board_status(self):
+        if not self.logged_in:
+            return "Not logged in to OLT"
+        return await self.execute_command(f"display board {self.config['board']}")
+
+    async def get_all_boards(self):
+        """Get all boards using 'display board 0' command"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+        return await self.execute_command("display board 0")
+
+    async def get_board_detail(self, board_id):
+        """Get detailed status for a specific board"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        if not re.match(r'^\d+/\d+$', board_id):
+            return "Invalid board format. Use format like '0/0'"
+
+        return await self.send_command(f"display board {board_id}")
+
+    async def run_dialect(self, operation, board_id=None, **params):
+        """Run an operation with the first command form this OLT understands (see OLTClient.run_dialect)"""
+        attempts = []
+        for mode, template in self._dialect_variants(operation):
+            command = template.format(**params)
+            await self.enter_mode(CLIMode[mode], board_id or self.config['board'])
+            output = await self.send_command(command)
+            understood = self._record_dialect(operation, (mode, template), output)
+            attempts.append((command, output, understood))
+            if understood:
+                break
+        return attempts
+
+    async def display_ont_autofind_simple(self):
+        """Same as display_ont_autofind_all; the mode is that of the OLT's autofind form (olt_dialect)"""
+        return await self.display_ont_autofind_all()
+
+    async def display_ont_autofind_all(self):
+        """Display all automatically found ONTs"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        command, full_output, _ = (await self.run_dialect("autofind"))[-1]
+        return self._clean_output(full_output, command)
+
+    async def _run_flow(self, flow):
+        """Run a CLISessionMixin flow, awaiting each call it yields, and return its result"""
+        result, error = None, None
+        while True:
+            try:
+                call = flow.throw(error) if error else flow.send(result)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                result = await call()
+            except Exception as e:
+                error = e
+
+    async def register_ont(self, sn, desc):
+        """Legacy ONT registration method (see OLTClient.register_ont)"""
+        return await self._run_flow(self._register_flow(sn, desc))
+
+    async def register_ont_complete(self, board_id, port_id, ont_id, serial_number, description="test", line_profile_id=10, service_profile_id=10, progress=None):
+        """Complete ONT registration flow with detailed logging (see OLTClient.register_ont_complete)"""
+        return await self._run_flow(self._register_complete_flow(
+            board_id, port_id, ont_id, serial_number, description, line_profile_id, service_profile_id, progress))
+
+    async def register_onts_batch(self, onts):
+        """Register many ONTs with one interface session per board (see OLTClient.register_onts_batch)"""
+        return await self._run_flow(self._register_batch_flow(onts))
+
+    async def verify_ont_registration(self, board_id, port_id, ont_id, serial_number, progress=None):
+        """Verify ONT registration by checking if the ONT exists with correct details"""
+        return await self._run_flow(self._verify_flow(board_id, port_id, ont_id, serial_number, progress))
+
+    async def ensure_main_prompt(self):
+        """Ensure we're out of any config context (see OLTClient.ensure_main_prompt)"""
+        return await self._run_flow(self._ensure_main_prompt_flow())
+
+    async def enter_config_mode(self):
+        """Enter configuration mode (enable -> config)"""
+        return await self._run_flow(self._enter_config_mode_flow())
+
+    async def configure_gpon_interface(self, board_id):
+        """Enter GPON interface configuration mode"""
+        return await self._run_flow(self._configure_gpon_interface_flow(board_id))
+
+    async def add_ont(self, port_id, ont_id, serial_number, line_profile_id=10, service_profile_id=10, description="test"):
+        """Add an ONT to the GPON interface"""
+        return await self._run_flow(self._add_ont_flow(port_id, ont_id, serial_number, line_profile_id, service_profile_id, description))
+
+    async def exit_config_mode(self):
+        """Exit configuration mode (quit config contexts until back at the enable prompt)"""
+        return await self._run_flow(self._exit_config_mode_flow())
+
+    async def quit_olt(self):
+        """Send quit command and handle confirmation (see OLTClient.quit_olt)"""
+        return await self._run_flow(self._quit_flow())
+
+    async def confirm_quit(self, confirm=True):
+        """Confirm the quit command"""
+        return await self._run_flow(self._confirm_quit_flow(confirm))
+
+    async def display_ont_autofind_alternative(self):
+        """Try alternative ONT discovery commands (see OLTClient.display_ont_autofind_alternative)"""
+        return await self._run_flow(self._autofind_alternative_flow())
+
+    async def find_ont_by_sn(self, serial_number):
+        """Display the ONT with the given serial number, wherever it is registered"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        await self.enter_mode(CLIMode.CONFIG)
+        command = f"display ont info by-sn {serial_number}"
+        return self._clean_output(await self.send_command(command), command)
+
+    async def display_ont_info_by_desc(self, description):
+        """Display ONT information by description"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        await self.enter_mode(CLIMode.INTERFACE_GPON, self.config['board'])
+        command = f"display ont info by-desc {description}"
+        return self._clean_output(await self.send_command(command), command)
+
+    async def get_ont_status(self, board_id, ont_id, port_id=None):
+        """Get ONT status information (see OLTClient.get_ont_status)"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        if not re.match(r'^\d+/\d+$', board_id):
+            return "Invalid board format. Use format like '0/0'"
+
+        await self.enter_mode(CLIMode.INTERFACE_GPON, board_id)
+        command = f"display ont info {ont_id}" if port_id is None else f"display ont info {port_id} {ont_id}"
+        return self._clean_output(await self.send_command(command), command)
+
+    async def scan_ports(self, board_id, port_ids):
+        """List the ONTs of several ports in one pipelined batch (see OLTClient.scan_ports)"""
+        if not self.logged_in:
+            return {port_id: None for port_id in port_ids}
+
+        commands = [f"display ont info {port_id} all" for port_id in port_ids]
+        _, replies, error = await self.run_in_mode(
+            CLIMode.INTERFACE_GPON, board_id, commands,
+            self.command_timeout * len(commands), continue_on_error=True)
+        return self._scan_results(port_ids, commands, replies, error)
+
+    async def delete_ont(self, board_id, port_id, ont_id):
+        """Delete one ONT from a GPON port; returns (deleted, message)"""
+        if not self.logged_in:
+            return False, "Not logged in to OLT"
+
+        error = self._validate_ont_location(board_id, port_id, ont_id)
+        if error:
+            return False, error
+
+        command = f"ont delete {port_id} {ont_id}"
+        try:
+            _, replies, error = await self.run_in_mode(CLIMode.INTERFACE_GPON, board_id, [command])
+        except RuntimeError as e:
+            return False, str(e)
+        return self._delete_result(command, replies, error)
+
+    async def get_onts_in_port(self, board_id):
+        """Get all ONTs in a specific GPON board"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        if not re.match(r'^\d+/\d+$', board_id):
+            return "Invalid board format. Use format like '0/0'"
+
+        await self.enter_mode(CLIMode.INTERFACE_GPON, board_id)
+        command = "display ont info"
+        return self._clean_output(await self.send_command(command), command)
+
+    async def test_command_sending(self, command):
+        """Send a raw command and return the unprocessed output"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        try:
+            return await self.send_command(command)
+        except Exception as e:
+            return f"Test error: {str(e)}"
+
+    async def close(self):
+        if self.writer:
+            try:
+                self.writer.write(b"quit\n")
+                self.writer.close()
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+        self.logged_in = False
+
+
+class EventLoopThread:
+    """Runs one asyncio event loop in a daemon thread for the sync Flask routes
+
+    Routes submit coroutines with submit() (returns a concurrent.futures.Future)
+    or run() (blocks for the result). All AsyncOLTClient sessions share this loop.
+    """
+
+    def __init__(self, name="olt-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_loop_runner = None
+_loop_runner_lock = threading.Lock()
+
+
+def get_loop_runner():
+    """Return the process-wide event loop thread, starting it on first use"""
+    global _loop_runner
+    with _loop_runner_lock:
+        if _loop_runner is None:
+            _loop_runner = EventLoopThread()
+        return _loop_runner
+
+
+class BlockingOLTClient:
+    """Sync view of an AsyncOLTClient, usable wherever app.py expects an OLTClient
+
+    Coroutine methods are run on the shared event loop and their result is
+    returned; plain attributes and methods are passed straight through.
+    """
+
+    def __init__(self, config, runner=None):
+        self.runner = runner or get_loop_runner()
+        self.client = AsyncOLTClient(config)
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if inspect.iscoroutinefunction(attr):
+            def run_on_loop(*args, **kwargs):
+                return self.runner.run(attr(*args, **kwargs))
+            return run_on_loop
+        return attr
@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def ont_change_tags(board_id, port_id=None, ont_id=None):
+    """Tags of every cached read an ONT added to or deleted from a board can change
+
+    The autofind list and description lookups may change anywhere; the board
+    listing, the port and the ONT's own status only for that location.
+    """
+    tags = ["autofind", "ont-info", f"board:{board_id}"]
+    if port_id is not None:
+        tags.append(f"port:{board_id}/{port_id}")
+    if ont_id is not None:
+        tags.append(f"ont:{board_id}:{ont_id}")
+    return tags
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "expires_at", "stale_until", "size", "tags")
+
+    def __init__(self, value, stored_at, expires_at, stale_until, size, tags):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+        self.tags = tags
+
+
+class ResponseCache:
+    """Read results per OLT with per-resource TTLs, an LRU memory bound and tag invalidation
+
+    Entries are keyed by (olt, resource, args) and shared by every user of the
+    OLT. ttls maps a resource to seconds; resources without a TTL are not
+    cached. Resources in max_stale may be served stale after their TTL, up to
+    that many seconds after they were read, while the caller refreshes them in
+    the background (stale-while-revalidate); past that limit they are misses.
+    When the cached values together exceed max_bytes (their JSON size), the
+    least recently used entries are dropped. Writes invalidate by tag, e.g.
+    ont_change_tags() after an `ont add`.
+
+    A read that started before an invalidation must not store what it read:
+    take a token with begin() before reading and pass it to put(), which
+    ignores the value if the OLT was invalidated in between.
+    """
+
+    def __init__(self, ttls, max_bytes=8 * 1024 * 1024, max_stale=None):
+        self.ttls = dict(ttls)
+        self.max_stale = dict(max_stale or {})
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # least recently used first
+        self._bytes = 0
+        self._generations = {}          # olt -> count of invalidations
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _count(self, resource, metric, n=1):
+        counts = self._metrics.setdefault(resource, {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0,
+                                                     "evictions": 0, "invalidations": 0, "refreshes": 0})
+        counts[metric] += n
+
+    def get(self, olt, resource, args=()):
+        """(value, age in seconds, fresh) of the cached entry, or None on a miss
+
+        fresh is False for a value past its TTL that may still be served while
+        it is refreshed; entries past their staleness limit count as misses.
+        """
+        key = (olt, resource, tuple(args))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.stale_until <= now:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._count(resource, "misses")
+                return None
+            self._entries.move_to_end(key)
+            fresh = entry.expires_at > now
+            self._count(resource, "hits" if fresh else "stale_hits")
+            return entry.value, now - entry.stored_at, fresh
+
+    def start_refresh(self, olt, resource, args=()):
+        """Claim the background refresh of an entry; False if one is already running"""
+        key = (olt, resource, tuple(args))
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._count(resource, "refreshes")
+            return True
+
+    def end_refresh(self, olt, resource, args=()):
+        with self._lock:
+            self._refreshing.discard((olt, resource, tuple(args)))
+
+    def begin(self, olt):
+        """Token for a read about to start (see put)"""
+        with self._lock:
+            return self._generations.get(olt, 0)
+
+    def put(self, olt, resource, args, value, tags=(), token=None):
+        """Store a read result; returns False if it was not stored"""
+        ttl = self.ttls.get(resource)
+        if not ttl:
+            return False
+        key = (olt, resource, tuple(args))
+        size = len(json.dumps(value))
+        now = time.time()
+        with self._lock:
+            if token is not None and token != self._generations.get(olt, 0):
+                return False
+            if size > self.max_bytes:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            stale_until = now + max(ttl, self.max_stale.get(resource, 0))
+            self._entries[key] = _Entry(value, now, now + ttl, stale_until, size, frozenset(tags) | {resource})
+            self._bytes += size
+            self._count(resource, "stores")
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._count(oldest[1], "evictions")
+                self._remove(oldest)
+        return True
+
+    def invalidate(self, olt, tags):
+        """Drop the entries of olt carrying any of tags; returns how many were dropped"""
+        tags = set(tags)
+        with self._lock:
+            self._generations[olt] = self._generations.get(olt, 0) + 1
+            stale = [key for key, entry in self._entries.items() if key[0] == olt and entry.tags & tags]
+            for key in stale:
+                self._count(key[1], "invalidations")
+                self._remove(key)
+        if stale:
+            print(f"Cache: invalidated {len(stale)} entries of {olt} ({', '.join(sorted(tags))})")
+        return len(stale)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def stats(self):
+        with self._lock:
+            metrics = {resource: dict(counts) for resource, counts in self._metrics.items()}
+            for counts in metrics.values():
+                served = counts["hits"] + counts["stale_hits"]
+                lookups = served + counts["misses"]
+                counts["hit_rate"] = round(served / lookups, 3) if lookups else None
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttls": dict(self.ttls),
+                "max_stale": dict(self.max_stale),
+                "refreshing": len(self._refreshing),
+                "resources": metrics,
+            }
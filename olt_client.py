@@ -1,8 +1,77 @@
-import telnetlib
+import select
 import time
 import re
 from enum import Enum
 
+from olt_dialect import command_understood, dialect_key, get_dialect_cache
+from olt_parser import parse_ont_add, parse_ont_info, to_json
+from olt_stream import ReceiveBuffer, clean_output, strip_pager
+from olt_transport import LoginRejected, create_transport
+
+# Banner printed by the MA5683T when a listing does not fit on one screen
+PAGER_BANNER = b"---- More ( Press 'Q' to break ) ----"
+PAGER_PATTERN = re.compile(re.escape(PAGER_BANNER))
+
+# Interactive parameter prompt such as "{ <cr>||<K> }:" shown after some display commands
+PARAMETER_PATTERN = re.compile(rb"\{[^{}\r\n]*\}:\s*$")
+
+# Yes/no confirmation, e.g. "Are you sure to log out? (y/n)[n]:"
+CONFIRM_PATTERN = re.compile(rb"\((?:y/n|Y/N|yes/no)\)(?:\[[a-zA-Z]\])?:?\s*$")
+
+# Login handshake prompts and outcomes
+USERNAME_PROMPT_PATTERN = re.compile(rb">>User name:\s*$")
+PASSWORD_PROMPT_PATTERN = re.compile(rb">>User password:\s*$")
+LOGIN_INVALID_PATTERN = re.compile(rb"Username or password invalid")
+LOGIN_LOCKOUT_PATTERN = re.compile(rb"Reenter times have reached the upper limit")
+
+# Commands that switch off the "More" pager, tried in order until one is accepted
+PAGER_DISABLE_COMMANDS = ["scroll", "screen-length 0 temporary"]
+
+# Start of a CLI error reply, e.g. "  % Unknown command, ..." or "  Failure: The ONT does not exist"
+CLI_ERROR_PATTERN = re.compile(r"^\s*(?:%|Failure\b|Error\b)", re.MULTILINE)
+
+# Highest ONT ID on a GPON port; IDs count from 0
+MAX_ONT_ID = 127
+
+# Start of an ONT listing: the "F/S/P   ONT ..." table header or an "F/S/P : 0/1/0" key/value block
+ONT_LISTING_PATTERN = re.compile(r"^\s*F/S/P\s*(?::|ONT\b)", re.MULTILINE)
+
+
+def build_prompt_pattern(prompt, followed_by=None, hostname_pattern=None):
+    """Compile a regex matching every CLI prompt of the host named in config['prompt']
+
+    Matches the user prompt (MA5683T>), the privileged prompt (MA5683T#) and mode
+    prompts such as MA5683T(config)# or MA5683T(config-if-gpon-0/0)# at the end
+    of the received data. With followed_by, it matches a prompt directly followed
+    by the echo of that command instead, which is where pipelined replies are split.
+    hostname_pattern (config['prompt_pattern']) is a regex used instead of the
+    literal host name, for OLTs whose names differ or change.
+    """
+    if hostname_pattern:
+        pattern = hostname_pattern.encode('ascii')
+    else:
+        pattern = re.escape(prompt.rstrip('>#').strip().encode('ascii'))
+    pattern = rb"(?:" + pattern + rb")(?:\([^()\r\n]+\))?[>#]"
+    if followed_by is None:
+        return re.compile(pattern + rb"\s*$")
+    return re.compile(pattern + rb"(?=[ ]*" + re.escape(followed_by.encode('ascii')) + rb"\r?\n)")
+
+
+def parse_prompt(prompt):
+    """Return (CLIMode, board) for a prompt such as MA5683T(config-if-gpon-0/0)#"""
+    if not prompt:
+        return None, None
+    match = re.search(r"\(([^()]+)\)[>#]$", prompt)
+    if not match:
+        return (CLIMode.USER if prompt.endswith('>') else CLIMode.PRIVILEGED), None
+    context = match.group(1)
+    if context == 'config':
+        return CLIMode.CONFIG, None
+    if context.startswith('config-if-gpon-'):
+        return CLIMode.INTERFACE_GPON, context[len('config-if-gpon-'):]
+    return CLIMode.OTHER, None
+
+
 class OLTLoginResult(Enum):
     SUCCESS = 1
     INVALID_CREDENTIALS = 2
@@ -10,185 +79,327 @@ class OLTLoginResult(Enum):
     CONNECTION_ERROR = 4
     LOCKOUT = 5
 
-class OLTClient:
-    def __init__(self, config):
-        self.config = config
-        self.tn = None
-        self.logged_in = False
-        self.last_used = time.time()
-        
-    def mark_used(self):
-        """Mark the connection as recently used"""
-        self.last_used = time.time()
-        
-    def connect(self, username, password):
-        try:
-            print(f"Attempting to connect to {self.config['host']}:{self.config['port']}")
-            self.tn = telnetlib.Telnet(
-                self.config['host'], 
-                self.config['port'], 
-                timeout=self.config['timeout']
-            )
-            
-            # Handle username prompt
-            try:
-                print("Waiting for username prompt...")
-                self.tn.read_until(b">>User name:", timeout=3)
-            except EOFError:
-                print("Connection error: Could not find username prompt")
-                return OLTLoginResult.CONNECTION_ERROR
-                
-            print(f"Sending username: {username}")
-            self.tn.write(username.encode('ascii') + b"\r\n")
-            
-            # Handle password prompt
-            try:
-                print("Waiting for password prompt...")
-                self.tn.read_until(b">>User password:", timeout=3)
-            except EOFError:
-                print("Connection error: Could not find password prompt")
-                return OLTLoginResult.CONNECTION_ERROR
-                
-            # Send password with proper line ending and delay
-            print("Sending password...")
-            self.tn.write(password.encode('ascii') + b"\r\n")
-            time.sleep(1)  # Increased delay after password
-            
-            # Wait longer for the complete login sequence
-            print("Waiting for login response...")
-            time.sleep(3)
-            
-            # Try reading multiple times to get all output
-            output = ""
-            for i in range(5):  # Increased attempts
-                try:
-                    chunk = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                    output += chunk
-                    time.sleep(0.5)
-                except:
-                    break
-            
-            print(f"Login output received: {repr(output)}")
-            
-            # Check for various success indicators
-            if "Username or password invalid" in output or "Invalid" in output:
-                print("Login failed: Invalid credentials detected")
-                return OLTLoginResult.INVALID_CREDENTIALS
-            elif "Reenter times have reached the upper limit" in output:
-                print("Login failed: OLT is locked due to too many failed attempts")
-                return OLTLoginResult.LOCKOUT
-            elif "MA5683T>" in output:
-                print("Login successful: Found MA5683T prompt")
-                self.logged_in = True
-                return OLTLoginResult.SUCCESS
-            elif "Huawei Integrated Access Software" in output and "MA5683T>" in output:
-                print("Login successful: Found Huawei banner and MA5683T prompt")
-                self.logged_in = True
-                return OLTLoginResult.SUCCESS
-            elif ">>User name:" in output and "MA5683T>" not in output:
-                print("Login failed: Returned to username prompt")
-                return OLTLoginResult.INVALID_CREDENTIALS
+class CLIMode(Enum):
+    USER = 1            # MA5683T>
+    PRIVILEGED = 2      # MA5683T#
+    CONFIG = 3          # MA5683T(config)#
+    INTERFACE_GPON = 4  # MA5683T(config-if-gpon-0/0)#
+    OTHER = 5           # any other nested config context
+
+class StepLog(list):
+    """Result lines of a multi-step operation, each also handed to progress(line) as it is added"""
+
+    def __init__(self, progress=None):
+        super().__init__()
+        self.progress = progress
+
+    def append(self, line):
+        super().append(line)
+        if self.progress:
+            self.progress(line)
+
+
+class CLISessionMixin:
+    """Prompt/mode bookkeeping and output helpers shared by the sync and async clients
+
+    Nothing in here touches the network; subclasses provide send_command and keep
+    current_prompt, mode and interface_board up to date through _set_prompt.
+    """
+
+    def _clean_output(self, output, command):
+        """Remove the command echo, prompt lines and pager leftovers from raw command output"""
+        return clean_output(output, command)
+
+    def _set_prompt(self, prompt):
+        """Record the latest prompt and the CLI mode it implies"""
+        self.current_prompt = prompt
+        # The session answered: the pool may skip its liveness probe for a while
+        self.last_prompt_at = time.monotonic()
+        self.mode, self.interface_board = parse_prompt(prompt)
+
+    def _next_transition(self, mode, board_id, current=None):
+        """Pick the single command that moves the session (or one at `current`) one step toward mode"""
+        current = current or self.mode
+        if current in (CLIMode.INTERFACE_GPON, CLIMode.OTHER):
+            # Also used to switch GPON boards: back to config, then into the other board
+            return "quit"
+        if current == CLIMode.CONFIG:
+            return f"interface gpon {board_id}" if mode == CLIMode.INTERFACE_GPON else "quit"
+        if current == CLIMode.PRIVILEGED:
+            # quit would log out from here, disable drops back to user mode
+            return "disable" if mode == CLIMode.USER else "config"
+        return "enable"
+
+    def _plan_transitions(self, mode, board_id=None):
+        """All commands leading from the last seen prompt to mode, or None if the way is unknown
+
+        The plan can be pipelined because none of its commands asks for confirmation.
+        """
+        current, board = self.mode, self.interface_board
+        plan = []
+        while not (current == mode and (mode != CLIMode.INTERFACE_GPON or board == board_id)):
+            if current in (None, CLIMode.OTHER) or len(plan) == 6:
+                return None
+            command = self._next_transition(mode, board_id, current)
+            plan.append(command)
+            if command == "quit":
+                current = CLIMode.CONFIG if current == CLIMode.INTERFACE_GPON else CLIMode.PRIVILEGED
+            elif command.startswith("interface gpon "):
+                current, board = CLIMode.INTERFACE_GPON, board_id
             else:
-                print(f"Login failed: Unknown response - {repr(output)}")
-                return OLTLoginResult.CONNECTION_ERROR
-                
-        except Exception as e:
-            print(f"Connection error: {str(e)}")
-            return OLTLoginResult.CONNECTION_ERROR
-    
-    def execute_command(self, command, wait_time=1):
+                current = {"enable": CLIMode.PRIVILEGED, "config": CLIMode.CONFIG, "disable": CLIMode.USER}[command]
+        return plan
+
+    def _reply_error(self, command, output, status):
+        """Describe why a pipelined command failed, or return None if its reply is fine"""
+        if status == "prompt" and not CLI_ERROR_PATTERN.search(output):
+            return None
+        reason = {"prompt": "was rejected", "timeout": "timed out", "confirm": "asked for confirmation",
+                  "parameter": "asked for a parameter"}[status]
+        return f"'{command}' {reason}: {self._clean_output(output, command)}"
+
+    def _dialect_variants(self, operation):
+        """Command forms of operation, the one known to work on this OLT first"""
+        return self.dialects.variants(dialect_key(self.config), operation)
+
+    def _record_dialect(self, operation, variant, output):
+        """Note whether the OLT understood a command form; returns that verdict"""
+        understood = command_understood(output)
+        self.dialects.record(dialect_key(self.config), operation, variant, understood)
+        return understood
+
+    def _in_mode(self, mode, board_id=None):
+        if mode == CLIMode.INTERFACE_GPON:
+            return self.mode == mode and self.interface_board == board_id
+        return self.mode == mode
+
+    def _find_ont_details(self, ont_output, board_id, port_id, ont_id, serial_number, results):
+        """Look for the ONT ID, serial number and port of one ONT in OLT output
+
+        Works on `display ont info` listings (key/value blocks or tables, read
+        with olt_parser) and falls back to `ont add` replies ("PortID :5, ONTID :1").
+        Findings are appended to results; returns (ont_found, serial_found, port_found).
+        """
+        fsp = f"{board_id}/{port_id}"
+        onts = [ont for ont in parse_ont_info(ont_output, board_id) if str(ont.ont_id) == str(ont_id)]
+        ont = next((ont for ont in onts if ont.fsp == fsp), onts[0] if onts else None)
+        if ont is not None:
+            ont_found = True
+            serial_found = ont.sn == serial_number.upper()
+            port_found = ont.fsp == fsp
+        else:
+            added = parse_ont_add(ont_output)
+            ont_found = added is not None and str(added[1]) == str(ont_id)
+            serial_found = serial_number.upper() in ont_output.upper()
+            port_found = added is not None and str(added[0]) == str(port_id)
+
+        if ont_found:
+            results.append(f"✅ ONT ID {ont_id} found in output")
+        else:
+            results.append(f"⚠️ ONT ID {ont_id} not found in output")
+
+        if serial_found:
+            results.append(f"✅ Serial number {serial_number} found in output")
+        else:
+            results.append(f"⚠️ Serial number {serial_number} not found in ONT status")
+
+        if port_found:
+            results.append(f"✅ Port {port_id} information found in output")
+        else:
+            results.append(f"⚠️ Port {port_id} information not found in ONT status")
+
+        return ont_found, serial_found, port_found
+
+    def _summarize_verification(self, results, found, port_id, ont_id, serial_number, ont_output):
+        """Append the overall verdict and an excerpt of the OLT output to results"""
+        ont_found, serial_found, port_found = found
+        if ont_found and serial_found and port_found:
+            results.append("")
+            results.append("🎉 ONT Registration Verification: SUCCESS")
+            results.append(f"✅ ONT {ont_id} is properly registered on port {port_id}")
+            results.append(f"✅ Serial number {serial_number} is confirmed")
+        else:
+            results.append("")
+            results.append("⚠️ ONT Registration Verification: PARTIAL SUCCESS")
+            if not ont_found:
+                results.append(f"❌ ONT ID {ont_id} not found")
+            if not serial_found:
+                results.append(f"❌ Serial number {serial_number} not found")
+            if not port_found:
+                results.append(f"❌ Port {port_id} information not found")
+
+        results.append("")
+        results.append("ONT Status Details:")
+        results.append(ont_output[:500] + "..." if len(ont_output) > 500 else ont_output)
+
+    def _validate_registration(self, board_id, port_id, ont_id, serial_number):
+        """Return an error message for invalid registration parameters, or None"""
+        if not serial_number or len(serial_number) < 8:
+            return "Invalid serial number. Must be at least 8 characters."
+
+        return self._validate_ont_location(board_id, port_id, ont_id)
+
+    def _validate_ont_location(self, board_id, port_id, ont_id):
+        """Return an error message for a port or ONT ID this OLT does not have, or None
+
+        Ports count from 0 to config['ports_per_board'] - 1 and ONT IDs from 0
+        to MAX_ONT_ID, as in `display ont info` listings and the inventory.
+        """
+        if not re.match(r'^\d+/\d+$', board_id):
+            return "Invalid board format. Use format like '0/0'"
+
+        ports = self.config.get('ports_per_board', 16)
+        if not port_id.isdigit() or int(port_id) >= ports:
+            return f"Invalid Port ID. Must be between 0 and {ports - 1}."
+
+        if not ont_id.isdigit() or int(ont_id) > MAX_ONT_ID:
+            return f"Invalid ONT ID. Must be between 0 and {MAX_ONT_ID}."
+
+        return None
+
+    def _plan_batch(self, onts):
+        """Validate a batch registration and group it by board, then port
+
+        Returns (outcomes, groups): one outcome dict per requested ONT, in request
+        order, and {board_id: {port_id: [outcome, ...]}} holding the valid ones.
+        Invalid entries are already marked "invalid" in their outcome.
+        """
+        outcomes = []
+        groups = {}
+        for ont in onts:
+            outcome = {
+                "board_id": ont['board_id'],
+                "port_id": ont['port_id'],
+                "ont_id": ont['ont_id'],
+                "serial_number": ont['serial_number'],
+                "description": ont.get('description', 'test'),
+                "line_profile_id": ont.get('line_profile_id', 10),
+                "service_profile_id": ont.get('service_profile_id', 10),
+                "status": None,
+                "message": None,
+                "ont": None,
+            }
+            outcomes.append(outcome)
+            error = self._validate_registration(outcome['board_id'], outcome['port_id'], outcome['ont_id'], outcome['serial_number'])
+            if error:
+                outcome.update(status="invalid", message=error)
+                continue
+            groups.setdefault(outcome['board_id'], {}).setdefault(outcome['port_id'], []).append(outcome)
+        return outcomes, groups
+
+    def _batch_commands(self, port_id, entries):
+        """Split the `ont add` commands of one port into pipelined chunks; the last one ends with the port listing"""
+        depth = self.config.get('pipeline_depth', 16)
+        adds = [
+            f"ont add {port_id} {e['ont_id']} sn-auth {e['serial_number']} omci "
+            f"ont-lineprofile-id {e['line_profile_id']} ont-srvprofile-id {e['service_profile_id']} desc {e['description']}"
+            for e in entries
+        ]
+        chunks = [(entries[i:i + depth], adds[i:i + depth]) for i in range(0, len(adds), depth)]
+        chunks[-1][1].append(f"display ont info {port_id} all")
+        return chunks
+
+    def _record_adds(self, entries, commands, replies, error):
+        """Mark each entry "added" or "failed" from the replies to its `ont add`"""
+        for i, entry in enumerate(entries):
+            if i >= len(replies):
+                entry.update(status="failed", message=error or "Not sent")
+                continue
+            reply_error = self._reply_error(commands[i], replies[i][1], "prompt")
+            if reply_error:
+                entry.update(status="failed", message=reply_error)
+            else:
+                entry.update(status="added", message=self._clean_output(replies[i][1], commands[i]))
+
+    def _record_verification(self, board_id, port_id, entries, listing):
+        """Check every added entry of a port against one `display ont info <port> all` listing"""
+        onts = {}
+        if listing is not None:
+            fsp = f"{board_id}/{port_id}"
+            onts = {ont.ont_id: ont for ont in parse_ont_info(listing, board_id) if ont.fsp == fsp}
+        for entry in entries:
+            if entry['status'] != "added":
+                continue
+            ont = onts.get(int(entry['ont_id']))
+            if listing is None:
+                entry.update(status="unverified", message="Port listing was not received")
+            elif ont is None:
+                entry.update(status="unverified", message=f"ONT {entry['ont_id']} is not in the listing of port {port_id}")
+            elif ont.sn != entry['serial_number'].upper():
+                entry.update(status="unverified", ont=to_json(ont),
+                             message=f"ONT {entry['ont_id']} is listed with serial number {ont.sn}")
+            else:
+                entry.update(status="registered", ont=to_json(ont), message="Registered and verified")
+
+    def _scan_results(self, port_ids, commands, replies, error):
+        """Map the replies of scan_ports to ports; anything but a complete listing becomes None
+
+        A reply counts when it ended at the prompt and either holds the
+        listing's header or says the port has no ONTs. An empty reply, one cut
+        off by a timeout (the failed last reply when error is set) or one
+        without the header is "not received", never "no ONTs".
+        """
+        results = {port_id: None for port_id in port_ids}
+        if error:
+            replies = replies[:-1]
+        for port_id, command, (_, output) in zip(port_ids, commands, replies):
+            if "does not exist" in output and not ONT_LISTING_PATTERN.search(output):
+                results[port_id] = output
+            elif ONT_LISTING_PATTERN.search(output) and not self._reply_error(command, output, "prompt"):
+                results[port_id] = output
+        return results
+
+    def _delete_result(self, command, replies, error):
+        if error:
+            return False, error
+        output = self._clean_output(replies[0][1], command)
+        if re.search(r"success\s*:\s*0\b", output):
+            return False, f"'{command}' did not delete anything: {output}"
+        return True, output
+
+    def _fail_batch(self, entries, message):
+        """Close the outcomes a failure left open: unsent ONTs failed, added ones unverified"""
+        for entry in entries:
+            if entry['status'] is None:
+                entry.update(status="failed", message=message)
+            elif entry['status'] == "added":
+                entry.update(status="unverified", message=f"Added, but not verified: {message}")
+
+    # Multi-step operations, written once for both clients. Each flow is a
+    # generator that yields every session call it needs as a zero-argument
+    # callable and gets its result sent back (or its exception thrown in); the
+    # client's _run_flow makes those calls, blocking or awaited, and returns
+    # what the flow returns.
+
+    def _register_flow(self, sn, desc):
+        """Legacy ONT registration on config['board']; returns the cleaned transcript"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        
+
+        # Mode changes and the add go out in one pipelined write
+        command = f"ont add {self.config['board']} sn-auth {sn} omci ont-lineprofile-id 1 ont-srvprofile-id 1 desc {desc}"
         try:
-            # Clear any leftover text in the buffer first
-            print("Clearing buffer...")
-            self.tn.read_very_eager()
-            time.sleep(0.5)
-            
-            # Wait for the prompt to ensure we're ready
-            try:
-                self.tn.read_until(b"MA5683T>", timeout=2)
-            except:
-                pass  # If no prompt found, continue anyway
-            
-            # Send the command with proper line ending
-            print(f"Sending command: '{command}'")
-            self.tn.write(command.encode('ascii') + b"\r\n")
-            time.sleep(wait_time)
-            
-            # Read the output
-            output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Raw output: {repr(output)}")
-            
-            # Check if we got a prompt asking for input (like display version)
-            if "{" in output and "}" in output and ":" in output:
-                # Send Enter to continue
-                print("Sending Enter to continue...")
-                self.tn.write(b"\r\n")
-                time.sleep(1)
-                additional_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                output += additional_output
-                print(f"Additional output: {repr(additional_output)}")
-            
-            # Clean output by removing command echo and prompt
-            lines = output.split('\r\n')
-            cleaned_lines = []
-            command_found = False
-            
-            for line in lines:
-                if not command_found and command.strip() in line:
-                    command_found = True
-                    continue
-                if line.strip() and not line.strip().startswith('MA5683T>'):
-                    cleaned_lines.append(line)
-            
-            cleaned_output = '\n'.join(cleaned_lines)
-            print(f"Cleaned output: {repr(cleaned_output)}")
-            return cleaned_output.strip()
-        except Exception as e:
-            return f"Error executing command: {str(e)}"
-    
-    def register_ont(self, sn, desc):
-        """Legacy ONT registration method - kept for backward compatibility"""
-        if not self.logged_in:
-            return "Not logged in to OLT"
-            
-        commands = [
-            "enable",
-            "config",
-            f"interface gpon {self.config['board']}",
-            f"ont add {self.config['board']} sn-auth {sn} omci ont-lineprofile-id 1 ont-srvprofile-id 1 desc {desc}",
-            "quit",
-            "quit",
-            "quit"
-        ]
-        
+            transitions, replies, error = yield lambda: self.run_in_mode(CLIMode.INTERFACE_GPON, self.config['board'], [command])
+        except RuntimeError as e:
+            return str(e)
+
         output = ""
-        for cmd in commands:
-            output += self.execute_command(cmd)
-            
+        for cmd, cmd_output in transitions + replies:
+            output += self._clean_output(cmd_output, cmd)
+
         return output
 
-    def register_ont_complete(self, board_id, port_id, ont_id, serial_number, description="test", line_profile_id=10, service_profile_id=10):
-        """Complete ONT registration flow with detailed logging"""
+    def _register_complete_flow(self, board_id, port_id, ont_id, serial_number, description, line_profile_id, service_profile_id, progress):
+        """Add and verify one ONT (see register_ont_complete); returns the step log"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        
+
         # Validate inputs
-        if not re.match(r'^\d+/\d+$', board_id):
-            return "Invalid board format. Use format like '0/0'"
-        
-        if not serial_number or len(serial_number) < 8:
-            return "Invalid serial number. Must be at least 8 characters."
-        
-        if not ont_id.isdigit() or int(ont_id) < 1 or int(ont_id) > 128:
-            return "Invalid ONT ID. Must be between 1 and 128."
-        
-        if not port_id.isdigit() or int(port_id) < 1 or int(port_id) > 16:
-            return "Invalid Port ID. Must be between 1 and 16."
-        
-        results = []
+        error = self._validate_registration(board_id, port_id, ont_id, serial_number)
+        if error:
+            return error
+
+        results = StepLog(progress)
         results.append("=== ONT Registration Process Started ===")
         results.append(f"Board ID: {board_id}")
         results.append(f"Port ID: {port_id}")
@@ -198,1257 +409,976 @@ class OLTClient:
         results.append(f"Line Profile ID: {line_profile_id}")
         results.append(f"Service Profile ID: {service_profile_id}")
         results.append("")
-        
+
+        # Correct MA5683T ONT add command format, verified right away in the same interface context
+        command = f"ont add {port_id} {ont_id} sn-auth {serial_number} omci ont-lineprofile-id {line_profile_id} ont-srvprofile-id {service_profile_id} desc {description}"
+        verify_command = f"display ont info {port_id} {ont_id}"
+
         try:
-            # Step 1: Check current mode and enter enable mode if needed
-            results.append("Step 1: Checking current mode and entering enable mode...")
-            
-            # Clear any existing output
-            self.tn.read_very_eager()
-            time.sleep(1)
-            
-            # Send a simple command to check current prompt
-            self.tn.write(b"\r\n")
-            time.sleep(1)
-            current_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Current prompt check: {repr(current_output)}")
-            
-            # Check if we're already in enable mode
-            if "MA5683T#" in current_output:
-                results.append("✅ Already in enable mode")
-                enable_result = "Already in enable mode"
-            else:
-                # Enter enable mode
-                self.tn.write(b"enable\r\n")
-                time.sleep(2)
-                enable_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                if "Error" in enable_output or "Unknown command" in enable_output:
-                    results.append(f"❌ Failed to enter enable mode: {enable_output}")
-                    return "\n".join(results)
-                results.append("✅ Entered enable mode successfully")
-                enable_result = enable_output
-            
-            # Step 2: Enter config mode
-            results.append("Step 2: Entering configuration mode...")
-            self.tn.write(b"config\r\n")
-            time.sleep(2)
-            config_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            if "Error" in config_output or "Unknown command" in config_output:
-                results.append(f"❌ Failed to enter config mode: {config_output}")
-                return "\n".join(results)
-            results.append("✅ Entered configuration mode successfully")
-            
-            # Step 3: Configure GPON interface
-            results.append(f"Step 3: Configuring GPON interface {board_id}...")
-            gpon_command = f"interface gpon {board_id}"
-            self.tn.write(gpon_command.encode('ascii') + b"\r\n")
-            time.sleep(2)
-            gpon_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            if "Error" in gpon_output or "Unknown command" in gpon_output:
-                results.append(f"❌ Failed to configure GPON interface: {gpon_output}")
+            # Steps 1-5 go out as one pipelined batch: mode changes still needed, add, verify
+            results.append(f"Steps 1-3: Entering GPON interface {board_id} context (current prompt: {self.current_prompt})...")
+            try:
+                transitions, replies, _ = yield lambda: self.run_in_mode(CLIMode.INTERFACE_GPON, board_id, [command, verify_command])
+            except RuntimeError as e:
+                results.append(f"❌ Failed to enter GPON interface {board_id}: {str(e)}")
                 return "\n".join(results)
-            results.append(f"✅ GPON interface {board_id} configured successfully")
-            
+            for step, _ in transitions:
+                results.append(f"✅ {step}")
+            results.append(f"✅ In GPON interface {board_id} context ({len(transitions)} mode changes)")
+
             # Step 4: Add ONT with proper MA5683T command format
             results.append(f"Step 4: Adding ONT {ont_id} on port {port_id}...")
-            
-            # Correct MA5683T ONT add command format
-            command = f"ont add {port_id} {ont_id} sn-auth {serial_number} omci ont-lineprofile-id {line_profile_id} ont-srvprofile-id {service_profile_id} desc {description}"
             results.append(f"Executing command: {command}")
-            
-            self.tn.write(command.encode('ascii') + b"\r\n")
-            time.sleep(5)  # Increased wait time for ONT registration
-            
-            # Read the output
-            ont_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
+
+            ont_output = replies[0][1]
             results.append(f"Command output: {ont_output}")
-            
+
             # Check for success indicators
-            if "Error" in ont_output or "Unknown command" in ont_output or "Failed" in ont_output:
+            if "Error" in ont_output or "Unknown command" in ont_output or "Failed" in ont_output or "Failure" in ont_output:
                 results.append(f"❌ ONT registration failed: {ont_output}")
                 return "\n".join(results)
-            elif "successfully" in ont_output.lower() or "ok" in ont_output.lower():
+            elif "successfully" in ont_output.lower() or "ok" in ont_output.lower() or re.search(r"success\s*:\s*[1-9]", ont_output):
                 results.append(f"✅ ONT {ont_id} registered successfully on port {port_id}")
             else:
                 results.append(f"⚠️ ONT registration completed (check output for details)")
-            
-            # Step 5: Exit config mode (multiple quits to get back to main prompt)
-            results.append("Step 5: Exiting configuration mode...")
-            for i in range(4):  # Usually need 4 quits to get back to main prompt
-                self.tn.write(b"quit\r\n")
-                time.sleep(1)
-                quit_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                results.append(f"Exit {i+1}: {quit_output}")
-                
-                # Check if we're back to main prompt
-                if "MA5683T>" in quit_output:
-                    results.append("✅ Back to main prompt")
-                    break
-            
-            # Step 6: Verify ONT registration
-            results.append("Step 6: Verifying ONT registration...")
-            verification_result = self.verify_ont_registration(board_id, port_id, ont_id, serial_number)
-            if verification_result and "SUCCESS" in verification_result:
+
+            # Step 5: Verify right away in the same interface context, aimed at the new ONT
+            results.append(f"Step 5: Verifying ONT {ont_id} on port {port_id}...")
+            results.append(f"Executing command: {verify_command}")
+            verify_output = replies[1][1] if len(replies) > 1 else (yield lambda: self.send_command(verify_command))
+            ont_found, serial_found, port_found = self._find_ont_details(
+                verify_output, board_id, port_id, ont_id, serial_number, results)
+            if ont_found and serial_found and port_found:
                 results.append("✅ ONT verification successful")
                 results.append("🎉 ONT registration and verification completed successfully!")
             else:
                 results.append("⚠️ ONT verification failed or incomplete")
                 results.append("Note: ONT may be registered but verification failed")
-            
+                results.append(f"Verification output: {self._clean_output(verify_output, verify_command)}")
+
             results.append("")
             results.append("=== ONT Registration Process Completed ===")
-            
+
         except Exception as e:
             results.append(f"❌ Registration process failed with exception: {str(e)}")
             results.append("=== ONT Registration Process Failed ===")
-        
+
         return "\n".join(results)
 
-    def verify_ont_registration(self, board_id, port_id, ont_id, serial_number):
-        """Verify ONT registration by checking if the ONT exists with correct details"""
+    def _register_batch_flow(self, onts):
+        """Add many ONTs, one interface entry per board (see register_onts_batch); returns the outcomes"""
+        outcomes, groups = self._plan_batch(onts)
+        if not self.logged_in:
+            self._fail_batch(outcomes, "Not logged in to OLT")
+            return outcomes
+
+        try:
+            for board_id, ports in groups.items():
+                for port_id, entries in ports.items():
+                    print(f"Batch: registering {len(entries)} ONTs on {board_id}/{port_id}")
+                    listing = None
+                    for chunk, commands in self._batch_commands(port_id, entries):
+                        try:
+                            _, replies, error = yield lambda: self.run_in_mode(
+                                CLIMode.INTERFACE_GPON, board_id, commands,
+                                self.command_timeout * len(commands), continue_on_error=True)
+                        except RuntimeError as e:
+                            self._fail_batch(entries, f"Could not enter GPON interface {board_id}: {str(e)}")
+                            break
+                        self._record_adds(chunk, commands, replies, error)
+                        if len(replies) > len(chunk):
+                            listing = replies[len(chunk)][1]
+                    self._record_verification(board_id, port_id, entries, listing)
+        except Exception as e:
+            self._fail_batch(outcomes, f"Batch registration failed with exception: {str(e)}")
+
+        return outcomes
+
+    def _verify_flow(self, board_id, port_id, ont_id, serial_number, progress):
+        """Check that an ONT is registered as expected (see verify_ont_registration); returns the step log"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        
+
         # Validate inputs
         if not re.match(r'^\d+/\d+$', board_id):
             return "Invalid board format. Use format like '0/0'"
-        
-        results = []
+
+        results = StepLog(progress)
         results.append("=== ONT Registration Verification ===")
-        
+
         try:
-            # Clear any existing output
-            self.tn.read_very_eager()
-            time.sleep(1)
-            
-            # Step 1: Enter enable mode
-            results.append("Step 1: Entering enable mode...")
-            self.tn.write(b"enable\r\n")
-            time.sleep(2)
-            enable_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            if "Error" in enable_output:
-                results.append(f"❌ Failed to enter enable mode: {enable_output}")
-                return "\n".join(results)
-            results.append("✅ Entered enable mode successfully")
-            
-            # Step 2: Enter config mode
-            results.append("Step 2: Entering configuration mode...")
-            self.tn.write(b"config\r\n")
-            time.sleep(2)
-            config_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            if "Error" in config_output:
-                results.append(f"❌ Failed to enter config mode: {config_output}")
-                return "\n".join(results)
-            results.append("✅ Entered configuration mode successfully")
-            
-            # Step 3: Enter GPON interface context
-            results.append(f"Step 3: Entering GPON interface {board_id}...")
-            gpon_command = f"interface gpon {board_id}"
-            self.tn.write(gpon_command.encode('ascii') + b"\r\n")
-            time.sleep(2)
-            gpon_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            if "Error" in gpon_output:
-                results.append(f"❌ Failed to enter GPON interface: {gpon_output}")
+            # Steps 1-3: enable -> config -> interface gpon, skipping the ones we are already past
+            results.append(f"Steps 1-3: Entering GPON interface {board_id}...")
+            try:
+                transitions = yield lambda: self.enter_mode(CLIMode.INTERFACE_GPON, board_id)
+            except RuntimeError as e:
+                results.append(f"❌ Failed to enter GPON interface: {str(e)}")
                 return "\n".join(results)
-            results.append("✅ Entered GPON interface successfully")
-            
+            if transitions:
+                results.append(f"✅ Entered GPON interface successfully ({', '.join(cmd for cmd, _ in transitions)})")
+            else:
+                results.append("✅ Already in GPON interface context")
+
             # Step 4: Display all ONT info to find our ONT
             results.append("Step 4: Retrieving ONT information...")
-            
-            # Try different commands to get ONT information
-            commands_to_try = [
-                "display ont info",
-                "display ont summary",
-                "display ont autofind all",
-                "show ont info",
-                "show ont summary"
-            ]
-            
-            ont_output = ""
-            command_worked = False
-            
-            for cmd in commands_to_try:
+
+            # The first form this OLT understands; after the first call that is the only one sent
+            attempts = yield lambda: self.run_dialect("ont_info", board_id, port_id=port_id, ont_id=ont_id)
+            for cmd, cmd_output, understood in attempts:
                 results.append(f"Trying command: {cmd}")
-                self.tn.write(cmd.encode('ascii') + b"\r\n")
-                time.sleep(3)
-                
-                # Read the output
-                cmd_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                
-                # Check if command worked (no parameter error)
-                if "Parameter error" not in cmd_output and "Unknown command" not in cmd_output:
-                    ont_output = cmd_output
-                    command_worked = True
+                if understood:
                     results.append(f"✅ Command '{cmd}' worked successfully")
-                    break
                 else:
                     results.append(f"❌ Command '{cmd}' failed: {cmd_output[:100]}...")
-            
-            if not command_worked:
+
+            if not attempts[-1][2]:
                 results.append("❌ All ONT display commands failed")
                 results.append("ONT Status Details:")
                 results.append("Unable to retrieve ONT information - all commands failed")
                 return "\n".join(results)
-            
+            ont_output = attempts[-1][1]
+
             results.append("✅ ONT status retrieved successfully")
-            
+
             # Step 5: Parse the output to find our ONT
-            ont_found = False
-            serial_found = False
-            port_found = False
-            
-            # Look for ONT ID in the output (multiple possible formats)
-            ont_id_patterns = [
-                f"ONTID :{ont_id}",
-                f"ONTID : {ont_id}",
-                f"ONT ID :{ont_id}",
-                f"ONT ID : {ont_id}",
-                f"Number : {ont_id}",
-                f"Number :{ont_id}"
-            ]
-            
-            for pattern in ont_id_patterns:
-                if pattern in ont_output:
-                    ont_found = True
-                    results.append(f"✅ ONT ID {ont_id} found in output (pattern: {pattern})")
-                    break
-            
-            if not ont_found:
-                results.append(f"⚠️ ONT ID {ont_id} not found in output")
-            
-            # Look for serial number in the output (multiple possible formats)
-            serial_patterns = [
-                serial_number,
-                f"({serial_number})",
-                f"Ont SN : {serial_number}",
-                f"Ont SN :{serial_number}",
-                f"Serial : {serial_number}",
-                f"Serial :{serial_number}"
-            ]
-            
-            for pattern in serial_patterns:
-                if pattern in ont_output:
-                    serial_found = True
-                    results.append(f"✅ Serial number {serial_number} found in output (pattern: {pattern})")
-                    break
-            
-            if not serial_found:
-                results.append(f"⚠️ Serial number {serial_number} not found in ONT status")
-            
-            # Look for port information (multiple possible formats)
-            port_patterns = [
-                f"PortID :{port_id}",
-                f"PortID : {port_id}",
-                f"Port ID :{port_id}",
-                f"Port ID : {port_id}",
-                f"F/S/P : 0/1/{port_id}",
-                f"F/S/P :0/1/{port_id}"
-            ]
-            
-            for pattern in port_patterns:
-                if pattern in ont_output:
-                    port_found = True
-                    results.append(f"✅ Port {port_id} information found in output (pattern: {pattern})")
-                    break
-            
-            if not port_found:
-                results.append(f"⚠️ Port {port_id} information not found in ONT status")
-            
-            # Step 6: Exit configuration mode
-            results.append("Step 5: Exiting configuration mode...")
-            for i in range(4):
-                self.tn.write(b"quit\r\n")
-                time.sleep(1)
-                quit_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                if "MA5683T>" in quit_output:
-                    results.append("✅ Back to main prompt")
-                    break
-            
-            # Step 7: Overall verification result
-            if ont_found and serial_found and port_found:
-                results.append("")
-                results.append("🎉 ONT Registration Verification: SUCCESS")
-                results.append(f"✅ ONT {ont_id} is properly registered on port {port_id}")
-                results.append(f"✅ Serial number {serial_number} is confirmed")
-            else:
-                results.append("")
-                results.append("⚠️ ONT Registration Verification: PARTIAL SUCCESS")
-                if not ont_found:
-                    results.append(f"❌ ONT ID {ont_id} not found")
-                if not serial_found:
-                    results.append(f"❌ Serial number {serial_number} not found")
-                if not port_found:
-                    results.append(f"❌ Port {port_id} information not found")
-            
-            results.append("")
-            results.append("ONT Status Details:")
-            results.append(ont_output[:500] + "..." if len(ont_output) > 500 else ont_output)
-            
+            found = self._find_ont_details(ont_output, board_id, port_id, ont_id, serial_number, results)
+
+            # Step 6: Overall verification result
+            self._summarize_verification(results, found, port_id, ont_id, serial_number, ont_output)
+
         except Exception as e:
             results.append(f"❌ Verification failed with exception: {str(e)}")
-        
+
         results.append("=== Verification Completed ===")
         return "\n".join(results)
-    
-    def get_board_status(self):
-        if not self.logged_in:
-            return "Not logged in to OLT"
-        return self.execute_command(f"display board {self.config['board']}", 3)
-    
-    def get_all_boards(self):
-        """Get all boards using 'display board 0' command"""
+
+    def _ensure_main_prompt_flow(self):
+        """Leave any config context (see ensure_main_prompt); returns whether that worked"""
+        try:
+            if self.mode is None:
+                # An empty line makes the OLT reprint its current prompt
+                yield lambda: self.send_command("", timeout=2)
+            if self.mode not in (CLIMode.USER, CLIMode.PRIVILEGED):
+                yield lambda: self.enter_mode(CLIMode.PRIVILEGED)
+            return True
+        except Exception:
+            return False
+
+    def _enter_config_mode_flow(self):
+        """enable -> config as far as needed; returns the transitions as text"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        return self.execute_command("display board 0", 3)
-    
 
-    
-    def get_board_detail(self, board_id):
-        """Get detailed status for a specific board with pagination handling"""
+        try:
+            transitions = yield lambda: self.enter_mode(CLIMode.CONFIG)
+        except RuntimeError as e:
+            return f"Failed to enter config mode: {str(e)}"
+
+        if not transitions:
+            return "Already in config mode"
+        return "\n".join(f"{command}: {self._clean_output(output, command)}" for command, output in transitions)
+
+    def _configure_gpon_interface_flow(self, board_id):
+        """Enter the GPON interface of board_id; returns the transitions as text"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        
+
         # Validate board ID format (0/0, 0/1, etc.)
         if not re.match(r'^\d+/\d+$', board_id):
             return "Invalid board format. Use format like '0/0'"
-        
-        # Clear any existing output first
-        self.tn.read_very_eager()
-        
-        # Execute the command directly and handle pagination manually
-        command = f"display board {board_id}"
-        full_output = ""
-        
-        print(f"Executing command: {command}")
-        
-        # Send the initial command
-        self.tn.write(command.encode('ascii') + b"\r\n")
-        time.sleep(3)  # Increased wait time
-        
-        # Read initial output
-        initial_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        full_output += initial_output
-        
-        print(f"Initial output length: {len(initial_output)}")
-        print(f"Contains 'More' prompt: {'---- More ( Press \'Q\' to break ) ----' in initial_output}")
-        
-        # Continue reading if there are "More" prompts
-        max_continues = 10
-        for i in range(max_continues):
-            if "---- More ( Press 'Q' to break ) ----" in full_output:
-                print(f"More prompt detected on iteration {i + 1}, continuing...")
-                
-                # Send space to continue
-                self.tn.write(b" ")
-                time.sleep(3)  # Increased wait time
-                
-                # Read additional output
-                additional_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                full_output += additional_output
-                
-                print(f"Continue {i + 1}, additional output length: {len(additional_output)}")
-                
-                # Check if we've reached the end
-                if "---- More ( Press 'Q' to break ) ----" not in additional_output:
-                    print("Reached end of output")
-                    break
-            else:
-                print("No more prompts found, stopping")
-                break
-        
-        print(f"Total output length: {len(full_output)}")
-        print(f"Output preview: {full_output[:200]}...")
-        return full_output
 
-    def ensure_main_prompt(self):
-        """Ensure we're at the main MA5683T prompt"""
         try:
-            # Try to read until we get the main prompt
-            self.tn.read_until(b"MA5683T>", timeout=2)
-            return True
-        except:
-            # If we don't get the prompt, try sending a few quits to get back
-            for i in range(3):
-                try:
-                    self.tn.write(b"quit\r\n")
-                    time.sleep(1)
-                    self.tn.read_very_eager()
-                except:
-                    pass
-            return False
+            transitions = yield lambda: self.enter_mode(CLIMode.INTERFACE_GPON, board_id)
+        except RuntimeError as e:
+            return str(e)
+        return "\n".join(self._clean_output(output, command) for command, output in transitions)
 
-    def test_command_sending(self, command):
-        """Test method to verify command sending works correctly"""
+    def _add_ont_flow(self, port_id, ont_id, serial_number, line_profile_id, service_profile_id, description):
+        """`ont add` in the current GPON interface; returns the cleaned reply"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        
-        try:
-            print(f"Testing command: '{command}'")
-            print(f"Command bytes: {command.encode('ascii')}")
-            
-            # Clear buffer
-            self.tn.read_very_eager()
-            time.sleep(1)
-            
-            # Send command
-            self.tn.write(command.encode('ascii') + b"\r\n")
-            time.sleep(2)
-            
-            # Read response
-            output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Test output: {repr(output)}")
-            
-            return output
-        except Exception as e:
-            return f"Test error: {str(e)}"
 
-    def display_ont_autofind_all(self):
-        """Display all automatically found ONTs with proper output handling"""
+        # Construct the ONT add command based on the terminal output
+        command = f"ont add {port_id} {ont_id} sn-auth {serial_number} omci ont-lineprofile-id {line_profile_id} ont-srvprofile-id {service_profile_id} desc {description}"
+
+        return (yield lambda: self.execute_command(command))
+
+    def _exit_config_mode_flow(self):
+        """Quit config contexts until back at the enable prompt; returns one line per exit"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        
-        # Ensure we're at the main prompt first
-        print("Ensuring we're at main prompt...")
-        self.ensure_main_prompt()
-        
-        # Clear any existing output first
-        self.tn.read_very_eager()
-        time.sleep(1)  # Wait for buffer to clear
-        
-        # Step 1: Enter enable mode first
-        print("Step 1: Entering enable mode...")
-        self.tn.write(b"enable\r\n")
-        time.sleep(2)
-        
-        # Clear any enable mode output and verify we're in enable mode
-        enable_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Enable mode output: {repr(enable_output)}")
-        
-        # Check if we're in enable mode (should see MA5683T# prompt)
-        if "MA5683T#" not in enable_output:
-            print("Warning: May not be in enable mode, trying to verify...")
-            # Send a test command to check mode
-            self.tn.write(b"show version\r\n")
-            time.sleep(1)
-            test_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Mode test output: {repr(test_output)}")
-        
-        # Step 2: Enter config mode
-        print("Step 2: Entering configuration mode...")
-        self.tn.write(b"config\r\n")
-        time.sleep(2)
-        
-        # Clear any config mode output and verify we're in config mode
-        config_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Config mode output: {repr(config_output)}")
-        
-        # Check if we're in config mode (should see MA5683T(config)# prompt)
-        if "MA5683T(config)#" not in config_output:
-            print("Warning: May not be in config mode, trying to verify...")
-        
-        # Step 3: Enter GPON interface context
-        print("Step 3: Entering GPON interface context...")
-        gpon_command = f"interface gpon {self.config['board']}"
-        print(f"GPON command: '{gpon_command}'")
-        self.tn.write(gpon_command.encode('ascii') + b"\r\n")
-        time.sleep(2)
-        
-        # Clear any interface entry output and verify we're in GPON interface mode
-        interface_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Interface entry output: {repr(interface_output)}")
-        
-        # Check if we're in GPON interface mode (should see MA5683T(config-if-gpon-0/0)# prompt)
-        if "MA5683T(config-if-gpon" not in interface_output:
-            print("Warning: May not be in GPON interface mode, trying to verify...")
-            # Try to get current prompt
-            self.tn.write(b"\r\n")
-            time.sleep(1)
-            prompt_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Current prompt: {repr(prompt_output)}")
-        
-        # Step 4: Execute the autofind command within the GPON interface context
-        # Clear buffer again before sending command
-        self.tn.read_very_eager()
-        time.sleep(1)
-        
-        # Try the command with proper spacing and verification
-        command = "display ont autofind all"  # This IS the correct command
-        full_output = ""
-        
-        print(f"Step 4: Executing command: '{command}'")
-        print(f"Command bytes: {command.encode('ascii')}")
-        
-        # Send the command with explicit line ending and flush
-        command_bytes = command.encode('ascii') + b"\r\n"
-        print(f"Sending command bytes: {command_bytes}")
-        print(f"Command length: {len(command_bytes)}")
-        
-        # Send command with proper spacing
-        self.tn.write(command_bytes)
-        self.tn.sock.settimeout(5)  # Set socket timeout
-        time.sleep(3)  # Wait for response
-        
-        # Read initial output
-        initial_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        full_output += initial_output
-        
-        print(f"Initial output: {repr(initial_output)}")
-        print(f"Initial output length: {len(initial_output)}")
-        print(f"Contains 'More' prompt: {'---- More ( Press \'Q\' to break ) ----' in initial_output}")
-        
-        # Check if we got an error
-        if "Unknown command" in initial_output or "error" in initial_output.lower() or "Parameter error" in initial_output:
-            print("Command error detected, trying alternative approach...")
-            
-            # Clear buffer and try again with step-by-step approach
-            self.tn.read_very_eager()
-            time.sleep(1)
-            
-            # Try sending the command with a different approach - send each word separately
-            print("Trying step-by-step command approach...")
-            self.tn.write(b"display\r\n")
-            time.sleep(1)
-            self.tn.read_very_eager()  # Clear any response
-            
-            self.tn.write(b"ont\r\n")
-            time.sleep(1)
-            self.tn.read_very_eager()  # Clear any response
-            
-            self.tn.write(b"autofind\r\n")
-            time.sleep(1)
-            self.tn.read_very_eager()  # Clear any response
-            
-            self.tn.write(b"all\r\n")
-            time.sleep(3)
-            
-            # Read the output again
-            alternative_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            full_output += alternative_output
-            print(f"Alternative output: {repr(alternative_output)}")
-        
-        # Continue reading if there are "More" prompts
-        max_continues = 10
-        for i in range(max_continues):
-            if "---- More ( Press 'Q' to break ) ----" in full_output:
-                print(f"More prompt detected on iteration {i + 1}, continuing...")
-                
-                # Send space to continue
-                self.tn.write(b" ")
-                time.sleep(2)  # Wait for additional output
-                
-                # Read additional output
-                additional_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                full_output += additional_output
-                
-                print(f"Continue {i + 1}, additional output: {repr(additional_output)}")
-                print(f"Continue {i + 1}, additional output length: {len(additional_output)}")
-                
-                # Check if we've reached the end
-                if "---- More ( Press 'Q' to break ) ----" not in additional_output:
-                    print("Reached end of output")
-                    break
-            else:
-                print("No more prompts found, stopping")
-                break
-        
-        # Step 5: Exit back to main prompt (multiple quits needed)
-        print("Step 5: Exiting configuration mode...")
-        for i in range(4):  # Need more quits to get back to main prompt from enable mode
-            self.tn.write(b"quit\r\n")
-            time.sleep(1)
-            exit_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Exit {i+1} output: {repr(exit_output)}")
-            
-            # Check if we're back to main prompt
-            if "MA5683T>" in exit_output:
-                print("Back to main prompt")
-                break
-        
-        print(f"Total output length: {len(full_output)}")
-        print(f"Total output: {repr(full_output)}")
-        
-        # Clean up the output by removing command echo and prompt
-        lines = full_output.split('\r\n')
-        cleaned_lines = []
-        command_found = False
-        
-        for line in lines:
-            if not command_found and command.strip() in line:
-                command_found = True
-                continue
-            if line.strip() and not line.strip().startswith('MA5683T>') and not line.strip().startswith('MA5683T(config-if-gpon'):
-                cleaned_lines.append(line)
-        
-        cleaned_output = '\n'.join(cleaned_lines)
-        print(f"Cleaned output: {repr(cleaned_output)}")
-        return cleaned_output.strip()
 
-    def display_ont_autofind_simple(self):
-        """Display all automatically found ONTs - simple approach from enable mode"""
+        results = []
+        try:
+            if self.mode is None:
+                yield lambda: self.send_command("", timeout=2)
+            transitions = []
+            if self.mode not in (CLIMode.USER, CLIMode.PRIVILEGED):
+                transitions = yield lambda: self.enter_mode(CLIMode.PRIVILEGED)
+        except RuntimeError as e:
+            return str(e)
+        for i, (command, output) in enumerate(transitions):
+            results.append(f"Exit {i+1}: {self._clean_output(output, command)}")
+
+        return "\n".join(results)
+
+    def _quit_flow(self):
+        """Send quit and report whether the OLT asks for confirmation (see quit_olt)"""
+        print("=== QUIT_OLT METHOD CALLED ===")
+        if not self.logged_in:
+            print("Not logged in to OLT")
+            return {"status": "error", "message": "Not logged in to OLT"}
+
+        try:
+            # From a config context quit only goes up one level, so leave those first
+            yield from self._ensure_main_prompt_flow()
+
+            print("Sending quit command to OLT...")
+            try:
+                output = yield lambda: self.send_command("quit", timeout=2)
+            except EOFError:
+                # The OLT closed the session without asking
+                output = ""
+            print(f"Quit command response: {repr(output)}")
+
+            # Check if confirmation is needed
+            if "Y/N" in output or "y/n" in output or "yes/no" in output:
+                print("Confirmation needed detected")
+                return {"status": "confirmation_needed", "message": "Confirm logout?", "output": output}
+            else:
+                # No confirmation needed, logout successful
+                print("No confirmation needed, logout successful")
+                self.logged_in = False
+                return {"status": "success", "message": "Logged out successfully", "output": output}
+
+        except Exception as e:
+            print(f"Error during quit: {str(e)}")
+            return {"status": "error", "message": f"Error during logout: {str(e)}"}
+
+    def _confirm_quit_flow(self, confirm):
+        """Answer the quit confirmation (see confirm_quit)"""
+        if not self.logged_in:
+            return {"status": "error", "message": "Not logged in to OLT"}
+
+        try:
+            # Send yes or no
+            response = "Y" if confirm else "N"
+            try:
+                output = yield lambda: self.send_command(response, timeout=2)
+            except EOFError:
+                # Expected once the OLT has logged us out
+                output = ""
+            print(f"Confirm quit response: {repr(output)}")
+
+            if confirm:
+                self.logged_in = False
+                return {"status": "success", "message": "Logged out successfully", "output": output}
+            else:
+                return {"status": "cancelled", "message": "Logout cancelled", "output": output}
+
+        except Exception as e:
+            print(f"Error during confirm quit: {str(e)}")
+            return {"status": "error", "message": f"Error during logout confirmation: {str(e)}"}
+
+    def _autofind_alternative_flow(self):
+        """Every autofind form tried until one works (see display_ont_autofind_alternative)"""
         if not self.logged_in:
             return "Not logged in to OLT"
+
+        attempts = yield lambda: self.run_dialect("autofind")
+        command, output, understood = attempts[-1]
+        if understood:
+            return output.strip()
+        return "\n".join(f"--- Command '{command}' failed ---\n{output}" for command, output, _ in attempts).strip()
+
+
+class OLTClient(CLISessionMixin):
+    def __init__(self, config):
+        self.config = config
+        self.transport = None
+        self.logged_in = False
+        self.last_used = time.time()
+        self.prompt_pattern = build_prompt_pattern(config['prompt'], None, config.get('prompt_pattern'))
+        self.current_prompt = None
+        self.last_prompt_at = None
+        self.mode = None
+        self.interface_board = None
+        self.command_timeout = config.get('command_timeout', config['timeout'])
+        self.paging_disabled = False
+        self.login_timing = {}
+        self.received = ReceiveBuffer()
+        self.dialects = get_dialect_cache(config.get('dialect_cache'))
         
-        # Ensure we're at the main prompt first
-        print("Ensuring we're at main prompt...")
-        self.ensure_main_prompt()
-        
-        # Clear any existing output first
-        self.tn.read_very_eager()
-        time.sleep(1)
-        
-        # Step 1: Enter enable mode first
-        print("Step 1: Entering enable mode...")
-        self.tn.write(b"enable\r\n")
-        time.sleep(2)
-        
-        # Clear any enable mode output
-        enable_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Enable mode output: {repr(enable_output)}")
-        
-        # Step 2: Execute the command directly from enable mode
-        print("Step 2: Executing display ont autofind all from enable mode...")
-        command = "display ont autofind all"  # This IS the correct command
-        full_output = ""
-        
-        print(f"Executing command: '{command}'")
-        print(f"Command bytes: {command.encode('ascii')}")
-        
-        # Send the command
-        command_bytes = command.encode('ascii') + b"\r\n"
-        self.tn.write(command_bytes)
-        time.sleep(3)
-        
-        # Read output
-        initial_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        full_output += initial_output
-        
-        print(f"Initial output: {repr(initial_output)}")
-        
-        # Check if we got an error
-        if "Unknown command" in initial_output or "error" in initial_output.lower() or "Parameter error" in initial_output:
-            print("Command failed from enable mode, trying with GPON interface context...")
-            
-            # Clear buffer
-            self.tn.read_very_eager()
-            time.sleep(1)
-            
-            # Try entering GPON interface context
-            print("Entering GPON interface context...")
-            gpon_command = f"interface gpon {self.config['board']}"
-            self.tn.write(gpon_command.encode('ascii') + b"\r\n")
-            time.sleep(2)
-            
-            # Clear interface output
-            self.tn.read_very_eager()
-            
-            # Try the command again
-            print("Trying command again from GPON interface context...")
-            self.tn.write(command_bytes)
-            time.sleep(3)
-            
-            # Read output
-            interface_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            full_output += interface_output
-            print(f"Interface context output: {repr(interface_output)}")
+    def mark_used(self):
+        """Mark the connection as recently used"""
+        self.last_used = time.time()
         
-        # Continue reading if there are "More" prompts
-        max_continues = 10
-        for i in range(max_continues):
-            if "---- More ( Press 'Q' to break ) ----" in full_output:
-                print(f"More prompt detected on iteration {i + 1}, continuing...")
-                
-                # Send space to continue
-                self.tn.write(b" ")
-                time.sleep(2)
-                
-                # Read additional output
-                additional_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                full_output += additional_output
-                
-                print(f"Continue {i + 1}, additional output: {repr(additional_output)}")
-                
-                # Check if we've reached the end
-                if "---- More ( Press 'Q' to break ) ----" not in additional_output:
-                    print("Reached end of output")
-                    break
+    def connect(self, username, password):
+        """Log in, moving on as soon as each prompt or login outcome arrives
+
+        Every phase waits at most config['timeout'] seconds. The time spent in
+        each phase is kept in self.login_timing (milliseconds). Over SSH the
+        credentials are checked by the transport and only the prompt is awaited.
+        """
+        started = phase_started = time.monotonic()
+        self.login_timing = {}
+
+        def mark(phase):
+            nonlocal phase_started
+            now = time.monotonic()
+            self.login_timing[phase] = round(1000 * (now - phase_started), 1)
+            phase_started = now
+
+        try:
+            print(f"Attempting to connect to {self.config['host']}:{self.config['port']}")
+            self.paging_disabled = False
+            self.received.clear()
+            self.transport = None
+            self.transport = create_transport(self.config)
+            self.transport.open(username, password)
+            mark('connect')
+        except LoginRejected as e:
+            print(f"Login failed: Invalid credentials detected ({str(e)})")
+            self.transport.close()
+            return OLTLoginResult.INVALID_CREDENTIALS
+        except Exception as e:
+            print(f"Connection error: {str(e)}")
+            if self.transport:
+                self.transport.close()
+            return OLTLoginResult.CONNECTION_ERROR
+
+        try:
+            result = self._login(username, password, mark)
+        except (EOFError, OSError) as e:
+            print(f"Connection error: OLT closed the connection during login ({str(e)})")
+            result = OLTLoginResult.CONNECTION_ERROR
+
+        if result != OLTLoginResult.SUCCESS:
+            self.transport.close()
+            return result
+        self.disable_paging()
+        mark('disable_paging')
+        self.login_timing['total'] = round(1000 * (time.monotonic() - started), 1)
+        print(f"Login timing (ms): {self.login_timing}")
+        return result
+
+    def _login(self, username, password, mark):
+        """Answer the CLI login prompts (telnet only) and wait for the outcome"""
+        if not self.transport.authenticates:
+            print("Waiting for username prompt...")
+            index, _, _ = self.expect([USERNAME_PROMPT_PATTERN], self.config['timeout'])
+            if index == -1:
+                print("Login timed out waiting for username prompt")
+                return OLTLoginResult.TIMEOUT
+            mark('username_prompt')
+            print(f"Sending username: {username}")
+            self.transport.send(username.encode('ascii') + b"\r\n")
+
+            print("Waiting for password prompt...")
+            index, _, _ = self.expect([PASSWORD_PROMPT_PATTERN], self.config['timeout'])
+            if index == -1:
+                print("Login timed out waiting for password prompt")
+                return OLTLoginResult.TIMEOUT
+            mark('password_prompt')
+            print("Sending password...")
+            self.transport.send(password.encode('ascii') + b"\r\n")
+
+        print("Waiting for login response...")
+        outcomes = [LOGIN_LOCKOUT_PATTERN, LOGIN_INVALID_PATTERN, USERNAME_PROMPT_PATTERN, self.prompt_pattern]
+        index, match, output = self.expect(outcomes, self.config['timeout'])
+        mark('login_response')
+
+        if index == 0:
+            print("Login failed: OLT is locked due to too many failed attempts")
+            return OLTLoginResult.LOCKOUT
+        elif index in (1, 2):
+            print("Login failed: Invalid credentials detected")
+            return OLTLoginResult.INVALID_CREDENTIALS
+        elif index == 3:
+            print("Login successful: Found CLI prompt")
+            self.logged_in = True
+            self._set_prompt(match.group(0).decode('ascii', errors='ignore').strip())
+            return OLTLoginResult.SUCCESS
+        else:
+            print(f"Login timed out: {repr(output)}")
+            return OLTLoginResult.TIMEOUT
+
+    def disable_paging(self):
+        """Switch off the CLI pager for the rest of the session
+
+        Runs once right after login so full listings come back in a single read.
+        Firmware that rejects every command in PAGER_DISABLE_COMMANDS keeps its
+        pager, which send_command still pages through as a fallback.
+        """
+        if self.paging_disabled:
+            return True
+
+        for command in PAGER_DISABLE_COMMANDS:
+            try:
+                output = self.send_command(command, timeout=3)
+            except Exception as e:
+                print(f"Could not disable paging with '{command}': {str(e)}")
+                return False
+            if "Unknown command" not in output and "error" not in output.lower():
+                print(f"Paging disabled with '{command}'")
+                self.paging_disabled = True
+                return True
+
+        print("OLT rejected all pager commands, falling back to paging through 'More' prompts")
+        return False
+
+    def expect(self, patterns, timeout=None):
+        """Wait until one of the compiled byte patterns shows up in the received data
+
+        Returns (index, match, text) with the text decoded.
+        The call returns as soon as the OLT prints a matching pattern; index is -1
+        when the deadline passes first. Only newly received data is searched on
+        each read (see ReceiveBuffer).
+        """
+        if timeout is None:
+            timeout = self.command_timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            index, match, end = self.received.search(patterns)
+            if match:
+                return index, match, self.received.consume(end)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return -1, None, self.received.drain()
+
+            try:
+                readable, _, _ = select.select([self.transport], [], [], remaining)
+                if not readable:
+                    continue
+                chunk = self.transport.recv()
+            except EOFError:
+                # The OLT closed the session; it must not be handed out again
+                self.logged_in = False
+                if not len(self.received):
+                    raise
+                return -1, None, self.received.drain()
+            except OSError:
+                self.logged_in = False
+                raise
+            self.received.feed(chunk)
+
+    def _discard_pending(self):
+        """Drop anything left over from a previous exchange; raises EOFError on a closed socket"""
+        while select.select([self.transport], [], [], 0)[0]:
+            self.transport.recv()
+        self.received.clear()
+
+    def _send_fresh(self, data):
+        """Send data after dropping leftovers; a closed connection also ends the login"""
+        try:
+            self._discard_pending()
+            self.transport.send(data)
+        except (EOFError, OSError):
+            self.logged_in = False
+            raise
+
+    def send_command(self, command, timeout=None):
+        """Send a command and collect its output up to the next CLI prompt
+
+        Pager banners (only seen when disable_paging did not take effect) are
+        answered with a space and interactive parameter prompts with Enter, so the
+        returned text holds the complete listing. A yes/no
+        confirmation ends the read and is left for the caller to answer. The whole
+        exchange shares one deadline of `timeout` seconds (command_timeout by default).
+        """
+        if timeout is None:
+            timeout = self.command_timeout
+        deadline = time.monotonic() + timeout
+
+        # Drop anything left over from a previous exchange
+        self._send_fresh(command.encode('ascii') + b"\r\n")
+        _, output = self._read_reply(command, deadline)
+        return output
+
+    def _read_reply(self, command, deadline, next_command=None):
+        """Read the reply to one command up to its prompt; returns (status, text)
+
+        status is "prompt", "confirm", "timeout", or "parameter" when a parameter
+        prompt shows up while next_command is already queued behind this command
+        (it would be taken as the answer, so nothing is sent). With next_command, a
+        prompt followed by its echo also ends the reply. Pager banners and
+        parameter prompts answered on the way are removed from text (see
+        strip_pager), so a paged listing reads like an unpaged one.
+        """
+        patterns = [self.prompt_pattern, PAGER_PATTERN, PARAMETER_PATTERN, CONFIRM_PATTERN]
+        if next_command is not None:
+            # Checked first: later replies may already sit behind it in the buffer
+            patterns.insert(0, build_prompt_pattern(self.config['prompt'], next_command, self.config.get('prompt_pattern')))
+
+        output = []
+        while True:
+            index, match, text = self.expect(patterns, deadline - time.monotonic())
+            output.append(text)
+            if index == -1:
+                print(f"Timed out waiting for prompt after '{command}'")
+                return "timeout", strip_pager("".join(output))
+            pattern = patterns[index]
+            if pattern is PAGER_PATTERN:
+                self.transport.send(b" ")
+            elif pattern is PARAMETER_PATTERN:
+                if next_command is not None:
+                    return "parameter", strip_pager("".join(output))
+                self.transport.send(b"\r\n")
+            elif pattern is CONFIRM_PATTERN:
+                return "confirm", strip_pager("".join(output))
             else:
-                print("No more prompts found, stopping")
+                self._set_prompt(match.group(0).decode('ascii', errors='ignore').strip())
+                return "prompt", strip_pager("".join(output))
+
+    def send_commands(self, commands, timeout=None, continue_from=None):
+        """Pipeline a batch of commands: one write, replies split at prompt boundaries
+
+        The commands are written back to back and each reply is cut at the prompt
+        followed by the next command's echo, so the batch costs about one round
+        trip instead of one per command. On firmware that kept its pager (see
+        disable_paging) they are sent one at a time instead. Returns (replies, error): the
+        (command, output) pairs up to and including the first failed command
+        (CLI error, interactive prompt or timeout) and a description of that
+        failure, or None.
+
+        Commands after a failed one have already reached the OLT and run in
+        whatever mode it left, so batches should only put commands there that
+        are harmless then; their replies are read and dropped to keep the session
+        in step. Commands must not ask for parameters or confirmation. `timeout`
+        (command_timeout by default) covers the whole batch. With continue_from,
+        a CLI error of commands[continue_from:] does not stop the batch; it is
+        left in the reply for the caller to check.
+        """
+        if not commands:
+            return [], None
+        if timeout is None:
+            timeout = self.command_timeout
+        deadline = time.monotonic() + timeout
+
+        # With the pager on, the space answering a "More" banner would be read as
+        # the start of the next queued command, so each command waits for its predecessor
+        pipelined = self.paging_disabled
+        if pipelined:
+            self._send_fresh(b"".join(command.encode('ascii') + b"\r\n" for command in commands))
+
+        replies = []
+        for i, command in enumerate(commands):
+            next_command = commands[i + 1] if pipelined and i + 1 < len(commands) else None
+            if not pipelined:
+                self._send_fresh(command.encode('ascii') + b"\r\n")
+            status, output = self._read_reply(command, deadline, next_command)
+            replies.append((command, output))
+            error = self._reply_error(command, output, status)
+            if error and status == "prompt" and continue_from is not None and i >= continue_from:
+                continue
+            if error:
+                print(f"Batch stopped: {error}")
+                self._drain_replies(commands[i + 1:] if pipelined else [], deadline, status)
+                return replies, error
+        return replies, None
+
+    def _drain_replies(self, commands, deadline, status):
+        """Read and drop the replies to commands queued behind a failed one"""
+        for i, command in enumerate(commands):
+            if status != "prompt":
                 break
-        
-        # Exit back to main prompt
-        print("Exiting to main prompt...")
-        for i in range(3):  # enable -> main prompt
-            self.tn.write(b"quit\r\n")
-            time.sleep(1)
-            exit_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Exit {i+1} output: {repr(exit_output)}")
-            
-            # Check if we're back to main prompt
-            if "MA5683T>" in exit_output:
-                print("Back to main prompt")
+            next_command = commands[i + 1] if i + 1 < len(commands) else None
+            status, _ = self._read_reply(command, deadline, next_command)
+        if status != "prompt":
+            # Out of step with the OLT: make the next enter_mode ask for the prompt again
+            self.mode = None
+
+    def run_in_mode(self, mode, board_id, commands, timeout=None, continue_on_error=False):
+        """Pipeline the change to `mode` together with `commands`
+
+        Returns (transitions, replies, error) where transitions are the mode
+        changes made, replies the outputs of `commands` and error as in
+        send_commands. Raises RuntimeError when the mode cannot be reached.
+        With continue_on_error, a command rejected by the CLI does not stop the
+        ones after it (a rejected mode change still does).
+        """
+        if self.mode is None:
+            self.send_command("", timeout=3)
+
+        plan = self._plan_transitions(mode, board_id)
+        transitions = []
+        if plan is None:
+            # Unknown context: walk there one confirmed step at a time
+            transitions = self.enter_mode(mode, board_id)
+            plan = []
+
+        continue_from = len(plan) if continue_on_error else None
+        replies, error = self.send_commands(plan + list(commands), timeout, continue_from)
+        if error and len(replies) <= len(plan):
+            raise RuntimeError(error)
+        if not error and not self._in_mode(mode, board_id):
+            raise RuntimeError(f"Could not reach {mode.name} mode, prompt is {self.current_prompt}")
+        return transitions + replies[:len(plan)], replies[len(plan):], error
+
+    def enter_mode(self, mode, board_id=None):
+        """Move the session to the given CLI mode with as few commands as possible
+
+        The current mode is known from the last prompt seen, so nothing is sent when
+        the session is already there; back-to-back operations on the same GPON board
+        stay in its interface context. When the way there is known, all steps are
+        pipelined in one write (see send_commands). Returns the list of (command,
+        output) transitions that were made and raises RuntimeError when a
+        transition is rejected by the OLT.
+        """
+        if self.mode is None:
+            # Nothing seen yet (or the last read timed out): ask the OLT for its prompt
+            self.send_command("", timeout=3)
+
+        plan = self._plan_transitions(mode, board_id)
+        if plan is not None:
+            # Known way from here: send every step in one write
+            transitions, error = self.send_commands(plan)
+            if error:
+                raise RuntimeError(error)
+            if not self._in_mode(mode, board_id):
+                raise RuntimeError(f"Could not reach {mode.name} mode, prompt is {self.current_prompt}")
+            return transitions
+
+        transitions = []
+        for _ in range(6):
+            if self._in_mode(mode, board_id):
+                return transitions
+
+            command = self._next_transition(mode, board_id)
+            previous_prompt = self.current_prompt
+            output = self.send_command(command)
+            transitions.append((command, output))
+
+            if self.current_prompt == previous_prompt:
+                raise RuntimeError(f"'{command}' was rejected at {previous_prompt}: {self._clean_output(output, command)}")
+
+        raise RuntimeError(f"Could not reach {mode.name} mode, prompt is {self.current_prompt}")
+
+    def is_alive(self, timeout=2):
+        """Cheap liveness probe: an empty line has to bring the prompt back within timeout
+
+        A socket the OLT has closed shows up as EOF on the first read, so dead
+        sessions are detected without running a display command.
+        """
+        if not self.logged_in or self.transport is None:
+            return False
+        try:
+            # Raises EOFError if the OLT already closed the connection
+            self._discard_pending()
+            self.transport.send(b"\r\n")
+            index, match, _ = self.expect([self.prompt_pattern], timeout)
+        except (EOFError, OSError):
+            self.logged_in = False
+            return False
+        if index != 0:
+            return False
+        self._set_prompt(match.group(0).decode('ascii', errors='ignore').strip())
+        return True
+
+    def peer_closed(self):
+        """Whether the OLT has closed the connection, seen without a round trip; drops pending data"""
+        if not self.logged_in or self.transport is None:
+            return True
+        try:
+            self._discard_pending()
+        except (EOFError, OSError):
+            self.logged_in = False
+            return True
+        return False
+
+    def execute_command(self, command, timeout=None):
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        try:
+            print(f"Sending command: '{command}'")
+            output = self.send_command(command, timeout)
+            print(f"Raw output: {repr(output)}")
+
+            cleaned_output = self._clean_output(output, command)
+            print(f"Cleaned output: {repr(cleaned_output)}")
+            return cleaned_output
+        except Exception as e:
+            return f"Error executing command: {str(e)}"
+
+    def _run_flow(self, flow):
+        """Run a CLISessionMixin flow, making each call it yields, and return its result"""
+        result, error = None, None
+        while True:
+            try:
+                call = flow.throw(error) if error else flow.send(result)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                result = call()
+            except Exception as e:
+                error = e
+
+    def register_ont(self, sn, desc):
+        """Legacy ONT registration method - kept for backward compatibility"""
+        return self._run_flow(self._register_flow(sn, desc))
+
+    def register_ont_complete(self, board_id, port_id, ont_id, serial_number, description="test", line_profile_id=10, service_profile_id=10, progress=None):
+        """Complete ONT registration flow with detailed logging
+
+        progress, if given, is called with every log line as soon as its step is done.
+        """
+        return self._run_flow(self._register_complete_flow(
+            board_id, port_id, ont_id, serial_number, description, line_profile_id, service_profile_id, progress))
+
+    def register_onts_batch(self, onts):
+        """Register many ONTs with one interface session per board
+
+        onts is a list of dicts with board_id, port_id, ont_id and serial_number
+        (optionally description, line_profile_id and service_profile_id). The
+        ONTs are grouped by board and port: each `interface gpon` is entered once,
+        the `ont add` commands of a port are pipelined (pipeline_depth per write)
+        and the whole port is verified with one `display ont info <port> all`.
+        Returns one outcome dict per ONT in request order, with status
+        "registered", "unverified", "failed" or "invalid" and a message.
+        """
+        return self._run_flow(self._register_batch_flow(onts))
+
+    def verify_ont_registration(self, board_id, port_id, ont_id, serial_number, progress=None):
+        """Verify ONT registration by checking if the ONT exists with correct details
+
+        progress, if given, is called with every log line as soon as its step is done.
+        """
+        return self._run_flow(self._verify_flow(board_id, port_id, ont_id, serial_number, progress))
+
+    def get_board_status(self):
+        if not self.logged_in:
+            return "Not logged in to OLT"
+        return self.execute_command(f"display board {self.config['board']}")
+
+    def get_all_boards(self):
+        """Get all boards using 'display board 0' command"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+        return self.execute_command("display board 0")
+
+    def get_board_detail(self, board_id):
+        """Get detailed status for a specific board with pagination handling"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        # Validate board ID format (0/0, 0/1, etc.)
+        if not re.match(r'^\d+/\d+$', board_id):
+            return "Invalid board format. Use format like '0/0'"
+
+        command = f"display board {board_id}"
+        print(f"Executing command: {command}")
+
+        # send_command pages through "More" prompts until the prompt returns
+        full_output = self.send_command(command)
+
+        print(f"Total output length: {len(full_output)}")
+        print(f"Output preview: {full_output[:200]}...")
+        return full_output
+
+    def ensure_main_prompt(self):
+        """Ensure we're out of any config context (at the MA5683T> or MA5683T# prompt)"""
+        return self._run_flow(self._ensure_main_prompt_flow())
+
+    def test_command_sending(self, command):
+        """Test method to verify command sending works correctly"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        try:
+            print(f"Testing command: '{command}'")
+            print(f"Command bytes: {command.encode('ascii')}")
+
+            output = self.send_command(command)
+            print(f"Test output: {repr(output)}")
+
+            return output
+        except Exception as e:
+            return f"Test error: {str(e)}"
+
+    def run_dialect(self, operation, board_id=None, **params):
+        """Run an operation with the first command form this OLT understands
+
+        The forms are tried in the order of OPERATION_VARIANTS (olt_dialect),
+        starting with the one that worked last time on this OLT, so once it is
+        known a call costs a single command. Each form runs in exactly its own
+        mode, never in whatever mode the session was left in; INTERFACE_GPON
+        forms run on board_id (config['board'] by default). Returns the
+        [(command, output, understood)] of every form sent; the last one is the
+        accepted form unless all failed.
+        """
+        attempts = []
+        for mode, template in self._dialect_variants(operation):
+            command = template.format(**params)
+            self.enter_mode(CLIMode[mode], board_id or self.config['board'])
+            print(f"Executing command: '{command}' ({mode})")
+            output = self.send_command(command)
+            understood = self._record_dialect(operation, (mode, template), output)
+            attempts.append((command, output, understood))
+            if understood:
                 break
-        
+            print(f"Command '{command}' was not understood, trying the next form...")
+        return attempts
+
+    def display_ont_autofind_all(self):
+        """Display all automatically found ONTs with proper output handling"""
+        if not self.logged_in:
+            return "Not logged in to OLT"
+
+        command, full_output, _ = self.run_dialect("autofind")[-1]
         print(f"Total output length: {len(full_output)}")
-        
-        # Clean up the output
-        lines = full_output.split('\r\n')
-        cleaned_lines = []
-        command_found = False
-        
-        for line in lines:
-            if not command_found and command.strip() in line:
-                command_found = True
-                continue
-            if line.strip() and not line.strip().startswith('MA5683T>') and not line.strip().startswith('MA5683T(config-if-gpon'):
-                cleaned_lines.append(line)
-        
-        cleaned_output = '\n'.join(cleaned_lines)
-        print(f"Cleaned output: {repr(cleaned_output)}")
-        return cleaned_output.strip()
+        return self._clean_output(full_output, command)
+
+    def display_ont_autofind_simple(self):
+        """Same as display_ont_autofind_all; the mode is that of the OLT's autofind form (olt_dialect)"""
+        return self.display_ont_autofind_all()
 
     def display_ont_info_by_desc(self, description):
         """Display ONT information by description with proper output handling"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        
-        # Clear any existing output first
-        self.tn.read_very_eager()
-        
-        # Step 1: Enter enable mode first
-        print("Step 1: Entering enable mode...")
-        self.tn.write(b"enable\r\n")
-        time.sleep(2)
-        
-        # Clear any enable mode output
-        enable_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Enable mode output: {repr(enable_output)}")
-        
-        # Step 2: Enter config mode
-        print("Step 2: Entering configuration mode...")
-        self.tn.write(b"config\r\n")
-        time.sleep(2)
-        
-        # Clear any config mode output
-        config_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Config mode output: {repr(config_output)}")
-        
-        # Step 3: Enter GPON interface context
-        print("Step 3: Entering GPON interface context...")
-        gpon_command = f"interface gpon {self.config['board']}"
-        self.tn.write(gpon_command.encode('ascii') + b"\r\n")
-        time.sleep(2)
-        
-        # Clear any interface entry output
-        self.tn.read_very_eager()
-        
+
+        # Steps 1-3: enable -> config -> GPON interface context, as far as still needed
+        self.enter_mode(CLIMode.INTERFACE_GPON, self.config['board'])
+
         # Step 4: Execute the command within the GPON interface context
         command = f"display ont info by-desc {description}"
-        full_output = ""
-        
         print(f"Step 4: Executing command: {command}")
-        
-        # Send the initial command
-        self.tn.write(command.encode('ascii') + b"\r\n")
-        time.sleep(3)  # Wait for response
-        
-        # Read initial output
-        initial_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        full_output += initial_output
-        
-        print(f"Initial output length: {len(initial_output)}")
-        print(f"Contains 'More' prompt: {'---- More ( Press \'Q\' to break ) ----' in initial_output}")
-        
-        # Continue reading if there are "More" prompts
-        max_continues = 10
-        for i in range(max_continues):
-            if "---- More ( Press 'Q' to break ) ----" in full_output:
-                print(f"More prompt detected on iteration {i + 1}, continuing...")
-                
-                # Send space to continue
-                self.tn.write(b" ")
-                time.sleep(2)  # Wait for additional output
-                
-                # Read additional output
-                additional_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                full_output += additional_output
-                
-                print(f"Continue {i + 1}, additional output length: {len(additional_output)}")
-                
-                # Check if we've reached the end
-                if "---- More ( Press 'Q' to break ) ----" not in additional_output:
-                    print("Reached end of output")
-                    break
-            else:
-                print("No more prompts found, stopping")
-                break
-        
-        # Step 5: Exit back to main prompt (multiple quits needed)
-        print("Step 5: Exiting configuration mode...")
-        for i in range(4):  # Need more quits to get back to main prompt from enable mode
-            self.tn.write(b"quit\r\n")
-            time.sleep(1)
-            exit_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Exit {i+1} output: {repr(exit_output)}")
-            
-            # Check if we're back to main prompt
-            if "MA5683T>" in exit_output:
-                print("Back to main prompt")
-                break
-        
+        full_output = self.send_command(command)
+
         print(f"Total output length: {len(full_output)}")
         print(f"Output preview: {full_output[:200]}...")
-        
-        # Clean up the output by removing command echo and prompt
-        lines = full_output.split('\r\n')
-        cleaned_lines = []
-        command_found = False
-        
-        for line in lines:
-            if not command_found and command.strip() in line:
-                command_found = True
-                continue
-            if line.strip() and not line.strip().startswith('MA5683T>') and not line.strip().startswith('MA5683T(config-if-gpon'):
-                cleaned_lines.append(line)
-        
-        cleaned_output = '\n'.join(cleaned_lines)
-        return cleaned_output.strip()
 
-    def enter_config_mode(self):
-        """Enter configuration mode (enable -> config)"""
+        return self._clean_output(full_output, command)
+
+    def find_ont_by_sn(self, serial_number):
+        """Display the ONT with the given serial number, wherever it is registered"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        
-        # First check if we're already in enable mode
-        print("Checking current mode...")
-        self.tn.read_very_eager()  # Clear any existing output
-        
-        # Send a simple command to check current prompt
-        self.tn.write(b"\r\n")
-        time.sleep(1)
-        current_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Current prompt check: {repr(current_output)}")
-        
-        # Check if we're already in enable mode
-        if "MA5683T#" in current_output:
-            print("Already in enable mode, proceeding to config mode...")
-            enable_result = "Already in enable mode"
-        else:
-            # Step 1: Enter enable mode first
-            print("Entering enable mode...")
-            enable_result = self.execute_command("enable", 2)
-            if "Error" in enable_result or "Unknown command" in enable_result:
-                return f"Failed to enter enable mode: {enable_result}"
-        
-        # Step 2: Enter config mode
-        print("Entering config mode...")
-        config_result = self.execute_command("config", 2)
-        if "Error" in config_result or "Unknown command" in config_result:
-            return f"Failed to enter config mode: {config_result}"
-        
-        return f"Enable mode: {enable_result}\nConfig mode: {config_result}"
+
+        # by-sn searches every board, so it runs in config mode
+        self.enter_mode(CLIMode.CONFIG)
+        command = f"display ont info by-sn {serial_number}"
+        print(f"Executing command: {command}")
+        return self._clean_output(self.send_command(command), command)
+
+    def enter_config_mode(self):
+        """Enter configuration mode (enable -> config)"""
+        return self._run_flow(self._enter_config_mode_flow())
 
     def configure_gpon_interface(self, board_id):
         """Enter GPON interface configuration mode"""
-        if not self.logged_in:
-            return "Not logged in to OLT"
-        
-        # Validate board ID format (0/0, 0/1, etc.)
-        if not re.match(r'^\d+/\d+$', board_id):
-            return "Invalid board format. Use format like '0/0'"
-        
-        return self.execute_command(f"interface gpon {board_id}", 2)
+        return self._run_flow(self._configure_gpon_interface_flow(board_id))
 
     def add_ont(self, port_id, ont_id, serial_number, line_profile_id=10, service_profile_id=10, description="test"):
         """Add an ONT to the GPON interface"""
-        if not self.logged_in:
-            return "Not logged in to OLT"
-        
-        # Construct the ONT add command based on the terminal output
-        command = f"ont add {port_id} {ont_id} sn-auth {serial_number} omci ont-lineprofile-id {line_profile_id} ont-srvprofile-id {service_profile_id} desc {description}"
-        
-        return self.execute_command(command, 3)
+        return self._run_flow(self._add_ont_flow(port_id, ont_id, serial_number, line_profile_id, service_profile_id, description))
 
     def exit_config_mode(self):
-        """Exit configuration mode (send multiple quits to get back to main prompt)"""
-        if not self.logged_in:
-            return "Not logged in to OLT"
-        
-        results = []
-        
-        # Need multiple quits to get back to main prompt from enable mode
-        for i in range(4):  # config -> enable -> main prompt
-            result = self.execute_command("quit", 1)
-            results.append(f"Exit {i+1}: {result}")
-            
-            # Check if we're back to main prompt
-            if "MA5683T>" in result:
-                break
-        
-        return "\n".join(results)
+        """Exit configuration mode (quit config contexts until back at the enable prompt)"""
+        return self._run_flow(self._exit_config_mode_flow())
 
-    def get_ont_status(self, board_id, ont_id):
-        """Get ONT status information with proper output handling"""
+    def get_ont_status(self, board_id, ont_id, port_id=None):
+        """Get ONT status information with proper output handling
+
+        With port_id the ONT is addressed exactly (`display ont info <port> <ont>`).
+        """
         if not self.logged_in:
             return "Not logged in to OLT"
-        
+
         # Validate board ID format
         if not re.match(r'^\d+/\d+$', board_id):
             return "Invalid board format. Use format like '0/0'"
-        
-        # Clear any existing output first
-        self.tn.read_very_eager()
-        
-        # Step 1: Enter enable mode first
-        print("Step 1: Entering enable mode...")
-        self.tn.write(b"enable\r\n")
-        time.sleep(2)
-        
-        # Clear any enable mode output
-        enable_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Enable mode output: {repr(enable_output)}")
-        
-        # Step 2: Enter config mode
-        print("Step 2: Entering configuration mode...")
-        self.tn.write(b"config\r\n")
-        time.sleep(2)
-        
-        # Clear any config mode output
-        config_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Config mode output: {repr(config_output)}")
-        
-        # Step 3: Enter GPON interface context
-        print("Step 3: Entering GPON interface context...")
-        gpon_command = f"interface gpon {board_id}"
-        self.tn.write(gpon_command.encode('ascii') + b"\r\n")
-        time.sleep(2)
-        
-        # Clear any interface entry output
-        self.tn.read_very_eager()
-        
+
+        # Steps 1-3: enable -> config -> GPON interface context, as far as still needed
+        self.enter_mode(CLIMode.INTERFACE_GPON, board_id)
+
         # Step 4: Execute the command within the GPON interface context
-        command = f"display ont info {ont_id}"
-        full_output = ""
-        
+        command = f"display ont info {ont_id}" if port_id is None else f"display ont info {port_id} {ont_id}"
         print(f"Step 4: Executing command: {command}")
-        
-        # Send the initial command
-        self.tn.write(command.encode('ascii') + b"\r\n")
-        time.sleep(3)  # Wait for response
-        
-        # Read initial output
-        initial_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        full_output += initial_output
-        
-        print(f"Initial output length: {len(initial_output)}")
-        print(f"Contains 'More' prompt: {'---- More ( Press \'Q\' to break ) ----' in initial_output}")
-        
-        # Continue reading if there are "More" prompts
-        max_continues = 10
-        for i in range(max_continues):
-            if "---- More ( Press 'Q' to break ) ----" in full_output:
-                print(f"More prompt detected on iteration {i + 1}, continuing...")
-                
-                # Send space to continue
-                self.tn.write(b" ")
-                time.sleep(2)  # Wait for additional output
-                
-                # Read additional output
-                additional_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                full_output += additional_output
-                
-                print(f"Continue {i + 1}, additional output length: {len(additional_output)}")
-                
-                # Check if we've reached the end
-                if "---- More ( Press 'Q' to break ) ----" not in additional_output:
-                    print("Reached end of output")
-                    break
-            else:
-                print("No more prompts found, stopping")
-                break
-        
-        # Step 5: Exit back to main prompt (multiple quits needed)
-        print("Step 5: Exiting configuration mode...")
-        for i in range(4):  # Need more quits to get back to main prompt from enable mode
-            self.tn.write(b"quit\r\n")
-            time.sleep(1)
-            exit_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Exit {i+1} output: {repr(exit_output)}")
-            
-            # Check if we're back to main prompt
-            if "MA5683T>" in exit_output:
-                print("Back to main prompt")
-                break
-        
+        full_output = self.send_command(command)
+
         print(f"Total output length: {len(full_output)}")
         print(f"Output preview: {full_output[:200]}...")
-        
-        # Clean up the output by removing command echo and prompt
-        lines = full_output.split('\r\n')
-        cleaned_lines = []
-        command_found = False
-        
-        for line in lines:
-            if not command_found and command.strip() in line:
-                command_found = True
-                continue
-            if line.strip() and not line.strip().startswith('MA5683T>') and not line.strip().startswith('MA5683T(config-if-gpon'):
-                cleaned_lines.append(line)
-        
-        cleaned_output = '\n'.join(cleaned_lines)
-        return cleaned_output.strip()
+
+        return self._clean_output(full_output, command)
+
+    def scan_ports(self, board_id, port_ids):
+        """List the ONTs of several ports of a board in one pipelined batch
+
+        Returns {port_id: output of `display ont info <port> all`}, with None for
+        a port whose listing was not received completely (see _scan_results). A
+        port without ONTs answers "Failure: The ONT does not exist", which is
+        kept, as it is a complete (empty) listing.
+        """
+        if not self.logged_in:
+            return {port_id: None for port_id in port_ids}
+
+        commands = [f"display ont info {port_id} all" for port_id in port_ids]
+        _, replies, error = self.run_in_mode(
+            CLIMode.INTERFACE_GPON, board_id, commands,
+            self.command_timeout * len(commands), continue_on_error=True)
+        return self._scan_results(port_ids, commands, replies, error)
+
+    def delete_ont(self, board_id, port_id, ont_id):
+        """Delete one ONT from a GPON port; returns (deleted, message)"""
+        if not self.logged_in:
+            return False, "Not logged in to OLT"
+
+        error = self._validate_ont_location(board_id, port_id, ont_id)
+        if error:
+            return False, error
+
+        command = f"ont delete {port_id} {ont_id}"
+        try:
+            _, replies, error = self.run_in_mode(CLIMode.INTERFACE_GPON, board_id, [command])
+        except RuntimeError as e:
+            return False, str(e)
+        return self._delete_result(command, replies, error)
 
     def get_onts_in_port(self, board_id):
         """Get all ONTs in a specific port with proper output handling"""
         if not self.logged_in:
             return "Not logged in to OLT"
-        
+
         # Validate board ID format
         if not re.match(r'^\d+/\d+$', board_id):
             return "Invalid board format. Use format like '0/0'"
-        
-        # Clear any existing output first
-        self.tn.read_very_eager()
-        
-        # Step 1: Enter enable mode first
-        print("Step 1: Entering enable mode...")
-        self.tn.write(b"enable\r\n")
-        time.sleep(2)
-        
-        # Clear any enable mode output
-        enable_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Enable mode output: {repr(enable_output)}")
-        
-        # Step 2: Enter config mode
-        print("Step 2: Entering configuration mode...")
-        self.tn.write(b"config\r\n")
-        time.sleep(2)
-        
-        # Clear any config mode output
-        config_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Config mode output: {repr(config_output)}")
-        
-        # Step 3: Enter GPON interface context
-        print("Step 3: Entering GPON interface context...")
-        gpon_command = f"interface gpon {board_id}"
-        self.tn.write(gpon_command.encode('ascii') + b"\r\n")
-        time.sleep(2)
-        
-        # Clear any interface entry output
-        self.tn.read_very_eager()
-        
+
+        # Steps 1-3: enable -> config -> GPON interface context, as far as still needed
+        self.enter_mode(CLIMode.INTERFACE_GPON, board_id)
+
         # Step 4: Execute the command within the GPON interface context
         command = "display ont info"
-        full_output = ""
-        
         print(f"Step 4: Executing command: {command}")
-        
-        # Send the initial command
-        self.tn.write(command.encode('ascii') + b"\r\n")
-        time.sleep(3)  # Wait for response
-        
-        # Read initial output
-        initial_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        full_output += initial_output
-        
-        print(f"Initial output length: {len(initial_output)}")
-        print(f"Contains 'More' prompt: {'---- More ( Press \'Q\' to break ) ----' in initial_output}")
-        
-        # Continue reading if there are "More" prompts
-        max_continues = 10
-        for i in range(max_continues):
-            if "---- More ( Press 'Q' to break ) ----" in full_output:
-                print(f"More prompt detected on iteration {i + 1}, continuing...")
-                
-                # Send space to continue
-                self.tn.write(b" ")
-                time.sleep(2)  # Wait for additional output
-                
-                # Read additional output
-                additional_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-                full_output += additional_output
-                
-                print(f"Continue {i + 1}, additional output length: {len(additional_output)}")
-                
-                # Check if we've reached the end
-                if "---- More ( Press 'Q' to break ) ----" not in additional_output:
-                    print("Reached end of output")
-                    break
-            else:
-                print("No more prompts found, stopping")
-                break
-        
-        # Step 5: Exit back to main prompt (multiple quits needed)
-        print("Step 5: Exiting configuration mode...")
-        for i in range(4):  # Need more quits to get back to main prompt from enable mode
-            self.tn.write(b"quit\r\n")
-            time.sleep(1)
-            exit_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Exit {i+1} output: {repr(exit_output)}")
-            
-            # Check if we're back to main prompt
-            if "MA5683T>" in exit_output:
-                print("Back to main prompt")
-                break
-        
+        full_output = self.send_command(command)
+
         print(f"Total output length: {len(full_output)}")
         print(f"Output preview: {full_output[:200]}...")
-        
-        # Clean up the output by removing command echo and prompt
-        lines = full_output.split('\r\n')
-        cleaned_lines = []
-        command_found = False
-        
-        for line in lines:
-            if not command_found and command.strip() in line:
-                command_found = True
-                continue
-            if line.strip() and not line.strip().startswith('MA5683T>') and not line.strip().startswith('MA5683T(config-if-gpon'):
-                cleaned_lines.append(line)
-        
-        cleaned_output = '\n'.join(cleaned_lines)
-        return cleaned_output.strip()
-    
+
+        return self._clean_output(full_output, command)
+
     def quit_olt(self):
         """Send quit command and handle confirmation"""
-        print("=== QUIT_OLT METHOD CALLED ===")
-        if not self.logged_in:
-            print("Not logged in to OLT")
-            return {"status": "error", "message": "Not logged in to OLT"}
-            
-        try:
-            print("Sending quit command to OLT...")
-            # Send quit command
-            self.tn.write(b"quit\n")
-            time.sleep(1)
-            
-            # Read the response
-            output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Quit command response: {repr(output)}")
-            
-            # Check if confirmation is needed
-            if "Y/N" in output or "y/n" in output or "yes/no" in output:
-                print("Confirmation needed detected")
-                return {"status": "confirmation_needed", "message": "Confirm logout?", "output": output}
-            else:
-                # No confirmation needed, logout successful
-                print("No confirmation needed, logout successful")
-                self.logged_in = False
-                return {"status": "success", "message": "Logged out successfully", "output": output}
-                
-        except Exception as e:
-            print(f"Error during quit: {str(e)}")
-            return {"status": "error", "message": f"Error during logout: {str(e)}"}
-    
+        return self._run_flow(self._quit_flow())
+
     def confirm_quit(self, confirm=True):
         """Confirm the quit command"""
-        if not self.logged_in:
-            return {"status": "error", "message": "Not logged in to OLT"}
-            
-        try:
-            # Send yes or no
-            response = "Y" if confirm else "N"
-            self.tn.write(response.encode('ascii') + b"\n")
-            time.sleep(1)
-            
-            # Read the final response
-            output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Confirm quit response: {repr(output)}")
-            
-            if confirm:
-                self.logged_in = False
-                return {"status": "success", "message": "Logged out successfully", "output": output}
-            else:
-                return {"status": "cancelled", "message": "Logout cancelled", "output": output}
-                
-        except Exception as e:
-            print(f"Error during confirm quit: {str(e)}")
-            return {"status": "error", "message": f"Error during logout confirmation: {str(e)}"}
-    
+        return self._run_flow(self._confirm_quit_flow(confirm))
+
     def close(self):
-        if self.tn:
+        if self.transport:
             try:
-                self.tn.write(b"quit\n")
+                self.transport.send(b"quit\n")
             except:
                 pass
-            self.tn.close()
+            self.transport.close()
+            self.transport = None
         self.logged_in = False
 
     def display_ont_autofind_alternative(self):
         """Try alternative ONT discovery commands for MA5683T"""
-        if not self.logged_in:
-            return "Not logged in to OLT"
-        
-        # Ensure we're at the main prompt first
-        print("Ensuring we're at main prompt...")
-        self.ensure_main_prompt()
-        
-        # Clear any existing output first
-        self.tn.read_very_eager()
-        time.sleep(1)
-        
-        # Step 1: Enter enable mode first
-        print("Step 1: Entering enable mode...")
-        self.tn.write(b"enable\r\n")
-        time.sleep(2)
-        
-        # Clear any enable mode output
-        enable_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-        print(f"Enable mode output: {repr(enable_output)}")
-        
-        # Step 2: Try different ONT discovery commands
-        commands_to_try = [
-            "display ont autofind",
-            "display ont info",
-            "display ont summary",
-            "display ont autofind all",
-            "show ont autofind",
-            "show ont info"
-        ]
-        
-        full_output = ""
-        
-        for i, command in enumerate(commands_to_try):
-            print(f"Trying command {i+1}: '{command}'")
-            
-            # Clear buffer
-            self.tn.read_very_eager()
-            time.sleep(1)
-            
-            # Send command
-            command_bytes = command.encode('ascii') + b"\r\n"
-            self.tn.write(command_bytes)
-            time.sleep(3)
-            
-            # Read output
-            output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Command '{command}' output: {repr(output)}")
-            
-            # Check if command worked (no error messages)
-            if ("Unknown command" not in output and 
-                "error" not in output.lower() and 
-                "Parameter error" not in output and
-                len(output.strip()) > 0):
-                print(f"Command '{command}' worked!")
-                full_output = output
-                break
-            else:
-                print(f"Command '{command}' failed, trying next...")
-                full_output += f"\n--- Command '{command}' failed ---\n{output}\n"
-        
-        # Exit back to main prompt
-        print("Exiting to main prompt...")
-        for i in range(3):  # enable -> main prompt
-            self.tn.write(b"quit\r\n")
-            time.sleep(1)
-            exit_output = self.tn.read_very_eager().decode('ascii', errors='ignore')
-            print(f"Exit {i+1} output: {repr(exit_output)}")
-            
-            # Check if we're back to main prompt
-            if "MA5683T>" in exit_output:
-                print("Back to main prompt")
-                break
-        
-        print(f"Total output length: {len(full_output)}")
-        return full_output.strip()
-
-        
\ No newline at end of file
+        return self._run_flow(self._autofind_alternative_flow())
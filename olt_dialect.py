@@ -0,0 +1,128 @@
+import json
+import os
+import re
+import threading
+import time
+
+# Replies meaning the OLT does not understand a command form at all, as opposed
+# to a valid command with an empty or negative answer ("Failure: The ONT does not exist")
+DIALECT_ERROR_PATTERN = re.compile(r"Unknown command|Parameter error|Incomplete command|Too many parameters")
+
+# Command forms tried for each operation, in order, as (CLI mode name, command
+# template). The session is moved to exactly that mode before the command runs,
+# since what a display command lists can depend on the mode it is run in;
+# {placeholders} are filled in by the caller.
+# Autofind is tried in privileged mode first, where it lists every board, then
+# in config mode and last inside a GPON interface for firmware that only
+# accepts it there (that list may only cover the interface's board).
+OPERATION_VARIANTS = {
+    "autofind": [
+        ("PRIVILEGED", "display ont autofind all"),
+        ("PRIVILEGED", "display ont autofind"),
+        ("PRIVILEGED", "show ont autofind"),
+        ("CONFIG", "display ont autofind all"),
+        ("INTERFACE_GPON", "display ont autofind all"),
+    ],
+    "ont_info": [
+        ("INTERFACE_GPON", "display ont info {port_id} {ont_id}"),
+        ("INTERFACE_GPON", "display ont info {port_id} all"),
+        ("INTERFACE_GPON", "display ont info"),
+        ("INTERFACE_GPON", "display ont summary"),
+        ("INTERFACE_GPON", "show ont info"),
+        ("INTERFACE_GPON", "show ont summary"),
+    ],
+}
+
+
+def dialect_key(olt_config):
+    """The OLT a dialect belongs to: its address as the client reaches it"""
+    port = olt_config['ssh_port'] if olt_config.get('transport') == 'ssh' else olt_config['port']
+    return f"{olt_config['host']}:{port}"
+
+
+def command_understood(output):
+    return not DIALECT_ERROR_PATTERN.search(output)
+
+
+class DialectCache:
+    """Which command form of each operation an OLT understands
+
+    Probing runs the forms of OPERATION_VARIANTS in order until one is accepted;
+    the accepted form is remembered per OLT and tried first from then on, so the
+    dead ends are paid once per OLT instead of on every call. If a remembered
+    form stops working (e.g. after a firmware upgrade) it is forgotten and the
+    next call probes again. With a path, the cache is kept in that JSON file and
+    survives restarts.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dialects = self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable dialect cache {self.path}: {str(e)}")
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(self._dialects, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not write dialect cache {self.path}: {str(e)}")
+
+    def variants(self, olt, operation):
+        """The (mode, template) forms of operation in the order to try them on olt"""
+        variants = OPERATION_VARIANTS[operation]
+        with self._lock:
+            known = self._dialects.get(olt, {}).get(operation)
+        if known:
+            known = (known['mode'], known['command'])
+            if known in variants:
+                return [known] + [variant for variant in variants if variant != known]
+        return list(variants)
+
+    def for_olt(self, olt):
+        """{operation: {"mode", "command", "probed_at"}} of the forms known to work on olt"""
+        with self._lock:
+            return {operation: dict(known) for operation, known in self._dialects.get(olt, {}).items()}
+
+    def record(self, olt, operation, variant, understood):
+        """Remember an accepted form, or forget a remembered form that was rejected"""
+        mode, command = variant
+        with self._lock:
+            operations = self._dialects.setdefault(olt, {})
+            known = operations.get(operation)
+            if understood:
+                if known and (known['mode'], known['command']) == variant:
+                    return
+                operations[operation] = {"mode": mode, "command": command, "probed_at": time.time()}
+                print(f"Dialect of {olt}: '{operation}' works as '{command}' in {mode} mode")
+            elif known and (known['mode'], known['command']) == variant:
+                del operations[operation]
+                print(f"Dialect of {olt}: '{command}' no longer works for '{operation}', probing again")
+            else:
+                return
+            self._save()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_dialect_cache(path=None):
+    """Process-wide DialectCache for a file, shared by every client that uses it"""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = DialectCache(path)
+        return _caches[path]
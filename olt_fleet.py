@@ -0,0 +1,129 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from olt_dialect import dialect_key, get_dialect_cache
+from olt_pool import OLTConnectionPool
+
+
+class OLTReplyError(Exception):
+    """Raised by a fleet operation when its OLT answered with an error; the session stays usable"""
+
+
+class OLTFleet:
+    """Registry of the OLTs the backend manages, one session pool per OLT
+
+    fleet_config maps an OLT name to its settings (host, port, transport,
+    prompt, prompt_pattern, optional username/password, ...); missing keys
+    are taken from defaults. Fleet-wide operations run on every OLT at once,
+    so a query costs the time of the slowest OLT instead of the sum, and an
+    OLT that fails or misses its timeout only drops out of the result.
+    """
+
+    def __init__(self, fleet_config, defaults, client_factory, health_check=None):
+        self.configs = {}
+        self.pools = {}
+        for name, olt_config in fleet_config.items():
+            merged = dict(defaults)
+            merged.update(olt_config)
+            merged['name'] = name
+            self.configs[name] = merged
+            self.pools[name] = OLTConnectionPool(
+                lambda merged=merged: client_factory(merged),
+                max_sessions=merged.get('max_sessions', 4),
+                checkout_timeout=merged.get('checkout_timeout', 30),
+                health_check=health_check,
+                trust_window=merged.get('session_trust_window', 30)
+            )
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.configs)), thread_name_prefix='olt-fleet')
+
+    def names(self):
+        return list(self.configs)
+
+    def describe(self):
+        """Name, address, transport and known command dialect of every OLT, without credentials"""
+        return [{
+            "name": name,
+            "host": olt_config['host'],
+            "port": olt_config['ssh_port'] if olt_config.get('transport') == 'ssh' else olt_config['port'],
+            "transport": olt_config.get('transport', 'telnet'),
+            "board": olt_config['board'],
+            "service_login": bool(olt_config.get('username')),
+            "dialect": get_dialect_cache(olt_config.get('dialect_cache')).for_olt(dialect_key(olt_config)),
+        } for name, olt_config in self.configs.items()]
+
+    def login_for(self, name, credentials):
+        """(pool key, username, password) for an OLT: its service login, else the web user's"""
+        olt_config = self.configs[name]
+        if olt_config.get('username'):
+            return 'service', olt_config['username'], olt_config.get('password', '')
+        return credentials['id'], credentials['username'], credentials['password']
+
+    def fan_out(self, operation, credentials, names=None, timeout=None):
+        """Run operation(client, olt_config) on every OLT (or the named ones) concurrently
+
+        Each OLT gets a pooled session of its own and at most `timeout` seconds
+        (its fleet_timeout setting by default). Returns (results, elapsed):
+        results maps the OLT name to {"status": "success", "data": ...} or to
+        {"status": "error" | "timeout", "message": ...}, each with its elapsed_ms.
+        """
+        started = time.monotonic()
+        names = [name for name in (names or self.configs) if name in self.configs]
+        timeouts = {name: timeout or self.configs[name].get('fleet_timeout', 30) for name in names}
+        futures = {}
+        for name in names:
+            futures[name] = self._executor.submit(self._run, name, operation, credentials, timeouts[name])
+
+        results = {}
+        deadlines = {name: started + timeouts[name] for name in names}
+        pending = set(futures.values())
+        while pending:
+            remaining = min(deadlines[name] for name, future in futures.items() if future in pending) - time.monotonic()
+            _, pending = wait(pending, timeout=max(0, remaining))
+            for name, future in futures.items():
+                if name in results:
+                    continue
+                if future.done():
+                    results[name] = future.result()
+                elif time.monotonic() >= deadlines[name]:
+                    # The worker keeps running and checks its session in when it finishes
+                    results[name] = {"status": "timeout", "message": f"No answer from {name} within the timeout",
+                                     "elapsed_ms": round(1000 * (time.monotonic() - started))}
+                    pending.discard(future)
+
+        return {name: results[name] for name in names}, time.monotonic() - started
+
+    def _run(self, name, operation, credentials, timeout):
+        started = time.monotonic()
+        pool = self.pools[name]
+        key, username, password = self.login_for(name, credentials)
+        client = None
+        try:
+            client = pool.checkout(key, username, password, timeout)
+            if client is None:
+                result = {"status": "error", "message": f"Login to {name} failed"}
+            else:
+                client.mark_used()
+                result = {"status": "success", "data": operation(client, self.configs[name])}
+        except OLTReplyError as e:
+            result = {"status": "error", "message": str(e)}
+        except Exception as e:
+            print(f"Fleet operation on {name} failed: {str(e)}")
+            if client is not None:
+                pool.checkin(client, discard=True)
+                client = None
+            result = {"status": "error", "message": str(e)}
+        finally:
+            if client is not None:
+                pool.checkin(client)
+        result["elapsed_ms"] = round(1000 * (time.monotonic() - started))
+        return result
+
+    def close_key(self, key):
+        for pool in self.pools.values():
+            pool.close_key(key)
+
+    def prune_idle(self, max_idle_seconds):
+        return sum(pool.prune_idle(max_idle_seconds) for pool in self.pools.values())
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
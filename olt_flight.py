@@ -0,0 +1,72 @@
+import threading
+
+
+def normalize_command(command):
+    """Command text with runs of whitespace collapsed; arguments keep their case"""
+    return " ".join(command.split())
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs identical concurrent reads once and hands the result to every caller
+
+    The first caller of do(key, fn) runs fn; callers with the same key that
+    arrive before it returns wait for it and get the same result (or the same
+    exception) instead of running fn themselves. An exception for which
+    shared(exception) is false belongs to the caller that ran fn, e.g. its own
+    failed login; the waiters then go round again and one of them runs fn.
+    Nothing is kept afterwards: the next call with the key runs fn again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, shared=None):
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.executions += 1
+                else:
+                    call.waiters += 1
+                    self.coalesced += 1
+
+            if leader:
+                break
+            call.done.wait()
+            if call.error is None:
+                return call.result
+            if shared is None or shared(call.error):
+                raise call.error
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "waiting": sum(call.waiters for call in self._calls.values()),
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+            }
@@ -0,0 +1,157 @@
+import time
+
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+
+
+class InventoryOnt(db.Model):
+    """One registered ONT as last seen on its OLT"""
+
+    __tablename__ = 'ont_inventory'
+    __table_args__ = (db.UniqueConstraint('olt', 'fsp', 'ont_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    olt = db.Column(db.String(64), nullable=False)
+    fsp = db.Column(db.String(16), nullable=False, index=True)  # frame/slot/port, e.g. "0/1/3"
+    ont_id = db.Column(db.Integer, nullable=False)
+    sn = db.Column(db.String(32), index=True)
+    description = db.Column(db.String(256), index=True)
+    control_flag = db.Column(db.String(16))
+    run_state = db.Column(db.String(16))
+    config_state = db.Column(db.String(16))
+    match_state = db.Column(db.String(16))
+    updated_at = db.Column(db.Float, nullable=False)
+
+    def to_dict(self, now=None):
+        return {
+            "olt": self.olt,
+            "fsp": self.fsp,
+            "ont_id": self.ont_id,
+            "sn": self.sn,
+            "description": self.description,
+            "control_flag": self.control_flag,
+            "run_state": self.run_state,
+            "config_state": self.config_state,
+            "match_state": self.match_state,
+            "updated_at": self.updated_at,
+            "age_seconds": round((now or time.time()) - self.updated_at, 1),
+        }
+
+
+class InventoryPortScan(db.Model):
+    """When a port was last read completely with `display ont info <port> all`"""
+
+    __tablename__ = 'ont_inventory_scans'
+
+    olt = db.Column(db.String(64), primary_key=True)
+    fsp = db.Column(db.String(16), primary_key=True)
+    scanned_at = db.Column(db.Float, nullable=False)
+    ont_count = db.Column(db.Integer, nullable=False)
+
+
+def init_inventory(app, database_uri):
+    """Attach the inventory database to the Flask app and create missing tables"""
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_uri)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+
+def store_port_scan(olt, fsp, onts, scanned_at=None):
+    """Make the inventory of one port match a complete listing of it
+
+    onts are olt_parser Ont records of that port. Rows are updated in place,
+    new ONTs inserted and ONTs no longer listed removed; other ports are not
+    touched. Returns (added, updated, removed) counts.
+    """
+    scanned_at = scanned_at or time.time()
+    existing = {row.ont_id: row for row in InventoryOnt.query.filter_by(olt=olt, fsp=fsp)}
+    added = updated = 0
+    for ont in onts:
+        row = existing.pop(ont.ont_id, None)
+        if row is None:
+            row = InventoryOnt(olt=olt, fsp=fsp, ont_id=ont.ont_id)
+            db.session.add(row)
+            added += 1
+        else:
+            updated += 1
+        _fill(row, ont, scanned_at)
+    for row in existing.values():
+        db.session.delete(row)
+
+    scan = db.session.get(InventoryPortScan, (olt, fsp))
+    if scan is None:
+        scan = InventoryPortScan(olt=olt, fsp=fsp)
+        db.session.add(scan)
+    scan.scanned_at = scanned_at
+    scan.ont_count = len(onts)
+    db.session.commit()
+    return added, updated, len(existing)
+
+
+def _fill(row, ont, updated_at):
+    row.sn = ont.sn
+    row.description = ont.description
+    row.control_flag = ont.control_flag
+    row.run_state = ont.run_state
+    row.config_state = ont.config_state
+    row.match_state = ont.match_state
+    row.updated_at = updated_at
+
+
+def upsert_ont(olt, ont):
+    """Record one ONT (an olt_parser Ont) after it was registered or re-read"""
+    row = InventoryOnt.query.filter_by(olt=olt, fsp=ont.fsp, ont_id=ont.ont_id).first()
+    if row is None:
+        row = InventoryOnt(olt=olt, fsp=ont.fsp, ont_id=ont.ont_id)
+        db.session.add(row)
+    _fill(row, ont, time.time())
+    db.session.commit()
+
+
+def remove_ont(olt, fsp, ont_id):
+    """Drop one ONT after it was deleted on the OLT; returns whether it was known"""
+    removed = InventoryOnt.query.filter_by(olt=olt, fsp=fsp, ont_id=ont_id).delete()
+    db.session.commit()
+    return bool(removed)
+
+
+def find_onts(olt=None, fsp=None, ont_id=None, sn=None, description=None, limit=500):
+    """Inventory rows matching all given filters, each with its age"""
+    query = InventoryOnt.query
+    if olt:
+        query = query.filter_by(olt=olt)
+    if fsp:
+        query = query.filter_by(fsp=fsp)
+    if ont_id is not None:
+        query = query.filter_by(ont_id=ont_id)
+    if sn:
+        query = query.filter_by(sn=sn.upper())
+    if description:
+        query = query.filter_by(description=description)
+    now = time.time()
+    return [row.to_dict(now) for row in query.order_by(InventoryOnt.olt, InventoryOnt.fsp, InventoryOnt.ont_id).limit(limit)]
+
+
+def stale_ports(olt, fsps, max_age):
+    """The ports among fsps that were never scanned or not within max_age seconds"""
+    cutoff = time.time() - max_age
+    fresh = {scan.fsp for scan in InventoryPortScan.query.filter(
+        InventoryPortScan.olt == olt, InventoryPortScan.fsp.in_(fsps), InventoryPortScan.scanned_at >= cutoff)}
+    return [fsp for fsp in fsps if fsp not in fresh]
+
+
+def port_scans(olt=None):
+    """Scan time, age and ONT count of every scanned port"""
+    query = InventoryPortScan.query
+    if olt:
+        query = query.filter_by(olt=olt)
+    now = time.time()
+    return [{
+        "olt": scan.olt,
+        "fsp": scan.fsp,
+        "scanned_at": scan.scanned_at,
+        "age_seconds": round(now - scan.scanned_at, 1),
+        "ont_count": scan.ont_count,
+    } for scan in query.order_by(InventoryPortScan.olt, InventoryPortScan.fsp)]
@@ -0,0 +1,123 @@
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """One long-running OLT operation, the steps it has reported so far and its result"""
+
+    def __init__(self, kind, params, owner):
+        self.id = secrets.token_urlsafe(12)
+        self.kind = kind
+        self.params = params
+        self.owner = owner          # pool key of the web session that submitted it
+        self.status = "queued"      # queued -> running -> finished | failed
+        self.steps = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in ("finished", "failed")
+
+    def to_dict(self, steps=True):
+        job = {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "step_count": len(self.steps),
+        }
+        if steps:
+            job["steps"] = list(self.steps)
+        return job
+
+
+class JobQueue:
+    """Bounded worker pool for OLT operations that should not hold a web request
+
+    submit() returns at once with a Job; max_workers jobs run at a time and at
+    most max_pending wait behind them. A job's work(progress) function calls
+    progress(message) after every step; wait_for_steps() lets any number of
+    readers follow those steps as they happen. Finished jobs are kept for
+    keep_seconds so their results can still be fetched.
+    """
+
+    def __init__(self, max_workers=4, max_pending=50, keep_seconds=3600):
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='olt-job')
+        self._jobs = {}
+        self._changed = threading.Condition()
+
+    def submit(self, kind, params, owner, work):
+        """Queue work(progress) as a job; returns None when the queue is full"""
+        with self._changed:
+            self._prune()
+            if sum(1 for job in self._jobs.values() if job.status == "queued") >= self.max_pending:
+                return None
+            job = Job(kind, params, owner)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id, owner=None):
+        """The job with this id, or None if it is unknown or belongs to another owner"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def jobs(self, owner=None):
+        with self._changed:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def wait_for_steps(self, job, seen, timeout):
+        """Steps of job after the first `seen`, waiting up to timeout for one to arrive
+
+        Returns an empty list when nothing new happened within timeout; check
+        job.done to tell whether more steps can still come.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: len(job.steps) > seen or job.done, timeout)
+            return job.steps[seen:]
+
+    def _run(self, job, work):
+        def progress(message):
+            with self._changed:
+                job.steps.append({"step": len(job.steps) + 1, "time": time.time(), "message": message})
+                self._changed.notify_all()
+
+        with self._changed:
+            job.status, job.started_at = "running", time.time()
+            self._changed.notify_all()
+        try:
+            result, status, error = work(progress), "finished", None
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+            result, status, error = None, "failed", str(e)
+        with self._changed:
+            job.result, job.status, job.error, job.finished_at = result, status, error, time.time()
+            self._changed.notify_all()
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._changed:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
@@ -0,0 +1,308 @@
+import glob
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+from olt_stream import strip_pager
+
+# One slot of `display board 0`
+Board = namedtuple('Board', 'slot name status subtype0 subtype1 online')
+
+# One ONT of `display ont autofind all`
+AutofindOnt = namedtuple('AutofindOnt', 'number fsp sn vendor_id version software_version equipment_id autofind_time')
+
+# One ONT of `display ont info` (key/value block or table row); details holds the remaining fields
+Ont = namedtuple('Ont', 'fsp ont_id sn control_flag run_state config_state match_state description details')
+
+# `display board F/S`: board properties plus the ONTs listed under its ports
+BoardDetail = namedtuple('BoardDetail', 'properties onts')
+
+# What the clients return instead of OLT output ("Not logged in to OLT", "Invalid board
+# format...", "Error executing command: ...") and CLI error replies ("% Unknown command", "Failure: ...")
+READ_ERROR_PATTERN = re.compile(r"^\s*(?:%|Failure\b|Error\b|Invalid\b|Not logged in\b).*", re.MULTILINE)
+
+# How the OLT words an empty autofind list
+AUTOFIND_EMPTY_PATTERN = re.compile(r"Failure: The automatically found ONTs do not exist")
+
+# Last line of a complete autofind list: "The number of GPON autofind ONT is 40"
+AUTOFIND_TOTAL_PATTERN = re.compile(r"The number of GPON autofind ONT is\s*(\d+)")
+
+# "  Board Name        : H806GPBD" or "  Ont SN : 4857544300000001 (HWTC-00000001)"
+KEY_VALUE_PATTERN = re.compile(r"^\s*([A-Za-z][^:,]*?)\s*:\s*(.*?)\s*$")
+
+# Header of the `display board 0` slot table
+BOARD_HEADER_PATTERN = re.compile(r"^\s*SlotID\s")
+
+# Slot row of `display board 0`, possibly an empty slot
+BOARD_ROW_PATTERN = re.compile(r"^\s*(\d+)(?:\s|$)")
+
+# ONT table row: "  0/ 1/0    1  485754434A9B1C2D  active  online  normal  match  no",
+# with a bare port number instead of F/S/P under `display board F/S`
+ONT_ROW_PATTERN = re.compile(
+    r"^\s*(?:(\d+)/\s*(\d+)/\s*(\d+)|(\d+))\s+(\d+)\s+([0-9A-Fa-f]{16})\s+"
+    r"(\S+)\s+(\S+)\s+(\S+)\s+(\S+)(?:\s+(\S+))?\s*$"
+)
+
+# Description table row: "  0/ 1/0     1     customer-1" (or a bare port number)
+DESCRIPTION_ROW_PATTERN = re.compile(r"^\s*(?:(\d+)/\s*(\d+)/\s*(\d+)|(\d+))\s+(\d+)\s+(\S.*?)\s*$")
+
+# Serial number with the optional vendor label, e.g. "485754434A9B1C2D (HWTC-4A9B1C2D)"
+SERIAL_PATTERN = re.compile(r"^([0-9A-Fa-f]{16}|\S+)")
+
+# `ont add` reply, e.g. "  Number of ONTs that can be added: 1, success: 1\n  PortID :5, ONTID :1"
+ONT_ADD_PATTERN = re.compile(r"PortID\s*:\s*(\d+)\s*,\s*ONTID\s*:\s*(\d+)")
+
+# Field names of the OLT as they appear after key normalization
+KEY_ALIASES = {
+    'f_s_p': 'fsp',
+    'ont_sn': 'sn',
+    'vendorid': 'vendor_id',
+    'ont_version': 'version',
+    'ont_softwareversion': 'software_version',
+    'ont_equipmentid': 'equipment_id',
+    'ont_autofind_time': 'autofind_time',
+}
+
+_KEY_CLEANUP = re.compile(r"[^a-z0-9]+")
+
+
+def _key(name):
+    """Normalize an OLT field name: "Ont SN" -> "sn", "ONT-ID" -> "ont_id" """
+    key = _KEY_CLEANUP.sub('_', name.lower()).strip('_')
+    return KEY_ALIASES.get(key, key)
+
+
+def _fsp(frame, slot, port, bare_port, board_id):
+    """Normalize the F/S/P column ("0/ 1/0" -> "0/1/0"); bare ports are prefixed with board_id"""
+    if frame is not None:
+        return f"{frame}/{slot}/{port}"
+    return f"{board_id}/{bare_port}" if board_id else bare_port
+
+
+def _serial(value):
+    match = SERIAL_PATTERN.match(value)
+    return match.group(1).upper() if match else value
+
+
+def _int(value):
+    return int(value) if value and value.isdigit() else value
+
+
+def parse_board_list(text):
+    """Parse `display board 0` into a list of Board records, one per slot row
+
+    Columns are assigned by the position of the header titles, so empty slots
+    and boards without subtypes or online state parse correctly.
+    """
+    boards = []
+    columns = None
+    for line in strip_pager(text).splitlines():
+        if BOARD_HEADER_PATTERN.match(line):
+            columns = [m.start() for m in re.finditer(r"\S+", line)]
+            continue
+        if columns is None or not BOARD_ROW_PATTERN.match(line):
+            continue
+        fields = [None] * len(columns)
+        for token in re.finditer(r"\S+", line):
+            # The column whose title starts at or just right of the token
+            index = 0
+            for i, start in enumerate(columns):
+                if start <= token.start() + 1:
+                    index = i
+            fields[index] = token.group() if fields[index] is None else f"{fields[index]} {token.group()}"
+        fields += [None] * (6 - len(fields))
+        boards.append(Board(int(fields[0]), *fields[1:6]))
+    return boards
+
+
+def _scan_onts(text, board_id=None):
+    """Single pass over ONT listings; returns (properties, onts)
+
+    Key/value lines before the first F/S/P key are properties of the listing
+    itself (the board under `display board F/S`). Every F/S/P key starts an ONT
+    block; table rows are read under the "SN ... Control flag" header, and the
+    "Description" table that follows them is merged in by F/S/P and ONT ID.
+    Raw output may still hold pager banners; they are removed first.
+    """
+    properties = {}
+    blocks = []
+    block = None
+    rows = []
+    descriptions = {}
+    section = None
+
+    for line in strip_pager(text).splitlines():
+        if section == 'description':
+            match = DESCRIPTION_ROW_PATTERN.match(line)
+            if match:
+                fsp = _fsp(match.group(1), match.group(2), match.group(3), match.group(4), board_id)
+                descriptions[(fsp, int(match.group(5)))] = match.group(6)
+                continue
+        elif section == 'onts':
+            match = ONT_ROW_PATTERN.match(line)
+            if match:
+                rows.append(match)
+                continue
+
+        match = KEY_VALUE_PATTERN.match(line)
+        if match:
+            key = _key(match.group(1))
+            if key == 'fsp':
+                block = {}
+                blocks.append(block)
+            # Later sections (profiles, T-CONTs) may repeat a key; the first one is the ONT's
+            (block if block is not None else properties).setdefault(key, match.group(2))
+            continue
+
+        if 'Description' in line:
+            section = 'description'
+        elif 'SN' in line and 'Control' in line:
+            section = 'onts'
+
+    onts = []
+    for block in blocks:
+        fsp = re.sub(r"\s+", "", block.pop('fsp'))
+        onts.append(Ont(
+            fsp,
+            _int(block.pop('ont_id', None)),
+            _serial(block.pop('sn', '')) or None,
+            block.pop('control_flag', None),
+            block.pop('run_state', None),
+            block.pop('config_state', None),
+            block.pop('match_state', None),
+            block.pop('description', None),
+            block,
+        ))
+    for match in rows:
+        fsp = _fsp(match.group(1), match.group(2), match.group(3), match.group(4), board_id)
+        ont_id = int(match.group(5))
+        onts.append(Ont(
+            fsp, ont_id, match.group(6).upper(),
+            match.group(7), match.group(8), match.group(9), match.group(10),
+            descriptions.get((fsp, ont_id)),
+            {'protect_side': match.group(11)} if match.group(11) else {},
+        ))
+    return properties, onts
+
+
+def parse_ont_info(text, board_id=None):
+    """Parse `display ont info` output (single ONT, `all`, or `by-desc`) into Ont records"""
+    return _scan_onts(text, board_id)[1]
+
+
+def parse_board_detail(text, board_id=None):
+    """Parse `display board F/S` into a BoardDetail; board_id prefixes bare port numbers"""
+    properties, onts = _scan_onts(text, board_id)
+    return BoardDetail(properties, onts)
+
+
+def parse_autofind(text):
+    """Parse `display ont autofind all` into AutofindOnt records, one per key/value block"""
+    onts = []
+    block = None
+    for line in strip_pager(text).splitlines():
+        match = KEY_VALUE_PATTERN.match(line)
+        if not match:
+            continue
+        key = _key(match.group(1))
+        if key == 'number' or block is None or key in block:
+            block = {}
+            onts.append(block)
+        block.setdefault(key, match.group(2))
+    return [
+        AutofindOnt(
+            _int(block.get('number')),
+            re.sub(r"\s+", "", block['fsp']) if 'fsp' in block else None,
+            _serial(block['sn']) if 'sn' in block else None,
+            block.get('vendor_id'),
+            block.get('version'),
+            block.get('software_version'),
+            block.get('equipment_id'),
+            block.get('autofind_time'),
+        )
+        for block in onts if 'fsp' in block or 'sn' in block
+    ]
+
+
+def read_error(text):
+    """The error or validation line a read's output holds, or None if it has none"""
+    if not text or not text.strip():
+        return "No output received from OLT"
+    match = READ_ERROR_PATTERN.search(text)
+    return match.group(0).strip() if match else None
+
+
+def parse_autofind_list(text):
+    """Parse a complete autofind reply; raises ValueError for error text or a cut-off list
+
+    An empty list is a valid answer. Anything else has to end with the OLT's
+    count of autofind ONTs, and that many have to have been parsed.
+    """
+    if text and AUTOFIND_EMPTY_PATTERN.search(text):
+        return []
+    error = read_error(text)
+    if error:
+        raise ValueError(error)
+    onts = parse_autofind(text)
+    total = AUTOFIND_TOTAL_PATTERN.search(text)
+    if total is None or int(total.group(1)) != len(onts):
+        expected = total.group(1) if total else "an unknown number of"
+        raise ValueError(f"Incomplete autofind list: {len(onts)} of {expected} ONTs read")
+    return onts
+
+
+def parse_ont_add(text):
+    """Return (port_id, ont_id) from an `ont add` reply, or None if it has none"""
+    match = ONT_ADD_PATTERN.search(text)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+# Command -> parser, first match wins
+COMMAND_PARSERS = [
+    (re.compile(r"^display board 0$"), parse_board_list),
+    (re.compile(r"^display board \d+/\d+$"), parse_board_detail),
+    (re.compile(r"^display ont autofind all$"), parse_autofind),
+    (re.compile(r"^display ont info\b"), parse_ont_info),
+]
+
+
+def parser_for(command):
+    """Return the parse function for a CLI command, or None if there is none"""
+    command = ' '.join(command.split())
+    for pattern, parser in COMMAND_PARSERS:
+        if pattern.match(command):
+            return parser
+    return None
+
+
+def to_json(value):
+    """Turn parser records (namedtuples, lists of them) into JSON-ready dicts and lists"""
+    if hasattr(value, '_asdict'):
+        return {key: to_json(item) for key, item in value._asdict().items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    return value
+
+
+def benchmark(paths, repeat=200):
+    """Time each parser on recorded outputs whose first line is the command that produced them"""
+    for path in paths:
+        with open(path) as f:
+            command, _, text = f.read().partition('\n')
+        parser = parser_for(command)
+        if parser is None:
+            print(f"{os.path.basename(path)}: no parser for '{command}'")
+            continue
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = parser(text)
+        elapsed = (time.perf_counter() - started) / repeat
+        records = len(result.onts) if isinstance(result, BoardDetail) else len(result)
+        print(f"{os.path.basename(path)}: {parser.__name__} {records} records, "
+              f"{len(text.splitlines())} lines, {elapsed * 1e6:.0f} us/parse")
+
+
+if __name__ == '__main__':
+    benchmark(sys.argv[1:] or sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'samples', '*.txt'))))
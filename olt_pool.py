@@ -0,0 +1,306 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from olt_client import OLTLoginResult
+
+
+class _CredentialPool:
+    """Sessions and counters for one pool key (one logged-in web user) on the OLT"""
+
+    def __init__(self, key, username):
+        self.key = key
+        self.username = username
+        self.idle = []              # most recently checked in last
+        self.in_use = set()
+        self.logging_in = False
+        self.last_login_failure = None  # (OLTLoginResult, monotonic time)
+        self.waiters = 0
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.logins = 0
+        self.login_failures = 0
+        self.discard_on_checkin = set()
+        self.closed = False
+
+
+class OLTConnectionPool:
+    """Bounded pool of logged-in OLT sessions with exclusive checkout
+
+    Every checkout hands out a session no other request can use until it is
+    checked in, so two threads never interleave writes on one telnet socket.
+    Sessions are grouped by a caller-chosen key, e.g. the server-side id of
+    the web session that logged in, so the key never contains the password.
+    At most max_sessions sessions are open to the OLT (an idle session of another
+    key is closed to make room), and only one login per key runs
+    at a time; callers waiting while that login fails get the failure too
+    instead of retrying into an OLT lockout. The pool lock
+    only guards bookkeeping and is never held during network I/O.
+    """
+
+    def __init__(self, client_factory, max_sessions=4, checkout_timeout=30, health_check=None, trust_window=30):
+        self.client_factory = client_factory
+        self.max_sessions = max_sessions
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self.trust_window = trust_window
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pools = {}
+        self._owners = {}  # id(client) -> _CredentialPool
+
+    def checkout(self, key, username, password, timeout=None):
+        """Return a logged-in session of key for exclusive use, or None if the login fails
+
+        Raises TimeoutError when all sessions stay busy for `timeout` seconds
+        (checkout_timeout by default).
+        """
+        started = time.monotonic()
+        deadline = started + (self.checkout_timeout if timeout is None else timeout)
+
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None or pool.closed:
+                pool = self._pools[key] = _CredentialPool(key, username)
+            pool.waiters += 1
+
+        try:
+            while True:
+                with self._lock:
+                    client, login, evicted = self._claim(pool, started, deadline)
+
+                if evicted:
+                    self._close(evicted)
+
+                if client is None and not login:
+                    # A login that started while we waited has failed
+                    return None
+
+                if login:
+                    return self._login(pool, username, password, started)
+
+                if self._is_alive(client):
+                    self._record_checkout(pool, started)
+                    return client
+                # Dead session: drop it and go round again, which logs in afresh
+                print(f"Pooled session for {pool.username} failed its liveness check, reconnecting")
+                self.checkin(client, discard=True)
+        finally:
+            with self._lock:
+                pool.waiters -= 1
+
+    def login(self, key, username, password, timeout=None):
+        """Log in a session for key and leave it idle in the pool
+
+        Returns the OLTLoginResult, so the first request after a login reuses
+        this session instead of logging in again.
+        """
+        client = self.checkout(key, username, password, timeout)
+        if client is not None:
+            self.checkin(client)
+            return OLTLoginResult.SUCCESS
+        with self._lock:
+            pool = self._pools.get(key)
+            failure = pool.last_login_failure if pool else None
+        return failure[0] if failure else OLTLoginResult.CONNECTION_ERROR
+
+    def _claim(self, pool, started, deadline):
+        """Pick an idle session or the right to log in; called with the lock held"""
+        while True:
+            if pool.idle:
+                client = pool.idle.pop()
+                pool.in_use.add(client)
+                return client, False, None
+
+            failure = pool.last_login_failure
+            if failure and failure[1] >= started:
+                return None, False, None
+
+            if not pool.logging_in:
+                if self._open_sessions() < self.max_sessions:
+                    pool.logging_in = True
+                    return None, True, None
+                evicted = self._evict_idle()
+                if evicted:
+                    pool.logging_in = True
+                    return None, True, evicted
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No free OLT session for {pool.username} after {deadline - started:.0f}s")
+            self._changed.wait(remaining)
+
+    def _open_sessions(self):
+        return sum(len(p.in_use) + len(p.idle) + p.logging_in for p in self._pools.values())
+
+    def _evict_idle(self):
+        """Take the least recently used idle session of any credentials out of the pool"""
+        candidates = [p for p in self._pools.values() if p.idle]
+        if not candidates:
+            return None
+        pool = min(candidates, key=lambda p: p.idle[0].last_used)
+        client = pool.idle.pop(0)
+        del self._owners[id(client)]
+        return client
+
+    def _login(self, pool, username, password, started):
+        client = self.client_factory()
+        try:
+            result = client.connect(username, password)
+        except Exception as e:
+            print(f"Pool login error: {str(e)}")
+            result = OLTLoginResult.CONNECTION_ERROR
+
+        with self._lock:
+            pool.logging_in = False
+            pool.logins += 1
+            if result == OLTLoginResult.SUCCESS:
+                pool.in_use.add(client)
+                self._owners[id(client)] = pool
+            else:
+                pool.login_failures += 1
+                pool.last_login_failure = (result, time.monotonic())
+            self._changed.notify_all()
+
+        if result != OLTLoginResult.SUCCESS:
+            print(f"Pool login for {username} failed: {result}")
+            return None
+        self._record_checkout(pool, started)
+        return client
+
+    def _is_alive(self, client):
+        """Run the health check, unless the OLT showed a prompt on the session within trust_window seconds
+
+        Checkin does not count: a session whose socket the OLT closed is
+        checked in too, and only the last prompt seen proves it still answers.
+        Trusted sessions are still checked for a close that already arrived,
+        which costs no round trip.
+        """
+        if self.health_check is None:
+            return True
+        if not client.logged_in:
+            return False
+        try:
+            if client.last_prompt_at is not None and time.monotonic() - client.last_prompt_at < self.trust_window:
+                return not client.peer_closed()
+            return self.health_check(client)
+        except Exception:
+            return False
+
+    def _record_checkout(self, pool, started):
+        waited = time.monotonic() - started
+        with self._lock:
+            pool.checkouts += 1
+            pool.total_wait += waited
+            pool.max_wait = max(pool.max_wait, waited)
+
+    def checkin(self, client, discard=False):
+        """Give a checked-out session back; broken or discarded sessions are closed"""
+        with self._lock:
+            pool = self._owners.get(id(client))
+            if pool is None or client not in pool.in_use:
+                return
+            pool.in_use.discard(client)
+            discard = discard or not client.logged_in or id(client) in pool.discard_on_checkin
+            if discard:
+                pool.discard_on_checkin.discard(id(client))
+                del self._owners[id(client)]
+            else:
+                client.mark_used()
+                pool.idle.append(client)
+            self._forget_if_closed(pool)
+            self._changed.notify_all()
+
+        if discard:
+            self._close(client)
+
+    @contextmanager
+    def session(self, key, username, password, timeout=None):
+        """Check out a session for the duration of a with block"""
+        client = self.checkout(key, username, password, timeout)
+        try:
+            yield client
+        except Exception:
+            if client:
+                self.checkin(client, discard=True)
+                client = None
+            raise
+        finally:
+            if client:
+                self.checkin(client)
+
+    def close_key(self, key):
+        """Close every session of key (idle ones now, busy ones at checkin) and forget it"""
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                return
+            to_close = pool.idle
+            pool.idle = []
+            for client in to_close:
+                del self._owners[id(client)]
+            pool.discard_on_checkin.update(id(client) for client in pool.in_use)
+            pool.closed = True
+            self._forget_if_closed(pool)
+            self._changed.notify_all()
+
+        for client in to_close:
+            self._close(client)
+
+    def _forget_if_closed(self, pool):
+        """Drop the bookkeeping of a closed key once its last session is back; lock held"""
+        if pool.closed and not pool.in_use and self._pools.get(pool.key) is pool:
+            del self._pools[pool.key]
+
+    def prune_idle(self, max_idle_seconds):
+        """Close sessions that have been idle for longer than max_idle_seconds"""
+        now = time.time()
+        to_close = []
+        with self._lock:
+            for pool in self._pools.values():
+                keep = []
+                for client in pool.idle:
+                    if now - client.last_used > max_idle_seconds:
+                        to_close.append(client)
+                        del self._owners[id(client)]
+                    else:
+                        keep.append(client)
+                pool.idle = keep
+
+        for client in to_close:
+            self._close(client)
+        return len(to_close)
+
+    def _close(self, client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        """Sessions in use/idle, waiters and checkout wait times, in total and per user"""
+        with self._lock:
+            per_user = []
+            for pool in self._pools.values():
+                per_user.append({
+                    "username": pool.username,
+                    "in_use": len(pool.in_use),
+                    "idle": len(pool.idle),
+                    "logging_in": pool.logging_in,
+                    "waiters": pool.waiters,
+                    "checkouts": pool.checkouts,
+                    "avg_wait_ms": round(1000 * pool.total_wait / pool.checkouts, 1) if pool.checkouts else 0.0,
+                    "max_wait_ms": round(1000 * pool.max_wait, 1),
+                    "logins": pool.logins,
+                    "login_failures": pool.login_failures,
+                })
+
+        totals = {
+            "max_sessions": self.max_sessions,
+            "in_use": sum(p["in_use"] for p in per_user),
+            "idle": sum(p["idle"] for p in per_user),
+            "waiters": sum(p["waiters"] for p in per_user),
+            "checkouts": sum(p["checkouts"] for p in per_user),
+        }
+        return {"totals": totals, "pools": per_user}
@@ -0,0 +1,819 @@
+import argparse
+import re
+import socket
+import socketserver
+import threading
+import time
+
+from olt_stream import DO, DONT, IAC, NAWS, WILL, WONT, TelnetDecoder
+
+try:
+    import paramiko
+except ImportError:  # only needed for the SSH listener
+    paramiko = None
+
+# Product name printed in the login banner (the prompt shows the configurable host name)
+PRODUCT = "MA5683T"
+
+# Chassis slots of frame 0 and the control/uplink boards in fixed slots; GPON
+# boards take the remaining slots in order
+SLOT_COUNT = 18
+FIXED_BOARDS = {
+    7: ("H801SCUN", "Active_normal", "CPCA"),
+    8: ("H801SCUN", "Standby_normal", "CPCA"),
+    9: ("H801GICF", "Normal", ""),
+    10: ("H801X2CS", "Normal", ""),
+}
+GPON_BOARD = "H806GPBD"
+MAX_ONTS_PER_PORT = 128
+
+SEPARATOR = "  " + "-" * 76
+
+# Pager banner and the cursor moves and blanks that erase it once a key is pressed
+PAGER_BANNER = "  ---- More ( Press 'Q' to break ) ----"
+PAGER_ERASE = "\x1b[37D" + " " * 37 + "\x1b[37D"
+
+# Parameter prompt shown after `display board` while smart mode is on
+PARAMETER_PROMPT = "{ <cr>||<K> }:"
+
+UNKNOWN_COMMAND = "                  ^\r\n  % Unknown command, the error locates at '^'"
+PARAMETER_ERROR = "                  ^\r\n  % Parameter error, the error locates at '^'"
+INCOMPLETE_COMMAND = "  % Incomplete command, the error locates at '^'"
+ONT_NOT_FOUND = "  Failure: The ONT does not exist"
+
+# Line ends a telnet or SSH client may send
+LINE_END_PATTERN = re.compile(rb"\r\n|\r|\n")
+
+
+def serial_number(index):
+    """Huawei serial number of the index-th simulated ONT"""
+    return f"48575443{0x1A2B0000 + index:08X}"
+
+
+def _fsp(slot, port):
+    # F/S/P column of ONT tables, e.g. "0/ 1/0"
+    return f"0/{slot:>2}/{port}"
+
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds)) + "+00:00"
+
+
+class SimulatedOLT:
+    """Boards, registered ONTs and autofind list of a simulated MA5683T
+
+    Frame 0 holds `boards` GPON boards in the free service slots, each with
+    ports_per_board ports carrying onts_per_port registered ONTs, and
+    `autofind` unregistered ONTs wait in the autofind list, spread over the
+    ports. Serial numbers and descriptions follow from the position, so two
+    simulators built with the same counts answer alike. The state is shared by
+    every CLI session: `ont add` of a serial number from the autofind list
+    takes it out of the list (the ONT comes online), `ont delete` of an online
+    ONT puts it back.
+    """
+
+    def __init__(self, boards=2, ports_per_board=16, onts_per_port=32, autofind=8,
+                 hostname="MA5683T", username="admin", password="admin"):
+        service_slots = [slot for slot in range(SLOT_COUNT) if slot not in FIXED_BOARDS]
+        if not 0 < boards <= len(service_slots):
+            raise ValueError(f"boards must be between 1 and {len(service_slots)}")
+        if not 0 <= onts_per_port <= MAX_ONTS_PER_PORT:
+            raise ValueError(f"onts_per_port must be between 0 and {MAX_ONTS_PER_PORT}")
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.ports_per_board = ports_per_board
+        self.gpon_slots = service_slots[:boards]
+        self.ports = {}             # (slot, port) -> {ont_id: ont dict}
+        self.serials = {}           # serial number -> (slot, port, ont_id)
+        self.autofind = {}          # serial number -> (slot, port, found_at), in discovery order
+        self.lock = threading.Lock()
+
+        index = 0
+        for slot in self.gpon_slots:
+            for port in range(ports_per_board):
+                self.ports[(slot, port)] = {}
+                for ont_id in range(onts_per_port):
+                    run_state = "offline" if (port + ont_id) % 7 == 6 else "online"
+                    self._store(slot, port, ont_id, serial_number(index), f"customer-{slot}-{port}-{ont_id}", run_state)
+                    index += 1
+        now = time.time()
+        for i in range(autofind):
+            slot = self.gpon_slots[i % boards]
+            port = (i // boards) % ports_per_board
+            self.autofind[serial_number(index + i)] = (slot, port, now)
+
+    def _store(self, slot, port, ont_id, sn, description, run_state, line_profile_id=10, service_profile_id=10):
+        self.ports[(slot, port)][ont_id] = {
+            "sn": sn,
+            "description": description,
+            "run_state": run_state,
+            "line_profile_id": line_profile_id,
+            "service_profile_id": service_profile_id,
+        }
+        self.serials[sn] = (slot, port, ont_id)
+
+    def has_port(self, slot, port):
+        return (slot, port) in self.ports
+
+    def counts(self):
+        with self.lock:
+            return {
+                "boards": len(self.gpon_slots),
+                "onts": len(self.serials),
+                "autofind": len(self.autofind),
+            }
+
+    # Listings, as lists of output lines
+
+    def board_list(self):
+        lines = [SEPARATOR, "  SlotID  BoardName  Status          SubType0 SubType1    Online/Offline", SEPARATOR]
+        for slot in range(SLOT_COUNT):
+            if slot in FIXED_BOARDS:
+                name, status, subtype = FIXED_BOARDS[slot]
+                lines.append(f"  {slot:<7} {name:<10} {status:<15} {subtype}".rstrip())
+            elif slot in self.gpon_slots:
+                lines.append(f"  {slot:<7} {GPON_BOARD:<10} Normal")
+            else:
+                lines.append(f"  {slot}")
+        lines.append(SEPARATOR)
+        return lines
+
+    def board_detail(self, slot):
+        """`display board 0/<slot>`, or None for an empty slot"""
+        if slot in FIXED_BOARDS:
+            name, status, _ = FIXED_BOARDS[slot]
+            return [SEPARATOR, f"  Board Name        : {name}", f"  Board Status      : {status}",
+                    "  Online state      : Online", SEPARATOR]
+        if slot not in self.gpon_slots:
+            return None
+
+        lines = [SEPARATOR, f"  Board Name        : {GPON_BOARD}", "  Board Status      : Normal",
+                 "  Online state      : Online", "  Software version  : MA5600V800R018C10", SEPARATOR,
+                 "  Port  Port Type  Min Distance(km)  Max Distance(km)  Optical Module Status", SEPARATOR]
+        with self.lock:
+            ports = [(port, sorted(self.ports[(slot, port)].items())) for port in range(self.ports_per_board)]
+        for port, onts in ports:
+            lines.append(f"  {port:<5} GPON       0                 20                {'Online' if onts else 'Offline'}")
+        lines += [SEPARATOR,
+                  "  Port  ONT  SN                Control     Run        Config   Match    Protect",
+                  "        ID                     flag        state      state    state    side", SEPARATOR]
+        for port, onts in ports:
+            for ont_id, ont in onts:
+                lines.append(f"  {port:<4}  {ont_id:<3}  {ont['sn']}  active      {ont['run_state']:<10} normal   match    no")
+        lines += [SEPARATOR, "  Port  ONT  Description", "        ID", SEPARATOR]
+        for port, onts in ports:
+            for ont_id, ont in onts:
+                lines.append(f"  {port:<4}  {ont_id:<3}  {ont['description']}")
+        lines.append(SEPARATOR)
+        return lines
+
+    def autofind_list(self):
+        with self.lock:
+            found = list(self.autofind.items())
+        if not found:
+            return ["  Failure: The automatically found ONTs do not exist"]
+        lines = []
+        for number, (sn, (slot, port, found_at)) in enumerate(found, 1):
+            lines += [SEPARATOR,
+                      f"   Number              : {number}",
+                      f"   F/S/P               : 0/{slot}/{port}",
+                      f"   Ont SN              : {sn} (HWTC-{sn[8:]})",
+                      "   Password            : 0x00000000000000000000",
+                      "   Loid                : ",
+                      "   Checkcode           : ",
+                      "   VendorID            : HWTC",
+                      "   Ont Version         : 10C7.A",
+                      "   Ont SoftwareVersion : V5R019C00S050",
+                      "   Ont EquipmentID     : HG8310M",
+                      f"   Ont autofind time   : {_timestamp(found_at)}"]
+        lines += [SEPARATOR, f"   The number of GPON autofind ONT is {len(found)}"]
+        return lines
+
+    def ont_detail(self, slot, port, ont_id):
+        """Key/value block of one ONT, as shown by `display ont info <port> <ont>`"""
+        with self.lock:
+            ont = self.ports.get((slot, port), {}).get(ont_id)
+            ont = dict(ont) if ont else None
+        if ont is None:
+            return [ONT_NOT_FOUND]
+        online = ont['run_state'] == "online"
+        return [SEPARATOR,
+                f"  F/S/P                   : 0/{slot}/{port}",
+                f"  ONT-ID                  : {ont_id}",
+                "  Control flag            : active",
+                f"  Run state               : {ont['run_state']}",
+                "  Config state            : normal",
+                "  Match state             : match",
+                "  DBA type                : SR",
+                f"  ONT distance(m)         : {1200 + 37 * ont_id if online else '-'}",
+                "  Authentic type          : SN-auth",
+                f"  SN                      : {ont['sn']} (HWTC-{ont['sn'][8:]})",
+                "  Management mode         : OMCI",
+                "  Software work mode      : normal",
+                "  Isolation state         : normal",
+                f"  Description             : {ont['description']}",
+                f"  Last down cause         : {'-' if online else 'dying-gasp'}",
+                "  Interoperability-mode   : ITU-T",
+                SEPARATOR,
+                f"  Line profile ID      : {ont['line_profile_id']}",
+                SEPARATOR,
+                f"  Service profile ID   : {ont['service_profile_id']}",
+                SEPARATOR]
+
+    def ont_table(self, rows, port_summary=None):
+        """`display ont info ... all` table of [(slot, port, ont_id, ont)] with the description table"""
+        if not rows:
+            return [ONT_NOT_FOUND]
+        lines = [SEPARATOR,
+                 "  F/S/P   ONT         SN         Control     Run      Config   Match    Protect",
+                 "          ID                     flag        state    state    state    side", SEPARATOR]
+        for slot, port, ont_id, ont in rows:
+            lines.append(f"  {_fsp(slot, port)}  {ont_id:>3}  {ont['sn']}  active      {ont['run_state']:<7}  normal   match    no ")
+        lines += [SEPARATOR, "  F/S/P   ONT-ID   Description", SEPARATOR]
+        for slot, port, ont_id, ont in rows:
+            lines.append(f"  {_fsp(slot, port)}  {ont_id:>5}   {ont['description']}")
+        lines.append(SEPARATOR)
+        if port_summary:
+            slot, port = port_summary
+            online = sum(1 for row in rows if row[3]['run_state'] == "online")
+            lines += [f"  In port {_fsp(slot, port)} , the total of ONTs are: {len(rows)}, online: {online}", SEPARATOR]
+        return lines
+
+    def port_onts(self, slot, port):
+        with self.lock:
+            return [(slot, port, ont_id, dict(ont)) for ont_id, ont in sorted(self.ports[(slot, port)].items())]
+
+    def find_by_sn(self, sn):
+        with self.lock:
+            location = self.serials.get(sn.upper())
+        if location is None:
+            return [ONT_NOT_FOUND]
+        return self.ont_detail(*location)
+
+    def find_by_desc(self, description):
+        with self.lock:
+            rows = [(slot, port, ont_id, dict(ont))
+                    for (slot, port), onts in sorted(self.ports.items())
+                    for ont_id, ont in sorted(onts.items()) if ont['description'] == description]
+        return self.ont_table(rows)
+
+    # Changes
+
+    def add_ont(self, slot, port, ont_id, sn, description, line_profile_id, service_profile_id):
+        """Register an ONT; ont_id None takes the lowest free ID. Returns the reply lines"""
+        sn = sn.upper()
+        with self.lock:
+            onts = self.ports[(slot, port)]
+            if sn in self.serials:
+                return ["  Failure: SN already exists"]
+            if ont_id is None:
+                ont_id = next((i for i in range(MAX_ONTS_PER_PORT) if i not in onts), None)
+                if ont_id is None:
+                    return ["  Failure: The number of ONTs on the port has reached the upper limit"]
+            elif ont_id in onts:
+                return ["  Failure: The ONT ID already exists"]
+            # An ONT waiting in the autofind list is connected, so it comes online at once
+            online = self.autofind.pop(sn, None) is not None
+            self._store(slot, port, ont_id, sn, description or "ONT_NO_DESCRIPTION",
+                        "online" if online else "offline", line_profile_id, service_profile_id)
+        return ["  Number of ONTs that can be added: 1, success: 1", f"  PortID :{port}, ONTID :{ont_id}"]
+
+    def delete_ont(self, slot, port, ont_id):
+        with self.lock:
+            ont = self.ports[(slot, port)].pop(ont_id, None)
+            if ont is None:
+                return [ONT_NOT_FOUND]
+            del self.serials[ont['sn']]
+            if ont['run_state'] == "online":
+                self.autofind[ont['sn']] = (slot, port, time.time())
+        return ["  Number of ONTs that can be deleted: 1, success: 1"]
+
+
+# CLI modes, in the order they are entered
+USER, PRIVILEGED, CONFIG, GPON = "user", "privileged", "config", "gpon"
+ANY_MODE = (USER, PRIVILEGED, CONFIG, GPON)
+ENABLED = (PRIVILEGED, CONFIG, GPON)
+
+# Commands of the simulated CLI: (pattern, modes it exists in, CLISession method).
+# Outside its modes a command is unknown, as on the OLT
+COMMANDS = [
+    (re.compile(r"^enable$"), ANY_MODE, "_enable"),
+    (re.compile(r"^disable$"), ENABLED, "_disable"),
+    (re.compile(r"^config$"), (PRIVILEGED,), "_config"),
+    (re.compile(r"^interface gpon (\S+)$"), (CONFIG,), "_interface_gpon"),
+    (re.compile(r"^quit$"), ANY_MODE, "_quit"),
+    (re.compile(r"^return$"), (CONFIG, GPON), "_return"),
+    (re.compile(r"^scroll(?: (\d+))?$"), ANY_MODE, "_scroll"),
+    (re.compile(r"^(undo )?smart$"), ENABLED, "_smart"),
+    (re.compile(r"^display board(?: (\S+))?$"), ANY_MODE, "_display_board"),
+    (re.compile(r"^display ont autofind all$"), ENABLED, "_display_autofind"),
+    (re.compile(r"^display ont info by-sn (\S+)$"), (CONFIG, GPON), "_display_by_sn"),
+    (re.compile(r"^display ont info by-desc (\S+)$"), (CONFIG, GPON), "_display_by_desc"),
+    (re.compile(r"^display ont info(?: (\S+))?(?: (\S+))?$"), (GPON,), "_display_ont_info"),
+    (re.compile(r"^ont add (\S+)(?: (\d+))? sn-auth (\S+) omci ont-lineprofile-id (\d+) ont-srvprofile-id (\d+)"
+                r"(?: desc (\S+))?$"), (GPON,), "_ont_add"),
+    (re.compile(r"^ont delete (\S+) (\S+)$"), (GPON,), "_ont_delete"),
+]
+
+
+class SessionClosed(Exception):
+    """The client went away or logged out"""
+
+
+class CLISession:
+    """One CLI login on a SimulatedOLT: its mode, pager and command interpreter
+
+    recv() returns the next bytes typed by the client (b"" once it is gone) and
+    send(bytes) writes to it; the same session runs behind telnet and SSH. Each
+    command waits options['latency'] seconds (or the entry of
+    options['command_latency'] whose prefix it starts with) before its reply,
+    and listings longer than options['page_size'] lines stop at a "More"
+    banner until the session turns the pager off with `scroll`.
+    """
+
+    def __init__(self, simulator, recv, send):
+        self.simulator = simulator
+        self.olt = simulator.olt
+        self.options = simulator.options
+        self.recv = recv
+        self.send = send
+        self.mode = USER
+        self.board = None
+        self.smart = True
+        self.page_size = self.options['page_size']
+        self._buffer = bytearray()
+        self._after_cr = False
+
+    # Input
+
+    def _fill(self):
+        data = self.recv()
+        if not data:
+            raise SessionClosed()
+        self._buffer += data
+
+    def _skip_line_feed(self):
+        # "\r" ends a line on its own; a "\n" or NUL right behind it belongs to it
+        if self._after_cr and self._buffer:
+            if self._buffer[0] in (0x0A, 0x00):
+                del self._buffer[0]
+            self._after_cr = False
+
+    def read_line(self):
+        while True:
+            self._skip_line_feed()
+            match = LINE_END_PATTERN.search(self._buffer)
+            if match:
+                line = self._buffer[:match.start()].decode('ascii', errors='ignore')
+                self._after_cr = match.group() == b"\r"
+                del self._buffer[:match.end()]
+                return line
+            self._fill()
+
+    def read_key(self):
+        while True:
+            self._skip_line_feed()
+            if self._buffer:
+                key = bytes(self._buffer[:1])
+                del self._buffer[0]
+                self._after_cr = key == b"\r"
+                return key
+            self._fill()
+
+    # Output
+
+    def write(self, text):
+        self.send(text.encode('ascii', errors='replace'))
+
+    def prompt(self):
+        suffix = {USER: ">", PRIVILEGED: "#", CONFIG: "(config)#"}.get(self.mode)
+        return self.olt.hostname + (suffix or f"(config-if-gpon-0/{self.board})#")
+
+    def page_out(self, lines):
+        """Write a listing, stopping at the pager banner after every page_size lines"""
+        if not self.page_size or len(lines) <= self.page_size:
+            self.write("\r\n".join(lines) + "\r\n")
+            return
+        for start in range(0, len(lines), self.page_size):
+            self.write("\r\n".join(lines[start:start + self.page_size]) + "\r\n")
+            if start + self.page_size >= len(lines):
+                return
+            self.write(PAGER_BANNER)
+            key = self.read_key()
+            self.write(PAGER_ERASE)
+            if key in (b"q", b"Q"):
+                return
+
+    # Session
+
+    def login(self):
+        """Telnet login dialog; returns False after too many wrong attempts"""
+        self.write("\r\nWarning: Telnet is not a secure protocol, and it is recommended to use Stelnet.\r\n")
+        for _ in range(3):
+            self.write("\r\n>>User name:")
+            username = self.read_line()
+            self.write(username + "\r\n>>User password:")
+            password = self.read_line()
+            self.write("\r\n")
+            time.sleep(self.options['login_latency'])
+            if (username, password) == (self.olt.username, self.olt.password):
+                return True
+            print(f"Simulator: rejected telnet login of '{username}'")
+            self.write("\r\n  Username or password invalid.\r\n")
+        self.write("\r\n  Reenter times have reached the upper limit.\r\n")
+        return False
+
+    def run(self, authenticated=False):
+        """Serve the session until the client quits or disconnects"""
+        try:
+            if not authenticated and not self.login():
+                return
+            self.write(f"\r\n  Huawei Integrated Access Software ({PRODUCT}).\r\n"
+                       "  Copyright(C) Huawei Technologies Co., Ltd. 2002-2019. All rights reserved.\r\n"
+                       "\r\n" + self.prompt())
+            while True:
+                line = self.read_line()
+                self.write(line + "\r\n")
+                command = " ".join(line.split())
+                if command:
+                    self.simulator.count_command()
+                    time.sleep(self._latency(command))
+                    reply = self.execute(command)
+                    if reply:
+                        self.page_out(reply)
+                self.write("\r\n" + self.prompt())
+        except (SessionClosed, OSError):
+            pass
+
+    def _latency(self, command):
+        matches = [prefix for prefix in self.options['command_latency'] if command.startswith(prefix)]
+        if matches:
+            return self.options['command_latency'][max(matches, key=len)]
+        return self.options['latency']
+
+    def execute(self, command):
+        """Run one command; returns the lines of its reply"""
+        for pattern, modes, method in COMMANDS:
+            match = pattern.match(command)
+            if match and self.mode in modes:
+                return getattr(self, method)(*match.groups())
+        return [UNKNOWN_COMMAND]
+
+    # Commands
+
+    def _enable(self):
+        if self.mode == USER:
+            self.mode = PRIVILEGED
+        return []
+
+    def _disable(self):
+        self.mode, self.board = USER, None
+        return []
+
+    def _config(self):
+        self.mode = CONFIG
+        return []
+
+    def _interface_gpon(self, frame_slot):
+        slot = self._slot(frame_slot)
+        if slot is None or slot not in self.olt.gpon_slots:
+            return [PARAMETER_ERROR]
+        self.mode, self.board = GPON, slot
+        return []
+
+    def _quit(self):
+        if self.mode == GPON:
+            self.mode, self.board = CONFIG, None
+        elif self.mode == CONFIG:
+            self.mode = PRIVILEGED
+        elif self.mode == USER:
+            raise SessionClosed()
+        else:
+            self.write("  Check whether system data has been changed. Please save data before logout.\r\n"
+                       "Are you sure to log out? (y/n)[n]:")
+            answer = self.read_line()
+            self.write(answer + "\r\n")
+            if answer.strip().lower() == "y":
+                raise SessionClosed()
+        return []
+
+    def _return(self):
+        self.mode, self.board = PRIVILEGED, None
+        return []
+
+    def _scroll(self, lines):
+        if not self.options['scroll']:
+            return [UNKNOWN_COMMAND]
+        self.page_size = int(lines) if lines else 0
+        return []
+
+    def _smart(self, undo):
+        self.smart = not undo
+        return []
+
+    def _display_board(self, frame_slot):
+        if frame_slot is None:
+            return [INCOMPLETE_COMMAND]
+        if self.smart:
+            self.write(PARAMETER_PROMPT)
+            self.write(self.read_line() + "\r\n")
+        if frame_slot == "0":
+            return self.olt.board_list()
+        slot = self._slot(frame_slot)
+        if slot is None:
+            return [PARAMETER_ERROR]
+        return self.olt.board_detail(slot) or ["  Failure: The board does not exist"]
+
+    def _display_autofind(self):
+        return self.olt.autofind_list()
+
+    def _display_by_sn(self, sn):
+        return self.olt.find_by_sn(sn)
+
+    def _display_by_desc(self, description):
+        return self.olt.find_by_desc(description)
+
+    def _display_ont_info(self, port, ont_id):
+        if ont_id is None:
+            return [INCOMPLETE_COMMAND]
+        port = self._port(port)
+        if port is None:
+            return [PARAMETER_ERROR]
+        if ont_id == "all":
+            return self.olt.ont_table(self.olt.port_onts(self.board, port), (self.board, port))
+        if not ont_id.isdigit() or int(ont_id) >= MAX_ONTS_PER_PORT:
+            return [PARAMETER_ERROR]
+        return self.olt.ont_detail(self.board, port, int(ont_id))
+
+    def _ont_add(self, port, ont_id, sn, line_profile_id, service_profile_id, description):
+        port = self._port(port)
+        if port is None or (ont_id is not None and int(ont_id) >= MAX_ONTS_PER_PORT):
+            return [PARAMETER_ERROR]
+        if not re.match(r"^[0-9A-Fa-f]{16}$", sn):
+            return [PARAMETER_ERROR]
+        return self.olt.add_ont(self.board, port, None if ont_id is None else int(ont_id), sn,
+                                description, int(line_profile_id), int(service_profile_id))
+
+    def _ont_delete(self, port, ont_id):
+        port = self._port(port)
+        if port is None or not ont_id.isdigit():
+            return [PARAMETER_ERROR]
+        return self.olt.delete_ont(self.board, port, int(ont_id))
+
+    def _slot(self, frame_slot):
+        # "0/<slot>" of frame 0, or None
+        match = re.match(r"^0/(\d+)$", frame_slot)
+        return int(match.group(1)) if match and int(match.group(1)) < SLOT_COUNT else None
+
+    def _port(self, port):
+        if not port.isdigit() or not self.olt.has_port(self.board, int(port)):
+            return None
+        return int(port)
+
+
+class _ServerTelnetDecoder(TelnetDecoder):
+    """Server side of the option negotiation: NAWS (which the server asks for) is accepted, the rest refused"""
+
+    def _negotiate(self, command, option):
+        if command == DO:
+            self.send(bytes([IAC, WONT, option]))
+        elif command == WILL and option != NAWS:
+            self.send(bytes([IAC, DONT, option]))
+
+
+class _TelnetHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        simulator = self.server.simulator
+        decoder = _ServerTelnetDecoder(self.request.sendall)
+
+        def recv():
+            while True:
+                data = self.request.recv(4096)
+                if not data:
+                    return b""
+                text = decoder.decode(data)
+                if text:
+                    return text
+
+        simulator.session_opened(self.request)
+        try:
+            self.request.sendall(bytes([IAC, DO, NAWS]))
+            CLISession(simulator, recv, self.request.sendall).run()
+        except OSError:
+            pass
+        finally:
+            simulator.session_closed(self.request)
+
+
+class _TelnetServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _SSHServer(paramiko.ServerInterface if paramiko is not None else object):
+    """Password authentication against the simulated OLT and one shell per channel"""
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        olt = self.simulator.olt
+        time.sleep(self.simulator.options['login_latency'])
+        if (username, password) == (olt.username, olt.password):
+            return paramiko.AUTH_SUCCESSFUL
+        print(f"Simulator: rejected SSH login of '{username}'")
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        threading.Thread(target=self.simulator.serve_channel, args=(channel,), daemon=True,
+                         name="simulator-ssh-session").start()
+        return True
+
+
+class OLTSimulator:
+    """Telnet (and optionally SSH) listener serving CLI sessions on one SimulatedOLT
+
+    Point an OLT_CONFIG/OLT_FLEET entry at host and port (or ssh_port with
+    transport "ssh") to run the client and the API against it. port 0 picks a
+    free port; the bound ports are in telnet_address and ssh_address after
+    start(). latency is the time every command takes before its reply,
+    command_latency maps command prefixes (e.g. "ont add") to their own time,
+    login_latency delays the password check, page_size is the pager's screen
+    length (0 for none) and scroll=False makes the CLI reject `scroll`, so
+    clients have to page through listings.
+    """
+
+    def __init__(self, olt=None, host="127.0.0.1", port=0, ssh_port=None, latency=0.0, command_latency=None,
+                 login_latency=0.0, page_size=20, scroll=True, ssh_host_key=None):
+        self.olt = olt or SimulatedOLT()
+        self.host = host
+        self.port = port
+        self.ssh_port = ssh_port
+        self.ssh_host_key = ssh_host_key
+        self.options = {
+            "latency": latency,
+            "command_latency": dict(command_latency or {}),
+            "login_latency": login_latency,
+            "page_size": page_size,
+            "scroll": scroll,
+        }
+        self.telnet_address = None
+        self.ssh_address = None
+        self._telnet_server = None
+        self._ssh_socket = None
+        self._sessions = set()      # telnet sockets and SSH channels of the open CLI sessions
+        self._transports = []       # SSH connections, closed by stop()
+        self._lock = threading.Lock()
+        self.sessions_total = 0
+        self.commands = 0
+
+    def start(self):
+        self._telnet_server = _TelnetServer((self.host, self.port), _TelnetHandler)
+        self._telnet_server.simulator = self
+        self.telnet_address = self._telnet_server.server_address
+        threading.Thread(target=self._telnet_server.serve_forever, daemon=True, name="simulator-telnet").start()
+        print(f"Simulator: telnet on {self.telnet_address[0]}:{self.telnet_address[1]}")
+
+        if self.ssh_port is not None:
+            if paramiko is None:
+                raise RuntimeError("the SSH listener needs the paramiko package")
+            if self.ssh_host_key:
+                self._host_key = paramiko.RSAKey.from_private_key_file(self.ssh_host_key)
+            else:
+                self._host_key = paramiko.RSAKey.generate(2048)
+            self._ssh_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._ssh_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._ssh_socket.bind((self.host, self.ssh_port))
+            self._ssh_socket.listen(64)
+            self.ssh_address = self._ssh_socket.getsockname()
+            threading.Thread(target=self._accept_ssh, daemon=True, name="simulator-ssh").start()
+            print(f"Simulator: SSH on {self.ssh_address[0]}:{self.ssh_address[1]}")
+        return self
+
+    def stop(self):
+        """Stop listening and drop every open session"""
+        if self._telnet_server is not None:
+            self._telnet_server.shutdown()
+            self._telnet_server.server_close()
+            self._telnet_server = None
+        if self._ssh_socket is not None:
+            self._ssh_socket.close()
+            self._ssh_socket = None
+        with self._lock:
+            connections = list(self._sessions) + self._transports
+            self._transports = []
+        for connection in connections:
+            try:
+                if isinstance(connection, socket.socket):
+                    # close() alone neither wakes the session thread's recv nor sends the FIN
+                    connection.shutdown(socket.SHUT_RDWR)
+                connection.close()
+            except OSError:
+                pass
+
+    def _accept_ssh(self):
+        while self._ssh_socket is not None:
+            try:
+                sock, _ = self._ssh_socket.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(sock)
+            transport.add_server_key(self._host_key)
+            with self._lock:
+                self._transports = [t for t in self._transports if t.is_active()] + [transport]
+            try:
+                transport.start_server(server=_SSHServer(self))
+            except (paramiko.SSHException, OSError):
+                transport.close()
+
+    def serve_channel(self, channel):
+        """Run a CLI session on an SSH shell channel; the login already happened in SSH"""
+        self.session_opened(channel)
+        try:
+            CLISession(self, lambda: channel.recv(4096), channel.sendall).run(authenticated=True)
+        finally:
+            channel.close()
+            self.session_closed(channel)
+
+    def session_opened(self, connection):
+        with self._lock:
+            self._sessions.add(connection)
+            self.sessions_total += 1
+
+    def session_closed(self, connection):
+        with self._lock:
+            self._sessions.discard(connection)
+
+    def count_command(self):
+        with self._lock:
+            self.commands += 1
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "sessions": len(self._sessions),
+                "sessions_total": self.sessions_total,
+                "commands": self.commands,
+            }
+        stats.update(self.olt.counts())
+        return stats
+
+
+def parse_latency_option(text):
+    # "ont add=0.5" -> ("ont add", 0.5)
+    prefix, _, seconds = text.rpartition("=")
+    if not prefix:
+        raise argparse.ArgumentTypeError("expected COMMAND=SECONDS, e.g. 'ont add=0.5'")
+    return prefix.strip(), float(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated MA5683T OLT CLI over telnet (and SSH)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3212, help="telnet port (0 picks a free one)")
+    parser.add_argument("--ssh-port", type=int, help="also accept SSH on this port (needs paramiko)")
+    parser.add_argument("--ssh-host-key", help="RSA host key file (a new key is generated by default)")
+    parser.add_argument("--hostname", default="MA5683T", help="host name shown in the prompt")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--boards", type=int, default=2, help="GPON boards in frame 0")
+    parser.add_argument("--ports-per-board", type=int, default=16)
+    parser.add_argument("--onts-per-port", type=int, default=32, help="registered ONTs on every port")
+    parser.add_argument("--autofind", type=int, default=8, help="unregistered ONTs in the autofind list")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every command takes")
+    parser.add_argument("--command-latency", type=parse_latency_option, action="append", default=[],
+                        metavar="COMMAND=SECONDS", help="time of the commands starting with COMMAND (repeatable)")
+    parser.add_argument("--login-latency", type=float, default=0.0, help="seconds the password check takes")
+    parser.add_argument("--page-size", type=int, default=20, help="lines per pager screen, 0 for no pager")
+    parser.add_argument("--no-scroll", action="store_true", help="reject `scroll`, so clients page through listings")
+    args = parser.parse_args()
+
+    try:
+        olt = SimulatedOLT(args.boards, args.ports_per_board, args.onts_per_port, args.autofind,
+                           args.hostname, args.username, args.password)
+    except ValueError as e:
+        parser.error(str(e))
+    simulator = OLTSimulator(olt, args.host, args.port, args.ssh_port, args.latency, dict(args.command_latency),
+                             args.login_latency, args.page_size, not args.no_scroll, args.ssh_host_key)
+    simulator.start()
+    print(f"Simulator: {olt.counts()}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
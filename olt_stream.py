@@ -0,0 +1,237 @@
+import re
+import struct
+
+# Telnet protocol bytes (RFC 854) and the window size option (RFC 1073)
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+NAWS = 31
+
+# Pager banner, together with the cursor moves and blanks the OLT prints to erase it,
+# and interactive parameter prompts such as "{ <cr>||<K> }:" left in a listing
+PAGER_TEXT_PATTERN = re.compile(r"-+ More \( Press 'Q' to break \) -+(?:\x1b\[\d+D *\x1b\[\d+D)?|\{[^{}\r\n]*\}:")
+
+# ANSI escape sequences
+ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+# Lines without output: error carets ("    ^") and CLI prompts such as
+# MA5683T>, MA5683T# or MA5683T(config-if-gpon-0/0)#, with or without an echoed command
+NOISE_LINE_PATTERN = re.compile(r"^\s*(?:\^\s*$|[A-Za-z0-9_-]+(?:\([^()]*\))?[>#])")
+
+# CLI error lines, e.g. "  % Unknown command, the error locates at '^'"
+ERROR_LINE_PATTERN = re.compile(r"^\s*%")
+
+
+class TelnetDecoder:
+    """Removes telnet commands from received bytes and answers option negotiation
+
+    Replies go through send(bytes). The OLT is told a wide window via NAWS (so long
+    listing rows are not wrapped) and every other option is refused. A command
+    split across two reads is kept until the next chunk arrives.
+    """
+
+    def __init__(self, send, terminal_width=512, terminal_height=0):
+        self.send = send
+        self.terminal_width = terminal_width
+        self.terminal_height = terminal_height
+        self._pending = b""
+
+    def _negotiate(self, command, option):
+        if command == DO and option == NAWS:
+            size = struct.pack('>HH', self.terminal_width, self.terminal_height)
+            size = size.replace(bytes([IAC]), bytes([IAC, IAC]))
+            self.send(bytes([IAC, WILL, NAWS, IAC, SB, NAWS]) + size + bytes([IAC, SE]))
+        elif command in (DO, DONT):
+            self.send(bytes([IAC, WONT, option]))
+        elif command in (WILL, WONT):
+            self.send(bytes([IAC, DONT, option]))
+
+    def decode(self, data):
+        """Return the text bytes of a received chunk"""
+        if not self._pending and IAC not in data:
+            return data
+        data = self._pending + data
+        self._pending = b""
+        text = bytearray()
+        i = 0
+        while i < len(data):
+            next_iac = data.find(IAC, i)
+            if next_iac == -1:
+                text += data[i:]
+                break
+            text += data[i:next_iac]
+            i = next_iac
+            if i + 1 >= len(data):
+                self._pending = data[i:]
+                break
+            command = data[i + 1]
+            if command == IAC:
+                text.append(IAC)
+                i += 2
+            elif command in (DO, DONT, WILL, WONT):
+                if i + 2 >= len(data):
+                    self._pending = data[i:]
+                    break
+                self._negotiate(command, data[i + 2])
+                i += 3
+            elif command == SB:
+                end = data.find(bytes([IAC, SE]), i + 2)
+                if end == -1:
+                    self._pending = data[i:]
+                    break
+                i = end + 2
+            else:
+                i += 2
+        return bytes(text)
+
+
+class ReceiveBuffer:
+    """Bytes received from the OLT that have not been handed to a caller yet
+
+    Used by both clients' expect(). Patterns are only searched in the part that
+    arrived since the previous search (plus a small overlap, so a match split
+    across two reads is still found), and once more than spill_size bytes are
+    waiting, the completed lines already searched are decoded and moved out of
+    the raw buffer. Each received byte is therefore scanned and decoded about
+    once, and a long listing costs time and memory linear in its size instead of
+    re-copying and re-scanning everything received so far on every read.
+    """
+
+    def __init__(self, spill_size=65536, overlap=512):
+        self.spill_size = spill_size
+        self.overlap = overlap
+        self._data = bytearray()
+        self._decoded = []  # text of completed lines already moved out of _data
+        self._decoded_size = 0
+        self._scanned = 0   # bytes of _data that no pattern matched in
+
+    def __len__(self):
+        return self._decoded_size + len(self._data)
+
+    def feed(self, data):
+        self._data += data
+
+    def search(self, patterns):
+        """Look for the patterns in the unsearched tail
+
+        Returns (index, match, end) for the first pattern that matches, where
+        end is the offset to pass to consume(), or (-1, None, 0).
+        """
+        start = max(0, self._scanned - self.overlap)
+        # Search a copy of the tail only: the match must not see later changes to _data
+        tail = self._data[start:]
+        for index, pattern in enumerate(patterns):
+            match = pattern.search(tail)
+            if match:
+                return index, match, start + match.end()
+
+        self._scanned = len(self._data)
+        if len(self._data) > self.spill_size:
+            self._spill()
+        return -1, None, 0
+
+    def _spill(self):
+        """Decode searched, completed lines and drop them from the raw buffer"""
+        cut = self._data.rfind(b"\n", 0, len(self._data) - self.overlap) + 1
+        if cut > 0:
+            text = self._data[:cut].decode('ascii', errors='ignore')
+            self._decoded.append(text)
+            self._decoded_size += len(text)
+            del self._data[:cut]
+            self._scanned -= cut
+
+    def consume(self, end):
+        """Return the text received up to offset end and remove it from the buffer"""
+        self._decoded.append(self._data[:end].decode('ascii', errors='ignore'))
+        text = "".join(self._decoded)
+        del self._data[:end]
+        self._decoded = []
+        self._decoded_size = 0
+        self._scanned = 0
+        return text
+
+    def drain(self):
+        """Return everything received so far and empty the buffer"""
+        return self.consume(len(self._data))
+
+    def clear(self):
+        self._data.clear()
+        self._decoded = []
+        self._decoded_size = 0
+        self._scanned = 0
+
+
+def strip_pager(text):
+    """Remove pager banners (with their erase sequences) and parameter prompts from raw output
+
+    The row printed after a banner shares its line with the banner and the
+    erase sequence; once they are gone it is an ordinary line again.
+    """
+    if 'More (' not in text and '{' not in text:
+        return text
+    return PAGER_TEXT_PATTERN.sub('', text)
+
+
+class OutputCleaner:
+    """Turns raw command output into the lines worth showing, in one pass
+
+    Strips ANSI escapes, pager banners and parameter prompts, the echo of
+    command (the first line containing it), error carets and prompt lines.
+    Blank lines are dropped, or with keep_blank collapsed to one between
+    sections; with drop_errors "% ..." error lines go too. Data can be fed in
+    chunks of bytes or text as it arrives: every complete line is cleaned once
+    and only the unfinished last line is held back.
+    """
+
+    def __init__(self, command=None, keep_blank=False, drop_errors=False):
+        self.command = command.strip() if command and command.strip() else None
+        self.keep_blank = keep_blank
+        self.drop_errors = drop_errors
+        self.lines = []
+        self._partial = ""
+
+    def feed(self, data):
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode('ascii', errors='ignore')
+        lines = (self._partial + data).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._add(line)
+
+    def _add(self, line):
+        if 'More (' in line or '{' in line:
+            line = PAGER_TEXT_PATTERN.sub('', line)
+        if '\x1b' in line:
+            line = ANSI_ESCAPE_PATTERN.sub('', line)
+        line = line.rstrip()
+
+        if not line:
+            if self.keep_blank and self.lines and self.lines[-1]:
+                self.lines.append('')
+            return
+        if self.command is not None and self.command in line:
+            self.command = None
+            return
+        if NOISE_LINE_PATTERN.match(line) or (self.drop_errors and ERROR_LINE_PATTERN.match(line)):
+            return
+        self.lines.append(line)
+
+    def finish(self):
+        """Clean the unfinished last line and return the cleaned text"""
+        if self._partial:
+            self._add(self._partial)
+            self._partial = ""
+        while self.lines and not self.lines[-1]:
+            self.lines.pop()
+        return '\n'.join(self.lines)
+
+
+def clean_output(output, command=None, keep_blank=False, drop_errors=False):
+    """Clean a complete command output with OutputCleaner"""
+    cleaner = OutputCleaner(command, keep_blank, drop_errors)
+    cleaner.feed(output)
+    return cleaner.finish()
@@ -0,0 +1,189 @@
+import socket
+import threading
+
+from olt_stream import IAC, TelnetDecoder
+
+try:
+    import paramiko
+except ImportError:  # only needed for transport "ssh"
+    paramiko = None
+
+
+class LoginRejected(Exception):
+    """The OLT refused the credentials while the transport was being opened"""
+
+
+def enable_keepalive(sock, config):
+    """Turn on TCP keepalive so a silently dropped OLT connection is noticed by the kernel"""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, config.get('keepalive_idle', 60))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, config.get('keepalive_interval', 10))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, config.get('keepalive_count', 3))
+
+
+def create_transport(config):
+    """Build the transport selected by config['transport'] ("telnet" by default)"""
+    if config.get('transport', 'telnet') == 'ssh':
+        return SSHTransport(config)
+    return TelnetTransport(config)
+
+
+class TelnetTransport:
+    """CLI session over a plain telnet TCP connection
+
+    The OLT asks for username and password on the CLI itself, so open() only
+    connects. recv() returns text bytes with telnet commands removed and raises
+    EOFError once the OLT closes the connection.
+    """
+
+    authenticates = False
+
+    def __init__(self, config):
+        self.config = config
+        self.sock = None
+        self.decoder = None
+
+    def open(self, username, password):
+        self.sock = socket.create_connection((self.config['host'], self.config['port']), self.config['timeout'])
+        enable_keepalive(self.sock, self.config)
+        self.decoder = TelnetDecoder(
+            self.sock.sendall,
+            self.config.get('terminal_width', 512),
+            self.config.get('terminal_height', 0)
+        )
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def recv(self):
+        data = self.sock.recv(65536)
+        if not data:
+            raise EOFError("telnet connection closed")
+        return self.decoder.decode(data)
+
+    def send(self, data):
+        self.sock.sendall(data.replace(bytes([IAC]), bytes([IAC, IAC])))
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+class _SharedSSHConnection:
+    """One authenticated SSH connection and the number of CLI channels open on it"""
+
+    def __init__(self, client):
+        self.client = client
+        self.channels = 0
+
+    def is_active(self):
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+
+class SSHTransport:
+    """CLI session on an interactive channel of a shared SSH connection
+
+    Channels of the same host and credentials share one authenticated connection
+    (up to config['ssh_channels_per_connection'] each), so extra pooled sessions
+    only cost a channel open instead of a TCP and SSH handshake. The connection
+    is closed with its last channel.
+    """
+
+    authenticates = True
+
+    _connections = {}  # (host, port, username, password) -> [_SharedSSHConnection]
+    _lock = threading.Lock()
+
+    def __init__(self, config):
+        if paramiko is None:
+            raise RuntimeError("transport 'ssh' needs the paramiko package")
+        self.config = config
+        self.key = None
+        self.connection = None
+        self.channel = None
+
+    def open(self, username, password):
+        self.key = (self.config['host'], self.config.get('ssh_port', 22), username, password)
+        self.connection = self._acquire(self.key, username, password)
+        try:
+            self.channel = self.connection.client.get_transport().open_session(timeout=self.config['timeout'])
+            self.channel.get_pty(
+                term='vt100',
+                width=self.config.get('terminal_width', 512),
+                height=self.config.get('terminal_height', 0)
+            )
+            self.channel.invoke_shell()
+        except Exception:
+            self.close()
+            raise
+
+    def _acquire(self, key, username, password):
+        """Reserve a channel slot on a live connection for key, connecting if none has room"""
+        limit = self.config.get('ssh_channels_per_connection', 4)
+        with self._lock:
+            connections = self._connections.setdefault(key, [])
+            connections[:] = [c for c in connections if c.is_active() or c.channels]
+            for connection in connections:
+                if connection.channels < limit and connection.is_active():
+                    connection.channels += 1
+                    return connection
+
+        client = paramiko.SSHClient()
+        known_hosts = self.config.get('ssh_known_hosts')
+        if known_hosts:
+            client.load_host_keys(known_hosts)
+            client.set_missing_host_key_policy(paramiko.RejectPolicy())
+        else:
+            client.set_missing_host_key_policy(paramiko.WarningPolicy())
+        try:
+            client.connect(
+                key[0], port=key[1], username=username, password=password,
+                timeout=self.config['timeout'], auth_timeout=self.config['timeout'],
+                allow_agent=False, look_for_keys=False
+            )
+        except paramiko.AuthenticationException as e:
+            client.close()
+            raise LoginRejected(str(e))
+        except Exception:
+            client.close()
+            raise
+        client.get_transport().set_keepalive(self.config.get('keepalive_idle', 60))
+        enable_keepalive(client.get_transport().sock, self.config)
+
+        connection = _SharedSSHConnection(client)
+        connection.channels = 1
+        with self._lock:
+            self._connections.setdefault(key, []).append(connection)
+        return connection
+
+    def fileno(self):
+        return self.channel.fileno()
+
+    def recv(self):
+        data = self.channel.recv(65536)
+        if not data:
+            raise EOFError("ssh channel closed")
+        return data
+
+    def send(self, data):
+        self.channel.sendall(data)
+
+    def close(self):
+        if self.channel is not None:
+            self.channel.close()
+            self.channel = None
+        if self.connection is not None:
+            with self._lock:
+                self.connection.channels -= 1
+                last = self.connection.channels == 0
+                if last:
+                    # Unlisted before closing, so no other session picks it up meanwhile
+                    connections = self._connections.get(self.key, [])
+                    if self.connection in connections:
+                        connections.remove(self.connection)
+            if last:
+                self.connection.client.close()
+            self.connection = None
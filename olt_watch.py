@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+
+from olt_parser import parse_autofind_list, to_json
+
+
+def read_autofind(olt, olt_config):
+    """Fleet operation: the raw autofind reply of one OLT, checked and parsed by poll"""
+    return olt.display_ont_autofind_simple()
+
+
+class AutofindWatcher:
+    """Polls `display ont autofind all` on one OLT and pushes the changes to subscribers
+
+    The poller runs in a background thread while at least one subscriber is
+    connected, one poll per interval through the OLT's session pool, whatever
+    the number of subscribers. Subscribers get a queue of (event, data) pairs:
+    a "snapshot" of the current list when they subscribe (once the first poll
+    is done), then "added" and "removed" with the ONTs that appeared in or left
+    the list since the previous poll, and "error" when a poll fails. ONTs are
+    told apart by F/S/P and serial number.
+    """
+
+    def __init__(self, fleet, name, interval=30, queue_size=100):
+        self.fleet = fleet
+        self.name = name
+        self.interval = interval
+        self.queue_size = queue_size
+        self.onts = None            # {(fsp, sn): AutofindOnt} of the last successful poll
+        self.polled_at = None
+        self.last_error = None
+        self.polls = 0
+        self._subscribers = {}      # queue -> credentials of the web session that opened it
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def subscribe(self, credentials):
+        """Register a subscriber and start polling if it is the first one"""
+        events = queue.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers[events] = credentials
+            if self.onts is not None:
+                events.put(("snapshot", self._snapshot()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name=f"autofind-{self.name}")
+                self._thread.start()
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers.pop(events, None)
+
+    def subscribed(self, events):
+        """False once the subscriber was dropped, e.g. for not keeping up or logging out"""
+        with self._lock:
+            return events in self._subscribers
+
+    def close_key(self, key):
+        """Drop the subscribers of a web session that logged out"""
+        with self._lock:
+            for events, credentials in list(self._subscribers.items()):
+                if credentials['id'] == key:
+                    del self._subscribers[events]
+
+    def poll_now(self):
+        """Cut the current wait short, e.g. after a registration changed the list"""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+                # Poll with the login of the latest subscriber (or the OLT's service login)
+                credentials = list(self._subscribers.values())[-1]
+            self.poll(credentials)
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def poll(self, credentials):
+        """Read the autofind list once and publish the difference to the previous one
+
+        A reply with error text or a cut-off list is published as "error" and
+        leaves the last good list in place, so it never reads as every ONT gone.
+        """
+        results, _ = self.fleet.fan_out(read_autofind, credentials, [self.name])
+        result = results[self.name]
+        now = time.time()
+        message = result.get('message')
+        if result['status'] == 'success':
+            try:
+                onts = parse_autofind_list(result['data'])
+            except ValueError as e:
+                message = str(e)
+        with self._lock:
+            self.polls += 1
+            if result['status'] != 'success' or message:
+                self.last_error = message
+                self._publish("error", {"olt": self.name, "message": message, "time": now})
+                return
+            current = {(ont.fsp, ont.sn): ont for ont in onts}
+            previous = self.onts
+            self.onts, self.polled_at, self.last_error = current, now, None
+            if previous is None:
+                self._publish("snapshot", self._snapshot())
+                return
+            added = [ont for key, ont in current.items() if key not in previous]
+            removed = [ont for key, ont in previous.items() if key not in current]
+            if added:
+                self._publish("added", {"olt": self.name, "onts": to_json(added), "time": now})
+            if removed:
+                self._publish("removed", {"olt": self.name, "onts": to_json(removed), "time": now})
+
+    def _snapshot(self):
+        return {"olt": self.name, "onts": to_json(list(self.onts.values())), "time": self.polled_at}
+
+    def _publish(self, event, data):
+        # Called with the lock held; a subscriber whose queue is full is dropped
+        # and picks up a fresh snapshot when its client reconnects
+        for events in list(self._subscribers):
+            try:
+                events.put_nowait((event, data))
+            except queue.Full:
+                del self._subscribers[events]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "polling": self._thread is not None,
+                "interval": self.interval,
+                "polls": self.polls,
+                "onts": None if self.onts is None else len(self.onts),
+                "polled_at": self.polled_at,
+                "last_error": self.last_error,
+            }
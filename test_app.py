@@ -0,0 +1,229 @@
+"""API checks against the OLT simulator: response cache, coalesced reads, inventory and autofind watcher
+
+The app reads config when it is imported, so the module fixture points config
+at a simulator and a scratch inventory database before importing it.
+
+Run with: python -m pytest test_app.py
+"""
+
+import queue
+import re
+import threading
+import time
+
+import pytest
+
+import config
+import olt_watch
+from olt_client import OLTClient
+from olt_flight import SingleFlight
+from olt_simulator import OLTSimulator, SimulatedOLT
+from olt_watch import AutofindWatcher
+
+# Login the background reads below use, as get_session_credentials() returns it
+CREDENTIALS = {'id': 'test-session', 'username': 'admin', 'password': 'admin'}
+
+
+class API:
+    def __init__(self, sim, app):
+        self.sim = sim
+        self.olt = sim.olt
+        self.app = app
+        self.client = app.app.test_client()
+
+    def get(self, url):
+        return self.client.get(url).get_json()
+
+    def post(self, url, body):
+        return self.client.post(url, json=body).get_json()
+
+    def commands(self):
+        """Commands the simulated OLT has run so far"""
+        return self.sim.stats()['commands']
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    sim = OLTSimulator(SimulatedOLT(boards=2, ports_per_board=4, onts_per_port=8, autofind=4),
+                       command_latency={"display board 0/1": 0.3}).start()
+    config.INVENTORY_DATABASE_URI = 'sqlite:///' + str(tmp_path_factory.mktemp('inventory') / 'inventory.db')
+    config.OLT_CONFIG.update(host='127.0.0.1', port=sim.telnet_address[1], transport='telnet', client='sync',
+                             board='0/0', ports_per_board=4, dialect_cache=None)
+    config.OLT_FLEET = {config.DEFAULT_OLT: {}}
+    import app
+    api = API(sim, app)
+    assert api.post('/olt-login', {'username': 'admin', 'password': 'admin'})['status'] == 'success'
+    yield api
+    sim.stop()
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(api):
+    # Every resource name is also a tag of its entries
+    api.app.response_cache.invalidate(config.DEFAULT_OLT, config.CACHE_TTLS)
+
+
+def test_board_detail_is_cached_until_an_ont_is_registered(api):
+    first = api.get('/board-detail/0/1')
+    assert first['status'] == 'success' and first['age'] == 0
+    commands = api.commands()
+    cached = api.get('/board-detail/0/1')
+    assert cached['parsed'] == first['parsed']
+    assert api.commands() == commands
+
+    sn = next(iter(api.olt.autofind))
+    registered = api.post('/ont-register', {'boardId': '0/1', 'portId': 2, 'ontId': 20, 'serialNumber': sn,
+                                            'description': 'cache-test'})
+    assert registered['status'] == 'success', registered
+
+    fresh = api.get('/board-detail/0/1')
+    assert fresh['age'] == 0
+    assert {'fsp': '0/1/2', 'ont_id': 20} in [{'fsp': ont['fsp'], 'ont_id': ont['ont_id']}
+                                               for ont in fresh['parsed']['onts']]
+
+
+def test_stale_board_status_is_served_while_it_is_refreshed(api, monkeypatch):
+    monkeypatch.setitem(api.app.response_cache.ttls, 'board-status', 0.2)
+    assert api.get('/board-status')['age'] == 0
+    time.sleep(0.3)
+
+    commands = api.commands()
+    stale = api.get('/board-status')
+    assert stale['status'] == 'success' and stale['age'] >= 0.3
+
+    # The background refresh replaces the entry with a fresh read
+    deadline = time.time() + 5
+    while api.app.response_cache.get(config.DEFAULT_OLT, 'board-status')[1] >= 0.3:
+        assert time.time() < deadline, "stale entry was not refreshed"
+        time.sleep(0.05)
+    assert api.commands() == commands + 1
+
+
+def test_concurrent_identical_reads_run_once(api):
+    def read_board():
+        return api.app.shared_read(CREDENTIALS, "display board 0/1", "ANY",
+                                   lambda olt: olt.get_board_detail('0/1'), in_request=False)
+
+    read_board()  # Logs the pool in, so only the reads below reach the OLT
+    flights = api.app.read_flights
+    executions, coalesced = flights.executions, flights.coalesced
+    commands = api.commands()
+    start = threading.Barrier(4)
+    outputs = []
+
+    def read():
+        start.wait()
+        outputs.append(read_board())
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(outputs) == 4 and len(set(outputs)) == 1 and 'H806GPBD' in outputs[0]
+    assert (flights.executions - executions, flights.coalesced - coalesced) == (1, 3)
+    assert api.commands() == commands + 1
+
+
+def test_leader_checkout_failure_is_not_shared():
+    flights = SingleFlight()
+    release = threading.Event()
+    results = queue.Queue()
+
+    def leader():
+        release.wait()
+        raise TimeoutError("pool busy")
+
+    def follower():
+        time.sleep(0.2)
+        return 'read by a follower'
+
+    def follow():
+        results.put(flights.do('key', follower, lambda e: not isinstance(e, TimeoutError)))
+
+    def lead():
+        try:
+            flights.do('key', leader, lambda e: not isinstance(e, TimeoutError))
+        except TimeoutError as e:
+            results.put(e)
+
+    threads = [threading.Thread(target=lead)] + [threading.Thread(target=follow) for _ in range(3)]
+    threads[0].start()
+    while flights.stats()['in_flight'] == 0:
+        time.sleep(0.01)
+    for thread in threads[1:]:
+        thread.start()
+    while flights.stats()['waiting'] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    outcomes = [results.get_nowait() for _ in range(4)]
+    assert sum(isinstance(outcome, TimeoutError) for outcome in outcomes) == 1
+    assert outcomes.count('read by a follower') == 3
+    # One follower ran the read again for the others
+    assert flights.executions == 2
+
+
+def test_inventory_refresh_reconciles_ports(api):
+    result = api.post('/inventory/refresh', {'boardId': '0/0', 'ports': [0, 1]})
+    assert [(port['fsp'], port['status'], port['onts']) for port in result['data']] == \
+        [('0/0/0', 'success', 8), ('0/0/1', 'success', 8)]
+
+    api.olt.delete_ont(0, 1, 5)
+    result = api.post('/inventory/refresh', {'boardId': '0/0', 'ports': [1]})
+    assert result['data'][0]['removed'] == 1
+    onts = api.get('/inventory/onts?board=0/0&port=1')['data']
+    assert sorted(ont['ont_id'] for ont in onts) == [0, 1, 2, 3, 4, 6, 7]
+
+    # Ports scanned within maxAge are not read again
+    assert api.post('/inventory/refresh', {'boardId': '0/0', 'ports': [0, 1], 'maxAge': 60})['data'] == []
+
+
+def test_inventory_refresh_keeps_ports_whose_listing_lost_rows(api, monkeypatch):
+    assert api.post('/inventory/refresh', {'boardId': '0/0', 'ports': [2]})['data'][0]['onts'] == 8
+    scan_ports = OLTClient.scan_ports
+
+    def lossy_scan_ports(self, board_id, port_ids):
+        # The row of ONT 3 goes missing on the way, the port summary still counts it
+        listings = scan_ports(self, board_id, port_ids)
+        return {port: re.sub(r"(?m)^\s*0/\s*0/2\s+3\s.*\n", "", listing) for port, listing in listings.items()}
+
+    monkeypatch.setattr(OLTClient, 'scan_ports', lossy_scan_ports)
+    result = api.post('/inventory/refresh', {'boardId': '0/0', 'ports': [2]})
+    assert result['data'][0]['status'] == 'error'
+    assert result['data'][0]['message'] == "Port listing incomplete: 7 of 8 ONTs read"
+    assert len(api.get('/inventory/onts?board=0/0&port=2')['data']) == 8
+
+
+def test_autofind_watcher_publishes_changes_and_keeps_list_on_bad_reply(api, monkeypatch):
+    found = len(api.olt.autofind)
+    watcher = AutofindWatcher(api.app.fleet, config.DEFAULT_OLT, interval=3600)
+    events = watcher.subscribe(CREDENTIALS)
+    try:
+        event, snapshot = events.get(timeout=10)
+        assert event == 'snapshot' and len(snapshot['onts']) == found
+
+        with api.olt.lock:
+            gone = next(iter(api.olt.autofind))
+            del api.olt.autofind[gone]
+            api.olt.autofind['48575443AAAA0001'] = (api.olt.gpon_slots[0], 3, time.time())
+        watcher.poll(CREDENTIALS)
+        changes = dict([events.get(timeout=1), events.get(timeout=1)])
+        assert [ont['sn'] for ont in changes['added']['onts']] == ['48575443AAAA0001']
+        assert [ont['sn'] for ont in changes['removed']['onts']] == [gone]
+
+        # A listing cut off before its count line is an error, not every ONT removed
+        read_autofind = olt_watch.read_autofind
+        monkeypatch.setattr(olt_watch, 'read_autofind',
+                            lambda olt, olt_config: read_autofind(olt, olt_config).rsplit('Number', 1)[0])
+        watcher.poll(CREDENTIALS)
+        event, data = events.get(timeout=1)
+        assert event == 'error' and 'Incomplete autofind list' in data['message']
+        assert len(watcher.onts) == found
+        assert events.empty()
+    finally:
+        watcher.unsubscribe(events)
+        watcher.poll_now()
@@ -0,0 +1,144 @@
+"""Client, session pool and output stream checks against the OLT simulator
+
+Run with: python -m pytest test_olt_client.py
+"""
+
+import re
+
+import pytest
+
+from olt_async import BlockingOLTClient
+from olt_client import CLIMode, OLTClient
+from olt_parser import parse_ont_info
+from olt_pool import OLTConnectionPool
+from olt_simulator import OLTSimulator, SimulatedOLT
+from olt_stream import OutputCleaner, ReceiveBuffer, clean_output
+
+# Port listings of board 0/0, as an inventory refresh pipelines them in GPON interface mode
+BATCH = ["display ont info 0 all", "display ont info 1 all", "display ont info 2 all"]
+
+
+def client_config(sim, **options):
+    return dict(dict(host='127.0.0.1', port=sim.telnet_address[1], transport='telnet', board='0/0',
+                     prompt='MA5683T>', timeout=5, dialect_cache=None), **options)
+
+
+def check_connection(client):
+    return client.is_alive(2)
+
+
+@pytest.fixture
+def sim():
+    simulator = OLTSimulator(SimulatedOLT(boards=2, onts_per_port=8, autofind=5)).start()
+    yield simulator
+    simulator.stop()
+
+
+@pytest.fixture(params=[True, False], ids=['scroll', 'pager'])
+def paged_sim(request):
+    """A simulator that accepts `scroll`, and one whose listings have to be paged through"""
+    simulator = OLTSimulator(SimulatedOLT(boards=2, onts_per_port=30, autofind=5), scroll=request.param).start()
+    yield simulator
+    simulator.stop()
+
+
+@pytest.mark.parametrize('client_class', [OLTClient, BlockingOLTClient])
+def test_pipelined_replies_match_single_commands(paged_sim, client_class):
+    client = client_class(client_config(paged_sim))
+    assert client.connect('admin', 'admin')
+    try:
+        _, replies, error = client.run_in_mode(CLIMode.INTERFACE_GPON, '0/0', BATCH, timeout=30)
+        assert error is None
+        assert [command for command, _ in replies] == BATCH
+        for command, output in replies:
+            assert output == client.send_command(command)
+            assert len(parse_ont_info(output, '0/0')) == 30
+    finally:
+        client.close()
+
+
+def test_pipelined_batch_stops_at_the_first_failure(sim):
+    client = OLTClient(client_config(sim))
+    assert client.connect('admin', 'admin')
+    try:
+        _, replies, error = client.run_in_mode(CLIMode.INTERFACE_GPON, '0/0',
+                                               ["display ont info 0 all", "display nonsense", "display ont info 1 all"])
+        assert "'display nonsense' was rejected" in error
+        assert [command for command, _ in replies] == ["display ont info 0 all", "display nonsense"]
+        # The reply queued behind the failure was read and dropped: the session is still in step
+        assert len(parse_ont_info(client.send_command("display ont info 2 all"), '0/0')) == 8
+    finally:
+        client.close()
+
+
+def test_pool_reuses_idle_session_and_times_out_when_busy(sim):
+    pool = OLTConnectionPool(lambda: OLTClient(client_config(sim)), max_sessions=1, checkout_timeout=0.5,
+                             health_check=check_connection)
+    first = pool.checkout('web-1', 'admin', 'admin')
+    assert first is not None
+    with pytest.raises(TimeoutError):
+        pool.checkout('web-1', 'admin', 'admin')
+    pool.checkin(first)
+
+    assert pool.checkout('web-1', 'admin', 'admin') is first
+    pool.checkin(first)
+    assert sim.stats()['sessions_total'] == 1
+    pool.close_key('web-1')
+
+
+def test_pool_retires_session_the_olt_closed(sim):
+    pool = OLTConnectionPool(lambda: OLTClient(client_config(sim)), max_sessions=1, checkout_timeout=5,
+                             health_check=check_connection)
+    first = pool.checkout('web-1', 'admin', 'admin')
+    pool.checkin(first)
+
+    # The OLT restarts: every session is dropped, then it listens again on the same port
+    port = sim.telnet_address[1]
+    sim.stop()
+    restarted = OLTSimulator(sim.olt, port=port).start()
+    try:
+        second = pool.checkout('web-1', 'admin', 'admin')
+        assert second is not None and second is not first
+        assert not first.logged_in
+        assert "H806GPBD" in second.send_command("display board 0/1")
+        pool.checkin(second)
+        assert restarted.stats()['sessions_total'] == 1
+    finally:
+        pool.close_key('web-1')
+        restarted.stop()
+
+
+def test_receive_buffer_finds_prompt_split_across_reads():
+    buffer = ReceiveBuffer(spill_size=64, overlap=16)
+    prompt = re.compile(rb"MA5683T#")
+    listing = b"".join(b"  0/ 0/1    %d  online\r\n" % i for i in range(50))
+    for start in range(0, len(listing), 37):
+        buffer.feed(listing[start:start + 37])
+        assert buffer.search([prompt]) == (-1, None, 0)
+    buffer.feed(b"MA56")
+    assert buffer.search([prompt])[0] == -1
+    buffer.feed(b"83T#extra")
+
+    index, match, end = buffer.search([prompt])
+    assert index == 0
+    assert buffer.consume(end) == (listing + b"MA5683T#").decode()
+    assert buffer.drain() == "extra"
+    assert len(buffer) == 0
+
+
+def test_output_cleaner_fed_in_chunks_matches_whole_output():
+    output = ("display board 0\r\n"
+              "  SlotID  BoardName\r\n\r\n\r\n"
+              "  ---- More ( Press 'Q' to break ) ----\x1b[37D" + " " * 37 + "\x1b[37D  1  H806GPBD\r\n"
+              "  % Unknown command, the error locates at '^'\r\n"
+              "MA5683T#")
+    expected = clean_output(output, "display board 0", keep_blank=True)
+    lines = expected.splitlines()
+    assert [line.split() for line in lines] == [["SlotID", "BoardName"], [], ["1", "H806GPBD"],
+                                                 ["%", "Unknown", "command,", "the", "error", "locates", "at", "'^'"]]
+
+    cleaner = OutputCleaner("display board 0", keep_blank=True)
+    for start in range(0, len(output), 5):
+        cleaner.feed(output[start:start + 5].encode())
+    assert cleaner.finish() == expected
+    assert "% Unknown" not in clean_output(output, "display board 0", drop_errors=True)
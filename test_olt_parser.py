@@ -0,0 +1,78 @@
+"""Parser checks against the recorded listings in samples/, as printed with and without the pager
+
+Run with: python -m pytest test_olt_parser.py
+"""
+
+import os
+
+from olt_parser import parse_autofind, parse_board_detail, parse_board_list, parse_ont_info
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'samples')
+
+# What the MA5683T prints for a full screen, and what it prints to erase that once a key is pressed
+PAGER_BANNER = "  ---- More ( Press 'Q' to break ) ----"
+PAGER_ERASE = "\x1b[37D" + " " * 37 + "\x1b[37D"
+
+
+def read_sample(name):
+    """Output of a sample file, without the command on its first line"""
+    with open(os.path.join(SAMPLES_DIR, name)) as f:
+        return f.read().partition('\n')[2]
+
+
+def paged(text, page_size=20):
+    """text as the OLT sends it with the pager on: the row after each banner shares its line"""
+    lines = text.split('\n')
+    out = []
+    for i, line in enumerate(lines):
+        if i and i % page_size == 0:
+            line = PAGER_BANNER + PAGER_ERASE + line
+        out.append(line)
+    return '\r\n'.join(out)
+
+
+def test_ont_info_with_pager_banner_mid_listing():
+    text = read_sample('display_ont_info_0_all.txt')
+    expected = parse_ont_info(text)
+    assert len(expected) > 40
+
+    onts = parse_ont_info(paged(text))
+    assert onts == expected
+
+
+def test_ont_info_row_after_banner_is_kept():
+    text = (
+        "  F/S/P   ONT         SN         Control     Run      Config   Match    Protect\r\n"
+        "          ID                     flag        state    state    state    side\r\n"
+        "  0/ 1/0    0  485754431A2B0000  active      online   normal   match    no \r\n"
+        + PAGER_BANNER + PAGER_ERASE +
+        "  0/ 1/0    1  485754431A2B0001  active      offline  normal   match    no \r\n"
+    )
+    onts = parse_ont_info(text)
+    assert [(ont.fsp, ont.ont_id, ont.sn, ont.run_state) for ont in onts] == [
+        ("0/1/0", 0, "485754431A2B0000", "online"),
+        ("0/1/0", 1, "485754431A2B0001", "offline"),
+    ]
+
+
+def test_board_detail_with_pager_banners():
+    text = read_sample('display_board_0_1.txt')
+    expected = parse_board_detail(text, '0/1')
+    assert len(expected.onts) > 100
+
+    detail = parse_board_detail(paged(text, 24), '0/1')
+    assert detail == expected
+    assert all(ont.description for ont in detail.onts)
+
+
+def test_board_list_with_pager_banner():
+    text = read_sample('display_board_0.txt')
+    assert parse_board_list(paged(text, 6)) == parse_board_list(text)
+
+
+def test_autofind_with_pager_banners():
+    text = read_sample('display_ont_autofind_all.txt')
+    expected = parse_autofind(text)
+    assert expected
+
+    assert parse_autofind(paged(text, 15)) == expected